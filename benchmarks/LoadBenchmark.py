@@ -0,0 +1,191 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from reasoning_engines import GPTModel, OpenRouterModel
+from resource_manager.built_in_resources import CurrencyResource
+
+
+def percentile(values, pct: float) -> float:
+    """
+    Get a percentile of some values, interpolating between the closest ranks.
+
+    Args:
+        values (list[float]): The values.
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(seconds) -> dict:
+    """
+    Summarize durations in seconds as p50/p95/p99, mean and max in milliseconds.
+    """
+    return {
+        "p50": percentile(seconds, 50) * 1000,
+        "p95": percentile(seconds, 95) * 1000,
+        "p99": percentile(seconds, 99) * 1000,
+        "mean": sum(seconds) / len(seconds) * 1000 if seconds else 0.0,
+        "max": max(seconds) * 1000 if seconds else 0.0,
+    }
+
+
+class LoadBenchmark:
+    """
+    Drives LLM calls at a fixed concurrency against an OpenRouter compatible endpoint, usually a
+    MockOpenRouterServer, and reports latency percentiles, throughput and spend.
+
+    Targets:
+    - 'generate': GPTModel.generate
+    - 'stream': GPTModel.stream, read to the end, also reporting time to first token
+    - 'layers': execute() of each of the six layers in turn, as configured in config.ini
+    """
+
+    TARGETS = ("generate", "stream", "layers")
+
+    def __init__(self, base_url: str, target: str = "generate", concurrency: int = 8, requests: int = 100,
+                 budget: float = 100.0, model: GPTModel | None = None):
+        """
+        Initialize the LoadBenchmark.
+
+        Args:
+            base_url (str): The API base URL to send requests to, e.g. MockOpenRouterServer.base_url.
+            target (str): What to drive, one of 'generate', 'stream' or 'layers'.
+            concurrency (int): The number of calls in flight at once.
+            requests (int): The total number of calls to make.
+            budget (float): The budget the 'generate' and 'stream' targets spend from.
+            model (GPTModel): The model the 'generate' and 'stream' targets drive, a plain GPTModel by default.
+        """
+        if target not in self.TARGETS:
+            raise ValueError(f"target must be one of {self.TARGETS}, got '{target}'.")
+        self.base_url = base_url
+        self.target = target
+        self.concurrency = concurrency
+        self.requests = requests
+        self.budget = budget
+        self.model = model
+        self.messages = [{"role": "user", "content": "Summarise the project initiation phase."}]
+
+    def _build_layers(self):
+        from layers import (AspirationalLayer, GlobalStrategyLayer, AgentModelLayer, ExecutiveFunctionLayer,
+                            CognitiveControlLayer, TaskProsecutionLayer)
+
+        layers = [AspirationalLayer(), GlobalStrategyLayer(), AgentModelLayer(), ExecutiveFunctionLayer(),
+                  CognitiveControlLayer(), TaskProsecutionLayer()]
+        for layer in layers:
+            layer.GPTModel.client = OpenRouterModel(base_url=self.base_url,
+                                                    max_tokens=layer.GPTModel.max_output_tokens)
+        return layers
+
+    def _prepare(self):
+        """
+        Build the call to benchmark.
+
+        Returns:
+            tuple: A callable making call i and returning its time to first token (or None), and a callable
+            returning the spend so far.
+        """
+        if self.target == "layers":
+            layers = self._build_layers()
+            currencies = [layer.resources.get_resource("CurrencyResource") for layer in layers]
+            currencies = [currency for currency in currencies if currency]
+            starting = [currency.budget for currency in currencies]
+
+            def call(i):
+                if layers[i % len(layers)].execute() is None:
+                    raise RuntimeError(f"{layers[i % len(layers)].name} produced no result")
+
+            return call, lambda: sum(start - currency.budget for start, currency in zip(starting, currencies))
+
+        model = self.model or GPTModel()
+        model.client = OpenRouterModel(base_url=self.base_url, max_tokens=model.max_output_tokens)
+        currency = CurrencyResource(budget=self.budget)
+
+        if self.target == "generate":
+            def call(i):
+                model.generate(self.messages, currency)
+        else:
+            def call(i):
+                with model.stream(self.messages, currency) as stream:
+                    for _ in stream:
+                        pass
+                if not stream.metrics.completed:
+                    raise RuntimeError("stream ended early")
+                return stream.metrics.time_to_first_token
+
+        return call, lambda: self.budget - currency.budget
+
+    def run(self) -> dict:
+        """
+        Run the benchmark.
+
+        Returns:
+            dict: The report, with counts, duration, throughput in successful calls per second, latency (and for
+            streams time to first token) percentiles in milliseconds, spend in USD and the first few errors.
+        """
+        call, spent = self._prepare()
+        latencies, ttfts, errors = [], [], []
+        lock = threading.Lock()
+
+        def timed(i):
+            start = time.perf_counter()
+            try:
+                ttft = call(i)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                return
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if ttft is not None:
+                    ttfts.append(ttft)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(timed, range(self.requests)))
+        duration = time.perf_counter() - start
+
+        report = {
+            "target": self.target,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "succeeded": len(latencies),
+            "failed": len(errors),
+            "duration_s": duration,
+            "throughput_rps": len(latencies) / duration if duration else 0.0,
+            "latency_ms": summarize(latencies),
+            "spend_usd": spent(),
+            "errors": [repr(e) for e in errors[:5]],
+        }
+        if self.target == "stream":
+            report["ttft_ms"] = summarize(ttfts)
+        return report
+
+
+def format_report(report: dict) -> str:
+    """
+    Format a LoadBenchmark report for the terminal.
+    """
+    lines = [
+        f"target={report['target']} concurrency={report['concurrency']} requests={report['requests']}",
+        f"succeeded={report['succeeded']} failed={report['failed']} duration={report['duration_s']:.2f}s "
+        f"throughput={report['throughput_rps']:.2f} req/s spend=${report['spend_usd']:.4f}",
+    ]
+    for name in ("latency_ms", "ttft_ms"):
+        if name in report:
+            stats = report[name]
+            lines.append(f"{name}: p50={stats['p50']:.1f} p95={stats['p95']:.1f} p99={stats['p99']:.1f} "
+                         f"mean={stats['mean']:.1f} max={stats['max']:.1f}")
+    for error in report["errors"]:
+        lines.append(f"error: {error}")
+    return "\n".join(lines)
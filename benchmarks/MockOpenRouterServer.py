@@ -0,0 +1,196 @@
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+COMPLETIONS_PATH = "/api/v1/chat/completions"
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server.mock
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != COMPLETIONS_PATH:
+            self._send_json(404, {"error": {"code": 404, "message": f"No route for {self.path}"}})
+            return
+        payload = json.loads(body or b"{}")
+        stream = bool(payload.get("stream"))
+        server.record("streams" if stream else "completions")
+
+        time.sleep(server.sample_latency())
+        if server.sample_error():
+            server.record("errors")
+            self._send_json(server.error_status, {"error": {"code": server.error_status,
+                                                            "message": "Mock upstream error"}},
+                            {"Retry-After": str(server.retry_after)} if server.retry_after is not None else {})
+            return
+
+        tokens = server.reply(payload)
+        if stream:
+            self._stream(server, payload, tokens)
+            return
+        time.sleep(len(tokens) / server.tokens_per_second)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in payload.get("messages", []))
+        self._send_json(200, {
+            "id": "mock-completion",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                      "total_tokens": prompt_tokens + len(tokens)},
+        })
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, server, payload, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+        for token in tokens:
+            time.sleep(1 / server.tokens_per_second)
+            chunk = {"model": payload.get("model"), "choices": [{"index": 0, "delta": {"content": token}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # accept bursts of concurrent clients instead of resetting connections
+
+
+class MockOpenRouterServer:
+    """
+    A local stand-in for the OpenRouter chat completions endpoint, so benchmarks cost nothing.
+
+    Each request waits for a latency drawn from the configured distribution (the time to first token), then produces
+    reply_tokens tokens at tokens_per_second, streamed as server-sent events when the request asks to stream. A
+    fraction error_rate of requests fail with error_status instead. Point OpenRouterModel at it with base_url, or by
+    setting OPENROUTER_BASE_URL to MockOpenRouterServer.base_url.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "lognormal", latency_ms: float = 200,
+                 latency_sigma: float = 0.5, tokens_per_second: float = 50, reply_tokens: int = 20,
+                 error_rate: float = 0.0, error_status: int = 503, retry_after: float | None = None,
+                 seed: int | None = None):
+        """
+        Initialize the MockOpenRouterServer.
+
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port to listen on, 0 picks a free one.
+            latency (str): The latency distribution, one of 'fixed', 'uniform' or 'lognormal'.
+            latency_ms (float): The median latency in milliseconds.
+            latency_sigma (float): The spread, the sigma of a lognormal or the relative half-width of a uniform.
+            tokens_per_second (float): How fast reply tokens are produced.
+            reply_tokens (int): How many tokens each reply has.
+            error_rate (float): The fraction of requests that fail.
+            error_status (int): The HTTP status failed requests answer with.
+            retry_after (float): The Retry-After header sent with failures, if any.
+            seed (int): Seeds the latency and error sampling for repeatable runs.
+        """
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency must be one of {LATENCY_DISTRIBUTIONS}, got '{latency}'.")
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+
+        self.counts = {"completions": 0, "streams": 0, "errors": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def record(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def sample_latency(self) -> float:
+        """
+        Draw the latency of one request.
+
+        Returns:
+            float: The latency in seconds.
+        """
+        median = self.latency_ms / 1000
+        with self._lock:
+            if self.latency == "fixed":
+                return median
+            if self.latency == "uniform":
+                return self._random.uniform(median * (1 - self.latency_sigma), median * (1 + self.latency_sigma))
+            return self._random.lognormvariate(math.log(median), self.latency_sigma) if median > 0 else 0.0
+
+    def sample_error(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def reply(self, payload) -> list[str]:
+        """
+        Build the reply to a request, as a list of tokens.
+        """
+        return [(" " if i else "") + WORDS[i % len(WORDS)] for i in range(self.reply_tokens)]
+
+    def start(self):
+        """
+        Start serving on a background thread.
+
+        Returns:
+            MockOpenRouterServer: The started server.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the listening socket.
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
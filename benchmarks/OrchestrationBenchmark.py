@@ -0,0 +1,287 @@
+import asyncio
+import platform
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+
+from layers import (AspirationalLayer, GlobalStrategyLayer, AgentModelLayer, ExecutiveFunctionLayer,
+                    CognitiveControlLayer, TaskProsecutionLayer, Message, MessageType)
+from orchestration import CognitiveArchitecture, LayerHierarchy
+
+from .LoadBenchmark import summarize
+
+
+class StubGPTModel:
+    """
+    Stands in for a layer's GPTModel, answering every call at once and for free, so a benchmark measures the
+    orchestration around the calls rather than the calls.
+    """
+
+    def __init__(self, reply: str = "ok"):
+        self.reply = reply
+        self.calls = 0
+
+    def generate(self, messages, currency_resource=None):
+        self.calls += 1
+        return self.reply
+
+    async def agenerate(self, messages, currency_resource=None):
+        return self.generate(messages, currency_resource)
+
+
+class _Relay:
+    # Stamps each message with the layer and time it was handled at, makes a (stubbed) LLM call and passes it on;
+    # the bottom layer answers, and the answer climbs back up to the outbox
+    bottom = False
+
+    def __init__(self):
+        super().__init__()
+        self.GPTModel = StubGPTModel()
+
+    def handle_from_above(self, data):
+        data.payload.append((self.name, time.perf_counter()))
+        self.GPTModel.generate([{"role": "user", "content": data.type.value}])
+        if self.bottom:
+            self.pass_up(data.reply(MessageType.RESPONSE, data.payload, self.name))
+        else:
+            self.pass_down(data)
+
+    def handle_from_below(self, data):
+        data.payload.append((self.name, time.perf_counter()))
+        self.pass_up(data)
+
+
+# Defined at module level so worker processes started with 'spawn' can unpickle them
+class RelayAspirationalLayer(_Relay, AspirationalLayer):
+    pass
+
+
+class RelayGlobalStrategyLayer(_Relay, GlobalStrategyLayer):
+    pass
+
+
+class RelayAgentModelLayer(_Relay, AgentModelLayer):
+    pass
+
+
+class RelayExecutiveFunctionLayer(_Relay, ExecutiveFunctionLayer):
+    pass
+
+
+class RelayCognitiveControlLayer(_Relay, CognitiveControlLayer):
+    pass
+
+
+class RelayTaskProsecutionLayer(_Relay, TaskProsecutionLayer):
+    bottom = True
+
+
+RELAY_CLASSES = {
+    LayerHierarchy.ASPIRATIONAL: RelayAspirationalLayer,
+    LayerHierarchy.GLOBAL_STRATEGY: RelayGlobalStrategyLayer,
+    LayerHierarchy.AGENT_MODEL: RelayAgentModelLayer,
+    LayerHierarchy.EXECUTIVE_FUNCTION: RelayExecutiveFunctionLayer,
+    LayerHierarchy.COGNITIVE_CONTROL: RelayCognitiveControlLayer,
+    LayerHierarchy.TASK_PROSECUTION: RelayTaskProsecutionLayer,
+}
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class OrchestrationBenchmark:
+    """
+    Measures the overhead of CognitiveArchitecture itself: building the layers, the hops between them, their logging
+    and state updates, with every layer's GPTModel replaced by a StubGPTModel.
+
+    Each message goes in on the inbox, down through all six layers, is answered by the task prosecution layer and
+    comes back up to the outbox: eleven hops between layers, plus one onto and one off the edge queues. Each layer
+    stamps the message with the time it handled it, giving the latency of every hop. time.perf_counter() is
+    system-wide on Linux, so the stamps compare across worker processes too.
+
+    Modes:
+    - 'threads': a thread per layer, the default CognitiveArchitecture
+    - 'asyncio': every layer a coroutine on one event loop
+    - 'processes': a worker process per layer
+    """
+
+    MODES = ("threads", "asyncio", "processes")
+
+    def __init__(self, mode: str = "threads", messages: int = 1000, in_flight: int = 64, architectures: int = 3,
+                 timeout: float = 30.0):
+        """
+        Initialize the OrchestrationBenchmark.
+
+        Args:
+            mode (str): How the layers run, one of 'threads', 'asyncio' or 'processes'.
+            messages (int): The number of messages to send down and back up the layers.
+            in_flight (int): The most messages in the layers at once. Keep it below the [LayerQueue] maxsize, or
+                messages may be shed.
+            architectures (int): The number of architectures built to measure the memory each takes.
+            timeout (float): The longest wait in seconds for any one answer.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}, got '{mode}'.")
+        self.mode = mode
+        self.messages = messages
+        self.in_flight = in_flight
+        self.architectures = architectures
+        self.timeout = timeout
+
+    def _build(self, warm: bool = True) -> CognitiveArchitecture:
+        # Layers are built on first use, so a cold architecture is only its queues; warm_up() builds the layers
+        architecture = CognitiveArchitecture(asynchronous=self.mode == "asyncio", processes=self.mode == "processes",
+                                             layer_classes=RELAY_CLASSES)
+        if warm:
+            architecture.warm_up()
+        return architecture
+
+    @staticmethod
+    def _message() -> Message:
+        return Message(MessageType.REQUEST, [("inbox", time.perf_counter())], source="benchmark")
+
+    def _drive(self, send, receive) -> list:
+        """Keep in_flight messages in the layers until all have been answered, returning the stamped answers."""
+        answers, sent = [], 0
+        while len(answers) < self.messages:
+            while sent < self.messages and sent - len(answers) < self.in_flight:
+                send(self._message())
+                sent += 1
+            answer = receive()
+            answer.payload.append(("outbox", time.perf_counter()))
+            answers.append(answer)
+        return answers
+
+    def _run_threads(self, architecture):
+        started = time.perf_counter()
+        architecture.start_execution(wait=False)
+        try:
+            receive = lambda: architecture.outbox.get(timeout=self.timeout)
+            architecture.inbox.put_nowait(self._message())
+            receive()  # the first answer shows the layers are up
+            first_answer = time.perf_counter() - started
+
+            started = time.perf_counter()
+            answers = self._drive(architecture.inbox.put_nowait, receive)
+            return first_answer, time.perf_counter() - started, answers
+        finally:
+            architecture.stop_execution(timeout=self.timeout)
+
+    async def _run_asyncio(self, architecture):
+        started = time.perf_counter()
+        await architecture.astart_execution(wait=False)
+        try:
+            inbox, outbox = architecture.inbox, architecture.outbox
+            inbox.put_nowait(self._message())
+            await asyncio.wait_for(outbox.get(), self.timeout)
+            first_answer = time.perf_counter() - started
+
+            started = time.perf_counter()
+            answers, sent = [], 0
+            while len(answers) < self.messages:
+                while sent < self.messages and sent - len(answers) < self.in_flight:
+                    inbox.put_nowait(self._message())
+                    sent += 1
+                answer = await asyncio.wait_for(outbox.get(), self.timeout)
+                answer.payload.append(("outbox", time.perf_counter()))
+                answers.append(answer)
+            return first_answer, time.perf_counter() - started, answers
+        finally:
+            await architecture.astop_execution()
+
+    def _memory_per_architecture(self, warm: bool = True) -> int | None:
+        """
+        The bytes allocated building one architecture, with all its layers if warm or only its queues if not,
+        averaged over several; None for worker processes.
+        """
+        if self.mode == "processes" or self.architectures < 1:
+            return None
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            architectures = [self._build(warm) for _ in range(self.architectures)]
+            allocated = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        del architectures
+        return allocated // self.architectures
+
+    def run(self) -> dict:
+        """
+        Run the benchmark.
+
+        Returns:
+            dict: The report: the mode and settings, the commit benchmarked, startup time in seconds (building the
+            architecture with all its layers, then starting it until the first answer arrives, along with the time
+            to build the architecture alone, its layers being built on first use), messages per second (answered
+            messages and hops between layers), round trip and per-hop latency percentiles in milliseconds, and the
+            memory allocated per architecture in bytes with all its layers and without (None in 'processes' mode,
+            where the layers are built in the workers).
+        """
+        started = time.perf_counter()
+        architecture = self._build(warm=False)
+        construct_cold = time.perf_counter() - started
+        architecture.warm_up()
+        construct = time.perf_counter() - started
+
+        if self.mode == "asyncio":
+            first_answer, duration, answers = asyncio.run(self._run_asyncio(architecture))
+        else:
+            first_answer, duration, answers = self._run_threads(architecture)
+
+        round_trips, all_hops, hops = [], [], defaultdict(list)
+        for answer in answers:
+            stamps = answer.payload
+            round_trips.append(stamps[-1][1] - stamps[0][1])
+            for (source, sent), (target, arrived) in zip(stamps, stamps[1:]):
+                hops[f"{source}->{target}"].append(arrived - sent)
+                all_hops.append(arrived - sent)
+
+        return {
+            "benchmark": "orchestration",
+            "mode": self.mode,
+            "messages": self.messages,
+            "in_flight": self.in_flight,
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "timestamp": time.time(),
+            "startup_s": {"construct": construct, "construct_cold": construct_cold, "first_answer": first_answer,
+                          "total": construct + first_answer},
+            "duration_s": duration,
+            "messages_per_s": len(answers) / duration if duration else 0.0,
+            "hops_per_s": len(all_hops) / duration if duration else 0.0,
+            "round_trip_ms": summarize(round_trips),
+            "hop_ms": summarize(all_hops),
+            "hops": {hop: summarize(seconds) for hop, seconds in hops.items()},
+            "memory_per_architecture_bytes": self._memory_per_architecture(),
+            "memory_per_cold_architecture_bytes": self._memory_per_architecture(warm=False),
+        }
+
+
+def format_orchestration_report(report: dict) -> str:
+    """
+    Format an OrchestrationBenchmark report for the terminal.
+    """
+    memory, cold_memory = report["memory_per_architecture_bytes"], report["memory_per_cold_architecture_bytes"]
+    lines = [
+        f"mode={report['mode']} messages={report['messages']} in_flight={report['in_flight']} "
+        f"commit={report['commit']}",
+        f"startup={report['startup_s']['total'] * 1000:.1f}ms (construct={report['startup_s']['construct'] * 1000:.1f}"
+        f"ms cold={report['startup_s']['construct_cold'] * 1000:.1f}ms "
+        f"first_answer={report['startup_s']['first_answer'] * 1000:.1f}ms) "
+        f"memory/architecture={'n/a' if memory is None else f'{memory / 1024:.0f} KiB'} "
+        f"(cold={'n/a' if cold_memory is None else f'{cold_memory / 1024:.0f} KiB'})",
+        f"duration={report['duration_s']:.2f}s throughput={report['messages_per_s']:.1f} msg/s "
+        f"({report['hops_per_s']:.1f} hops/s)",
+    ]
+    for name, stats in [("round_trip_ms", report["round_trip_ms"]), ("hop_ms", report["hop_ms"]),
+                        *report["hops"].items()]:
+        lines.append(f"{name}: p50={stats['p50']:.2f} p95={stats['p95']:.2f} p99={stats['p99']:.2f} "
+                     f"mean={stats['mean']:.2f} max={stats['max']:.2f}")
+    return "\n".join(lines)
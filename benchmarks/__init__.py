@@ -0,0 +1,9 @@
+from .LoadBenchmark import LoadBenchmark, format_report, percentile
+from .MockOpenRouterServer import MockOpenRouterServer
+
+__all__ = [
+    "LoadBenchmark",
+    "MockOpenRouterServer",
+    "format_report",
+    "percentile",
+]
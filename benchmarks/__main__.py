@@ -0,0 +1,68 @@
+"""
+Benchmark LLM calls offline against a local MockOpenRouterServer.
+
+Run from the project root, e.g.:
+
+    python -m benchmarks --target generate --concurrency 16 --requests 200 --latency-ms 300 --error-rate 0.02
+
+or measure the overhead of the orchestration itself, sending --requests messages down and back up the six layers
+with --concurrency of them in flight and the LLM calls stubbed out:
+
+    python -m benchmarks --target orchestration --mode threads --requests 5000 --output orchestration.json
+"""
+
+import argparse
+import json
+
+from .LoadBenchmark import LoadBenchmark, format_report
+from .MockOpenRouterServer import LATENCY_DISTRIBUTIONS, MockOpenRouterServer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=LoadBenchmark.TARGETS + ("orchestration",), default="generate")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--budget", type=float, default=100.0)
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=50)
+    parser.add_argument("--reply-tokens", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--mode", choices=("threads", "asyncio", "processes"), default="threads",
+                        help="how the layers run, for --target orchestration")
+    parser.add_argument("--architectures", type=int, default=3,
+                        help="architectures built to measure memory, for --target orchestration")
+    parser.add_argument("--output", help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    if args.target == "orchestration":
+        # Imported here as it builds the layers, which the LLM targets do not need
+        from .OrchestrationBenchmark import OrchestrationBenchmark, format_orchestration_report
+
+        report = OrchestrationBenchmark(mode=args.mode, messages=args.requests, in_flight=args.concurrency,
+                                        architectures=args.architectures).run()
+        print(format_orchestration_report(report))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        return
+
+    with MockOpenRouterServer(latency=args.latency, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                              tokens_per_second=args.tokens_per_second, reply_tokens=args.reply_tokens,
+                              error_rate=args.error_rate, error_status=args.error_status, seed=args.seed) as server:
+        report = LoadBenchmark(server.base_url, target=args.target, concurrency=args.concurrency,
+                               requests=args.requests, budget=args.budget).run()
+        report["server"] = dict(server.counts)
+
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
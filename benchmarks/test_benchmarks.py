@@ -0,0 +1,127 @@
+import json
+
+import pytest
+import requests
+from unittest.mock import patch
+
+from benchmarks import LoadBenchmark, MockOpenRouterServer, percentile
+from benchmarks.__main__ import main
+from benchmarks.OrchestrationBenchmark import OrchestrationBenchmark
+from reasoning_engines import GPTModel, OpenRouterModel, TokenCounter
+
+
+class WordEncoding:
+    """Stand-in tiktoken encoding that counts whitespace separated words."""
+
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture(autouse=True)
+def offline_pricing():
+    with patch.object(GPTModel, "measure_tokens", return_value=(10, 0.01)), \
+            patch.object(TokenCounter, "encoding_for", return_value=WordEncoding()):
+        yield
+
+
+def test_percentile_interpolates_between_ranks():
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4], 50) == pytest.approx(2.5)
+    assert percentile(list(range(101)), 99) == pytest.approx(99)
+
+
+def test_mock_server_answers_like_openrouter():
+    with MockOpenRouterServer(latency="fixed", latency_ms=0, tokens_per_second=1000, reply_tokens=3) as server:
+        response = requests.post(server.url, json={"model": "m", "messages": [{"role": "user", "content": "a b"}]})
+        data = response.json()
+        assert data["choices"][0]["message"]["content"] == "lorem ipsum dolor"
+        assert data["usage"] == {"prompt_tokens": 2, "completion_tokens": 3, "total_tokens": 5}
+        assert requests.post(server.base_url + "/models", json={}).status_code == 404
+
+
+def test_openrouter_model_streams_from_mock_server():
+    with MockOpenRouterServer(latency="fixed", latency_ms=0, tokens_per_second=1000, reply_tokens=4) as server:
+        client = OpenRouterModel(base_url=server.base_url)
+        assert "".join(client.stream("m", [{"role": "user", "content": "hi"}])) == "lorem ipsum dolor sit"
+        assert server.counts["streams"] == 1
+
+
+def test_base_url_can_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_BASE_URL", "http://localhost:1234/api/v1/")
+    assert OpenRouterModel().url == "http://localhost:1234/api/v1/chat/completions"
+
+
+def test_generate_benchmark_reports_latency_throughput_and_spend():
+    with MockOpenRouterServer(latency="fixed", latency_ms=50, tokens_per_second=1000, reply_tokens=5) as server:
+        report = LoadBenchmark(server.base_url, concurrency=4, requests=8).run()
+
+    assert report["succeeded"] == 8 and report["failed"] == 0
+    assert report["latency_ms"]["p50"] >= 50
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p95"] <= report["latency_ms"]["p99"]
+    assert report["throughput_rps"] > 0
+    assert report["spend_usd"] == pytest.approx(8 * 0.02)
+
+
+def test_stream_benchmark_reports_time_to_first_token():
+    with MockOpenRouterServer(latency="fixed", latency_ms=20, tokens_per_second=200, reply_tokens=10) as server:
+        report = LoadBenchmark(server.base_url, target="stream", concurrency=2, requests=4).run()
+
+    assert report["succeeded"] == 4
+    assert report["ttft_ms"]["p50"] < report["latency_ms"]["p50"]
+
+
+def test_failed_requests_are_counted():
+    with MockOpenRouterServer(latency="fixed", latency_ms=0, error_rate=1.0, error_status=400) as server:
+        report = LoadBenchmark(server.base_url, concurrency=2, requests=3).run()
+
+    assert report["succeeded"] == 0
+    assert report["failed"] == 3
+    assert "400" in report["errors"][0]
+
+
+def test_layers_benchmark_drives_every_layer():
+    with MockOpenRouterServer(latency="fixed", latency_ms=0, tokens_per_second=1000, reply_tokens=2) as server:
+        report = LoadBenchmark(server.base_url, target="layers", concurrency=3, requests=6).run()
+        sent = server.counts["completions"]
+
+    assert report["succeeded"] == 6
+    # identical prompts in flight together are coalesced by SingleFlight, which splits their cost
+    assert 1 <= sent <= 6
+    assert report["spend_usd"] == pytest.approx(sent * 0.02)
+
+
+def test_cli_writes_json_report(tmp_path, capsys):
+    output = tmp_path / "report.json"
+    main(["--requests", "2", "--concurrency", "2", "--latency", "fixed", "--latency-ms", "0",
+          "--tokens-per-second", "1000", "--output", str(output)])
+
+    assert "throughput=" in capsys.readouterr().out
+    report = json.loads(output.read_text())
+    assert report["succeeded"] == 2
+    assert report["server"]["completions"] == 2
+
+
+@pytest.mark.parametrize("mode", OrchestrationBenchmark.MODES)
+def test_orchestration_benchmark_times_every_hop(mode):
+    report = OrchestrationBenchmark(mode=mode, messages=10, in_flight=4, architectures=1, timeout=20).run()
+
+    assert report["messages_per_s"] > 0
+    assert report["hops_per_s"] == pytest.approx(report["messages_per_s"] * 12)
+    assert len(report["hops"]) == 12
+    assert "TaskProsecutionLayer->CognitiveControlLayer" in report["hops"]
+    assert report["round_trip_ms"]["p50"] >= report["hop_ms"]["p50"]
+    assert report["startup_s"]["total"] >= report["startup_s"]["construct"]
+    assert (report["memory_per_architecture_bytes"] is None) == (mode == "processes")
+    assert report["startup_s"]["construct"] >= report["startup_s"]["construct_cold"]
+
+
+def test_cli_writes_orchestration_report(tmp_path, capsys):
+    output = tmp_path / "orchestration.json"
+    main(["--target", "orchestration", "--requests", "5", "--concurrency", "2", "--architectures", "1",
+          "--output", str(output)])
+
+    assert "msg/s" in capsys.readouterr().out
+    report = json.loads(output.read_text())
+    assert report["mode"] == "threads" and report["memory_per_architecture_bytes"] > 0
+    # the layers are built on first use, so a cold architecture is far smaller than one with all its layers
+    assert report["memory_per_architecture_bytes"] > report["memory_per_cold_architecture_bytes"] > 0
@@ -1,6 +1,7 @@
-import logging
 import pathlib
 
+from telemetry import get_logger, traced
+
 project_root = pathlib.Path(__file__).parent.parent.resolve()
 class Capability:
     """
@@ -22,35 +23,17 @@ class Capability:
         self.storage_root = f"{project_root}/storage/capabilities/{self.name}"
 
         # Set up logging
-        self.logger = logging.getLogger(name)  # Create a logger for this layer
-        self.logger.setLevel(logging.DEBUG)  # Set the logging level
-
-        # Create a console handler
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.DEBUG)
-
-        # Create a file handler
-        fh = logging.FileHandler(f'{project_root}/application.log')
-        fh.setLevel(logging.DEBUG)
-
-        # Create a formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-        # Add the formatter to the console handler
-        ch.setFormatter(formatter)
-
-        # Add the formatter to the file handler
-        fh.setFormatter(formatter)
-
-        # Add the console handler to the logger
-        self.logger.addHandler(ch)
-
-        # Add the file handler to the logger
-        self.logger.addHandler(fh)
+        self.logger = get_logger(name)
 
     def execute(self):
         """
         Execute the capability.
         This method should be overridden by subclasses to provide the specific execution logic.
         """
-        raise NotImplementedError("Subclasses should implement this method.")
\ No newline at end of file
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def __init_subclass__(cls, **kwargs):
+        # Record a span for each run of a capability while tracing is enabled
+        super().__init_subclass__(**kwargs)
+        if "execute" in cls.__dict__:
+            cls.execute = traced(f"{cls.__name__}.execute")(cls.execute)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from .CognitiveLayer import CognitiveLayer
+from .Message import MessageType
 from resource_manager import CurrencyResource
 
 class AgentModelLayer(CognitiveLayer):
@@ -33,15 +34,16 @@ class AgentModelLayer(CognitiveLayer):
 
         self.predict_action("something")
 
-        currency = self.resources.get_resource("CurrencyResource")
-        if currency and currency.budget > 0:
-            messages = [{"role": "user", "content": "something"}]
-            result = self.GPTModel.generate(messages, currency)
-        else:
-            self.logger.warning("Insufficient funds for model call")
-            result = None
+        return self._generate([{"role": "user", "content": "something"}])
 
-        return result
+    async def aexecute(self):
+        self.process_input("something")
+
+        self.update_beliefs("something")
+
+        self.predict_action("something")
+
+        return await self._agenerate([{"role": "user", "content": "something"}])
 
     def update_beliefs(self, new_information):
         # Update the beliefs based on new information
@@ -53,7 +55,7 @@ class AgentModelLayer(CognitiveLayer):
 
     def pass_up_beliefs(self):
         beliefs = self.get_beliefs()
-        self.pass_up(beliefs)
+        self.pass_up(self.envelope(MessageType.REPORT, beliefs))
 
     def receive_feedback_from_above(self):
         feedback = self.receive_from_above()
@@ -62,7 +64,7 @@ class AgentModelLayer(CognitiveLayer):
             # Update beliefs based on feedback
 
     def pass_down_request(self, request):
-        self.pass_down(request)
+        self.pass_down(self.envelope(MessageType.REQUEST, request))
 
     def receive_response_from_below(self):
         response = self.receive_from_below()
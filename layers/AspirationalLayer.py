@@ -1,4 +1,6 @@
 from .CognitiveLayer import CognitiveLayer
+from .LayerQueue import Priority
+from .Message import MessageType
 from resource_manager import CurrencyResource
 from capability_manager import EthicalDecisionMakingCapability
 
@@ -43,25 +45,28 @@ class AspirationalLayer(CognitiveLayer):
 
             self.evaluate_action("something")
 
-            currency = self.resources.get_resource("CurrencyResource")
-            if currency and currency.budget > 0:
-                messages = [{"role": "user", "content": "something"}]
-                result = self.GPTModel.generate(messages, currency)
-            else:
-                self.logger.warning("Insufficient funds for model call")
-                result = None
+            return self._generate([{"role": "user", "content": "something"}])
 
-            return result
+        except Exception as e:
+            self.pass_up(self.envelope(MessageType.ERROR, e), Priority.HIGH)
+
+    async def aexecute(self):
+        try:
+            self.process_input("something")
+
+            self.evaluate_action("something")
+
+            return await self._agenerate([{"role": "user", "content": "something"}])
 
         except Exception as e:
-            self.pass_up(f"Error: {str(e)}")
+            await self.apass_up(self.envelope(MessageType.ERROR, e), Priority.HIGH)
 
     def evaluate_action(self, action):
         # Evaluate a proposed action against the system's mission and values
         return True  # Placeholder
 
-    def pass_down_request(self, request):
-        self.pass_down(request)
+    def pass_down_request(self, request, priority=Priority.NORMAL):
+        self.pass_down(self.envelope(MessageType.REQUEST, request), priority)
 
     def receive_response_from_below(self):
         response = self.receive_from_below()
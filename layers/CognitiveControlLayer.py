@@ -1,4 +1,8 @@
 from .CognitiveLayer import CognitiveLayer
+from .Config import load_config
+from .ConcurrencyController import ConcurrencyController
+from .LayerQueue import Priority
+from .Message import MessageType
 from resource_manager import CurrencyResource
 
 
@@ -21,6 +25,10 @@ class CognitiveControlLayer(CognitiveLayer):
         self.control_flow_state = None  # The current control flow state
         self.resources.add_resource(name="CurrencyResource", resource=CurrencyResource(budget=1.5))
 
+        # How many tasks run at once, and which task types and models have been failing too often to keep trying
+        config = load_config()
+        self.concurrency = ConcurrencyController.from_config(config)
+
     def process_input(self, input_data):
         # Some other action specific to this layer
         processed_data = self.GPTModel.process(input_data)
@@ -33,15 +41,16 @@ class CognitiveControlLayer(CognitiveLayer):
 
         self.update_control_flow("something")
 
-        currency = self.resources.get_resource("CurrencyResource")
-        if currency and currency.budget > 0:
-            messages = [{"role": "user", "content": "something"}]
-            result = self.GPTModel.generate(messages, currency)
-        else:
-            self.logger.warning("Insufficient funds for model call")
-            result = None
+        return self._generate([{"role": "user", "content": "something"}])
+
+    async def aexecute(self):
+        self.process_input("something")
+
+        self.make_decision("something")
+
+        self.update_control_flow("something")
 
-        return result
+        return await self._agenerate([{"role": "user", "content": "something"}])
 
     def make_decision(self, input_data):
         # Make a decision based on input data
@@ -52,7 +61,7 @@ class CognitiveControlLayer(CognitiveLayer):
         pass  # Placeholder
 
     def pass_up_decision(self, decision):
-        self.pass_up(decision)
+        self.pass_up(self.envelope(MessageType.REPORT, decision))
 
     def receive_feedback_from_above(self):
         feedback = self.receive_from_above()
@@ -60,19 +69,91 @@ class CognitiveControlLayer(CognitiveLayer):
             print(f"Received feedback from above: {feedback}")  # Update decision-making parameters based on feedback
 
     def pass_down_request(self, request):
-        self.pass_down(request)
+        self.pass_down(self.envelope(MessageType.REQUEST, request))
 
     def receive_response_from_below(self):
         response = self.receive_from_below()
         if response:
             print(f"Received response from below: {response}")  # Handle the response
 
-    def switch_task(self):
-        """This method could be used to switch from one task to another based on various factors such as task
-        priority, progress, and the agent's state."""
-        pass
-
-    def handle_frustration(self):
-        """This method could be used to implement strategies for managing frustration, such as switching tasks or
-        seeking help."""
-        pass
+    def run_task(self, task, task_type: str, *args, model: str | None = None, **kwargs):
+        """
+        Run a task once the concurrency limit allows, recording its outcome and latency to adjust the limit. Tasks
+        run concurrently from several threads share the limit.
+
+        Args:
+            task: The callable to run, called with args and kwargs.
+            task_type (str): The kind of task, e.g. the name of the capability or product it carries out.
+            *args: Positional arguments for task.
+            model (str): The model the task uses, if any. Keyword only, so it is never taken for one of the task's
+                arguments.
+            **kwargs: Keyword arguments for task.
+
+        Returns:
+            The task's result.
+
+        Raises:
+            Exception: Whatever the task raised. If that left the task type and model frustrated,
+                handle_frustration() has been called first.
+        """
+        try:
+            with self.concurrency.slot(task_type, model):
+                return task(*args, **kwargs)
+        except Exception:
+            if self.concurrency.frustrated(task_type, model):
+                self.handle_frustration(task_type, model)
+            raise
+
+    def switch_task(self, task_type: str, model: str | None = None, models=None) -> dict | None:
+        """
+        Choose what to do instead of a task type and model that keeps failing: the same task on the model that has
+        been succeeding most, or failing that a different task.
+
+        Args:
+            task_type (str): The kind of task to switch from.
+            model (str): The model to switch from.
+            models (list): The models to consider, by default those the task type has run on and those of the
+                layer's model router. Models not yet tried are assumed to succeed.
+
+        Returns:
+            dict: The task_type and model to switch to, also set as the control_flow_state, or None if every option
+            is frustrated and the layer should back off.
+        """
+        tasks = self.concurrency.stats()["tasks"]
+        if models is None:
+            models = set(tasks.get(task_type, {}))
+            if self.GPTModel.router is not None:
+                models |= set(self.GPTModel.router.models)
+
+        def health(option):
+            ratio = self.concurrency.success_ratio(*option)
+            return 1.0 if ratio is None else ratio
+
+        options = [(task_type, other) for other in models if other != model]
+        options += [(other_type, other) for other_type, by_model in tasks.items() if other_type != task_type
+                    for other in by_model]
+        options = [option for option in options if not self.concurrency.frustrated(*option)]
+        # Prefer staying on the same task, then the healthiest option
+        options.sort(key=lambda option: (option[0] != task_type, -health(option)))
+        self.control_flow_state = {"task_type": options[0][0], "model": options[0][1]} if options else None
+        return self.control_flow_state
+
+    def handle_frustration(self, task_type: str, model: str | None = None) -> dict | None:
+        """
+        React to a task type and model that keeps failing: choose something else to do (see switch_task) and tell
+        the layer above. The controller has already cut the concurrency limit, shedding load from the failing path.
+
+        Args:
+            task_type (str): The kind of task that is failing.
+            model (str): The model it is failing on.
+
+        Returns:
+            dict: What to switch to, or None to back off.
+        """
+        switch = self.switch_task(task_type, model)
+        self.logger.warning("Frustrated with %s on %s, switching to %s", task_type, model, switch)
+        # Only the latest frustration with each task type and model matters above
+        self.pass_up(self.envelope(MessageType.STATUS, {"frustrated": {"task_type": task_type, "model": model},
+                                                        "switch_to": switch, "limit": self.concurrency.limit}),
+                     Priority.HIGH, conflation_key=(self.name, "frustration", task_type, model))
+        return switch
@@ -18,17 +18,31 @@ ACE model is a creation of Dave Shapiro: https://github.com/daveshap/Benevolent_
 This implementation is authored by Chris Kemplen: https://github.com/Ckemplen/ACE_Model_Implementation/
 """
 
-import configparser
-import logging
+import asyncio
+import contextlib
+import contextvars
+import functools
 import queue
-import pathlib
+import threading
+import time
 
+from reasoning_engines.ContextWindow import ContextWindow
 from reasoning_engines.GPTModels import GPTModel
+from reasoning_engines.Hedging import HedgePolicy
+from reasoning_engines.ModelRouter import ModelRouter
+from reasoning_engines.RateLimiter import RateLimiter
+from reasoning_engines.ResponseCache import ResponseCache
+from reasoning_engines.SingleFlight import SingleFlight
 from capability_manager import CapabilityManager
 from resource_manager import ResourceManager
 from product_manager import ProductManager
+from telemetry import Tracer, current_span, get_logger
+from .Config import load_config
+from .LayerQueue import AsyncLayerQueue, LayerQueue, Priority, STOP
+from .Message import Message, MessageType
 
-project_root = pathlib.Path(__file__).parent.parent.resolve()
+# The correlation id of the message being handled, which messages enveloped while handling it carry on
+_correlation_id = contextvars.ContextVar("correlation_id", default=None)
 
 class CognitiveLayer:
     """
@@ -44,16 +58,21 @@ class CognitiveLayer:
         """
         self.name = name
 
-        self.GPTModel = GPTModel()
-
-        self.up_queue = queue.Queue()
-        self.down_queue = queue.Queue()
+        # up_queue and down_queue carry what the layer passes up and down, from_above and from_below what it receives.
+        # Until the layer is connected to its neighbours (see connect_below) they loop back to the layer itself.
+        self._doorbell = threading.Condition()  # rung whenever a message arrives on either inbound queue
+        self._wakeup = asyncio.Event()  # the same, for AsyncLayerQueue links
+        self.up_queue = self.from_above = LayerQueue()
+        self.down_queue = self.from_below = LayerQueue()
+        self.from_above.add_listener(self._doorbell)
+        self.from_below.add_listener(self._doorbell)
 
         # Read the config file
-        config = configparser.ConfigParser()
-        config.read('config.ini')
+        config = load_config()
         layer_config = config[self.name]
 
+        self.tracer = Tracer.from_config(config)  # records a span for each message the layer handles, if enabled
+
         # Set the layer-specific attributes dynamically based on the keys in the config section
         for key, value in layer_config.items():
             # Split on ', ' if the value is a list
@@ -69,75 +88,326 @@ class CognitiveLayer:
         self.total_cost: float = 0
 
         # Set up logging
-        self.logger = logging.getLogger(name)  # Create a logger for this layer
-        self.logger.setLevel(logging.DEBUG)  # Set the logging level
+        self.logger = get_logger(name)
 
-        # Create a console handler
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.DEBUG)
+    @functools.cached_property
+    def GPTModel(self):
+        """
+        The layer's reasoning engine, built the first time the layer uses it.
+        """
+        config = load_config()
+        return GPTModel(cache=ResponseCache.from_config(config),
+                        single_flight=SingleFlight.from_config(config),
+                        rate_limiter=RateLimiter.from_config(config),
+                        router=ModelRouter.from_config(config),
+                        hedging=HedgePolicy.from_config(config),
+                        context=ContextWindow.from_config(config),
+                        summarize_history=config.getboolean("ContextWindow", "summarize", fallback=False))
 
-        # Create a file handler
-        fh = logging.FileHandler(f'{project_root}/application.log')
-        fh.setLevel(logging.DEBUG)
+    def pass_up(self, data, priority: Priority = Priority.NORMAL, conflation_key=None):
+        """
+        Pass data up to the layer above. When the link is full, what happens depends on its policy: under 'block'
+        this waits for room, for up to the link's block_timeout.
 
-        # Create a formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        Args:
+            data: The data to pass up.
+            priority (Priority): How urgent the data is.
+            conflation_key: Replace data with the same key still waiting to be received, rather than queueing more.
+
+        Raises:
+            queue.Full: If the link rejected the data, or no room was made in time.
+        """
+        self.logger.debug("Passed up data: %r", data)
+        self._stamp(data)
+        self._put(self.up_queue, data, priority, conflation_key)
 
-        # Add the formatter to the console handler
-        ch.setFormatter(formatter)
+    def pass_down(self, data, priority: Priority = Priority.NORMAL, conflation_key=None):
+        """
+        Pass data down to the layer below, waiting for room on a full link under the 'block' policy as pass_up()
+        does.
 
-        # Add the formatter to the file handler
-        fh.setFormatter(formatter)
+        Args:
+            data: The data to pass down.
+            priority (Priority): How urgent the data is.
+            conflation_key: Replace data with the same key still waiting to be received, rather than queueing more.
 
-        # Add the console handler to the logger
-        self.logger.addHandler(ch)
+        Raises:
+            queue.Full: If the link rejected the data, or no room was made in time.
+        """
+        self.logger.debug("Passed down data: %r", data)
+        self._stamp(data)
+        self._put(self.down_queue, data, priority, conflation_key)
 
-        # Add the file handler to the logger
-        self.logger.addHandler(fh)
+    @staticmethod
+    def _put(link, data, priority, conflation_key):
+        if isinstance(link, AsyncLayerQueue):
+            # Waiting here would block the event loop, so a full link raises asyncio.QueueFull: coroutines use
+            # apass_up() and apass_down() to wait for room instead
+            link.put_nowait(data, priority, conflation_key)
+        else:
+            link.put(data, priority, conflation_key=conflation_key)
 
-    def pass_up(self, data):
+    async def apass_up(self, data, priority: Priority = Priority.NORMAL, conflation_key=None):
         """
-        Pass data up to the layer above.
+        Pass data up to the layer above from a coroutine, awaiting room on a full link under the 'block' policy.
 
         Args:
             data: The data to pass up.
+            priority (Priority): How urgent the data is.
+            conflation_key: Replace data with the same key still waiting to be received, rather than queueing more.
         """
-        self.logger.debug(f"Passed up data: {data}")
-        self.up_queue.put(data)
+        self.logger.debug("Passed up data: %r", data)
+        self._stamp(data)
+        await self._aput(self.up_queue, data, priority, conflation_key)
 
-    def pass_down(self, data):
+    async def apass_down(self, data, priority: Priority = Priority.NORMAL, conflation_key=None):
         """
-        Pass data down to the layer below.
+        Pass data down to the layer below from a coroutine, awaiting room on a full link under the 'block' policy.
 
         Args:
             data: The data to pass down.
+            priority (Priority): How urgent the data is.
+            conflation_key: Replace data with the same key still waiting to be received, rather than queueing more.
         """
-        self.logger.debug(f"Passed down data: {data}")
-        self.down_queue.put(data)
+        self.logger.debug("Passed down data: %r", data)
+        self._stamp(data)
+        await self._aput(self.down_queue, data, priority, conflation_key)
+
+    @staticmethod
+    async def _aput(link, data, priority, conflation_key):
+        if isinstance(link, AsyncLayerQueue):
+            await link.put(data, priority, conflation_key=conflation_key)
+        else:
+            link.put(data, priority, conflation_key=conflation_key)
+
+    def envelope(self, type: MessageType, payload=None, correlation_id: str | None = None) -> Message:
+        """
+        Wrap a payload in a Message sent by this layer.
+
+        Args:
+            type (MessageType): What the message is for.
+            payload: The content, passed by reference.
+            correlation_id (str): The commission the message belongs to, by default that of the message being
+                handled, or a new one.
 
-    def receive_from_above(self):
+        Returns:
+            Message: The message.
+        """
+        return Message(type, payload, source=self.name, correlation_id=correlation_id or _correlation_id.get())
+
+    def _stamp(self, data):
+        # Note which span sent a message and when, so the receiving layer can record the hop as its child
+        if self.tracer is not None and isinstance(data, Message):
+            span = current_span()
+            data.span_id = span.span_id if span is not None else None
+            data.sent = time.time()
+
+    @contextlib.contextmanager
+    def _handling(self, data, direction: str):
+        # Carry a message's correlation id while it is handled and, when tracing, record its time queued and the
+        # time taken to handle it
+        if not isinstance(data, Message):
+            yield
+            return
+        token = _correlation_id.set(data.correlation_id)
+        try:
+            if self.tracer is None:
+                yield
+                return
+            if data.sent is not None:
+                self.tracer.record("queue wait", data.sent, layer=self.name, trace_id=data.correlation_id,
+                                   parent_id=data.span_id)
+            with self.tracer.span(f"handle from {direction}", layer=self.name, trace_id=data.correlation_id,
+                                  parent_id=data.span_id, type=data.type.name, source=data.source or ""):
+                yield
+        finally:
+            _correlation_id.reset(token)
+
+    def receive_from_above(self, block: bool = False, timeout: float | None = None):
         """
         Receive data from the layer above.
 
+        Args:
+            block (bool): Wait for data if there is none yet.
+            timeout (float): The longest wait in seconds, None to wait indefinitely.
+
         Returns:
-            The data from the layer above, or None if the up_queue is empty.
+            The data from the layer above, or None if there is none.
         """
-        if not self.up_queue.empty():
-            self.logger.debug(f"Received from above: {self.up_queue.get}")
-            return self.up_queue.get()
-        return None
+        try:
+            data = self.from_above.get(block=True, timeout=timeout) if block else self.from_above.get_nowait()
+        except (queue.Empty, asyncio.QueueEmpty):
+            return None
+        self.logger.debug("Received from above: %r", data)
+        return data
 
-    def receive_from_below(self):
+    def receive_from_below(self, block: bool = False, timeout: float | None = None):
         """
         Receive data from the layer below.
 
+        Args:
+            block (bool): Wait for data if there is none yet.
+            timeout (float): The longest wait in seconds, None to wait indefinitely.
+
         Returns:
-            The data from the layer below, or None if the down_queue is empty.
+            The data from the layer below, or None if there is none.
+        """
+        try:
+            data = self.from_below.get(block=True, timeout=timeout) if block else self.from_below.get_nowait()
+        except (queue.Empty, asyncio.QueueEmpty):
+            return None
+        self.logger.debug("Received from below: %r", data)
+        return data
+
+    def connect_below(self, layer, queue_type=LayerQueue):
+        """
+        Connect the layer to the layer below it, giving each direction of the link its own queue.
+
+        Args:
+            layer (CognitiveLayer): The layer below.
+            queue_type: Creates the link's queues: LayerQueue for layers run in threads, AsyncLayerQueue for layers run
+                on an event loop, or a function returning either, e.g. to apply LayerQueue.from_config().
+        """
+        down, up = queue_type(), queue_type()
+        self.attach(down_queue=down, from_below=up)
+        layer.attach(up_queue=up, from_above=down)
+
+    def attach(self, up_queue=None, down_queue=None, from_above=None, from_below=None):
         """
-        if not self.down_queue.empty():
-            self.logger.debug(f"Received from below: {self.down_queue.get}")
-            return self.down_queue.get()
-        return None
+        Replace any of the layer's queues, listening on the new inbound ones.
+
+        Args:
+            up_queue: The queue to pass data up on.
+            down_queue: The queue to pass data down on.
+            from_above: The queue to receive data from above on.
+            from_below: The queue to receive data from below on.
+        """
+        if up_queue is not None:
+            self.up_queue = up_queue
+        if down_queue is not None:
+            self.down_queue = down_queue
+        for name, inbound in (("from_above", from_above), ("from_below", from_below)):
+            if inbound is not None:
+                setattr(self, name, inbound)
+                inbound.add_listener(self._wakeup if isinstance(inbound, AsyncLayerQueue) else self._doorbell)
+
+    def _next_message(self, handle_from_above, handle_from_below):
+        # One message from each direction in turn, so a busy direction cannot starve the other
+        for inbound, handler, direction in ((self.from_above, handle_from_above, "above"),
+                                            (self.from_below, handle_from_below, "below")):
+            try:
+                yield inbound.get_nowait(), handler, direction
+            except (queue.Empty, asyncio.QueueEmpty):
+                pass
+
+    def main_loop(self, idle_timeout: float | None = None):
+        """
+        Handle messages from the layers above and below until STOP is received.
+
+        The loop sleeps on a condition rung by both inbound queues, so an idle layer uses no CPU.
+
+        Args:
+            idle_timeout (float): Call on_idle() after this many seconds without a message, None to never.
+        """
+        self.logger.debug("Main loop started")
+        while True:
+            with self._doorbell:
+                idle = not self._doorbell.wait_for(
+                    lambda: not (self.from_above.empty() and self.from_below.empty()), idle_timeout)
+            if idle:
+                self.on_idle()
+                continue
+            for data, handler, direction in self._next_message(self.handle_from_above, self.handle_from_below):
+                if data is STOP:
+                    self.logger.debug("Main loop stopped")
+                    return
+                try:
+                    with self._handling(data, direction):
+                        handler(data)
+                except Exception:
+                    self.logger.exception("Failed to handle %r", data)
+
+    async def amain_loop(self, idle_timeout: float | None = None):
+        """
+        Handle messages from the layers above and below until STOP is received, as a coroutine. Used when the layer
+        is connected by AsyncLayerQueue links, so many architectures can share one event loop.
+
+        Args:
+            idle_timeout (float): Call aon_idle() after this many seconds without a message, None to never.
+        """
+        self.logger.debug("Main loop started")
+        while True:
+            if self.from_above.empty() and self.from_below.empty():
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), idle_timeout)
+                except asyncio.TimeoutError:
+                    await self.aon_idle()
+                continue
+            for data, handler, direction in self._next_message(self.ahandle_from_above, self.ahandle_from_below):
+                if data is STOP:
+                    self.logger.debug("Main loop stopped")
+                    return
+                try:
+                    with self._handling(data, direction):
+                        await handler(data)
+                except Exception:
+                    self.logger.exception("Failed to handle %r", data)
+
+    def stop(self):
+        """
+        Make main_loop return once it has handled the messages already received from above.
+        """
+        self.from_above.put_nowait(STOP, Priority.LOW)
+
+    def handle_from_above(self, data):
+        """
+        Handle a message from the layer above. Called by main_loop; subclasses override this to act on directives.
+
+        Args:
+            data: The message.
+        """
+        self.logger.debug("Received from above: %r", data)
+
+    def handle_from_below(self, data):
+        """
+        Handle a message from the layer below. Called by main_loop; subclasses override this to act on feedback.
+
+        Args:
+            data: The message.
+        """
+        self.logger.debug("Received from below: %r", data)
+
+    def on_idle(self):
+        """
+        Called by main_loop when no message has arrived for idle_timeout seconds.
+        """
+
+    async def ahandle_from_above(self, data):
+        """
+        Handle a message from the layer above when running on an event loop. Subclasses override this to make their
+        LLM calls with aexecute() or GPTModel.agenerate, and pass messages on with apass_up() and apass_down(), so a
+        layer waiting on the network or for room on a link does not hold up the loop. Defaults to handle_from_above().
+
+        Args:
+            data: The message.
+        """
+        self.handle_from_above(data)
+
+    async def ahandle_from_below(self, data):
+        """
+        Handle a message from the layer below when running on an event loop. Defaults to handle_from_below().
+
+        Args:
+            data: The message.
+        """
+        self.handle_from_below(data)
+
+    async def aon_idle(self):
+        """
+        Called by amain_loop when no message has arrived for idle_timeout seconds. Defaults to on_idle().
+        """
+        self.on_idle()
 
     def _validate_and_update(self, config_dict):
         """
@@ -187,6 +457,29 @@ class CognitiveLayer:
         """
         raise NotImplementedError("Subclasses must implement execute method.")
 
+    async def aexecute(self):
+        """
+        Execute actions for the layer as a coroutine, as execute() does but awaiting GPTModel.agenerate, so a layer
+        waiting on the network lets the event loop run the other layers and architectures sharing it. Call it from
+        ahandle_from_above() or ahandle_from_below() when running on an event loop.
+        """
+        raise NotImplementedError("Subclasses must implement aexecute method.")
+
+    def _generate(self, messages):
+        # Make an LLM call charged to the layer's CurrencyResource, or none once its budget is spent
+        currency = self.resources.get_resource("CurrencyResource")
+        if not (currency and currency.budget > 0):
+            self.logger.warning("Insufficient funds for model call")
+            return None
+        return self.GPTModel.generate(messages, currency)
+
+    async def _agenerate(self, messages):
+        currency = self.resources.get_resource("CurrencyResource")
+        if not (currency and currency.budget > 0):
+            self.logger.warning("Insufficient funds for model call")
+            return None
+        return await self.GPTModel.agenerate(messages, currency)
+
 
     def review_resouces(self):
         """
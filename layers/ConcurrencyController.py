@@ -0,0 +1,220 @@
+import contextlib
+import threading
+import time
+from collections import deque
+
+
+class _Outcomes:
+    # The recent outcomes of one kind of task on one model
+    def __init__(self, window: int):
+        self.recent = deque(maxlen=window)  # (ok, latency in seconds)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure = None
+
+    def stats(self, frustrated: bool) -> dict:
+        recent = len(self.recent)
+        latencies = sorted(latency for _, latency in self.recent)
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "success_ratio": sum(ok for ok, _ in self.recent) / recent if recent else None,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "consecutive_failures": self.consecutive_failures,
+            "frustrated": frustrated,
+        }
+
+
+class ConcurrencyController:
+    """
+    Sets how many tasks run at once by additive increase, multiplicative decrease (AIMD), as TCP does for packets.
+
+    Every task that succeeds within the latency target raises the limit by increase/limit, about one more task per
+    round of tasks, so throughput keeps growing while the provider copes. A task that fails or is too slow cuts the
+    limit by the decrease factor, once for each round of tasks started before the cut, so a burst of errors backs off
+    quickly without collapsing the limit to its floor.
+
+    Outcomes are also tracked per task type and model. One that fails frustration_threshold times in a row is
+    frustrated: a signal to switch to another model or task rather than keep trying it. Frustration wears off
+    cooldown seconds after the last failure, so the path is tried again once it may have recovered.
+    """
+
+    def __init__(self, initial_limit: float = 4, min_limit: float = 1, max_limit: float = 32, increase: float = 1.0,
+                 decrease: float = 0.5, latency_target: float | None = None, frustration_threshold: int = 5,
+                 cooldown: float = 60.0, window: int = 50):
+        """
+        Initialize the ConcurrencyController.
+
+        Args:
+            initial_limit (float): The number of tasks allowed to run at once to start with.
+            min_limit (float): The lowest the limit is cut to.
+            max_limit (float): The highest the limit is raised to.
+            increase (float): How many tasks the limit is raised by per round of successful tasks.
+            decrease (float): The factor the limit is cut by when a task fails or is too slow.
+            latency_target (float): Seconds a task may take before it counts as a sign of overload, None for no
+                target.
+            frustration_threshold (int): Failures in a row that make a task type and model frustrated.
+            cooldown (float): Seconds after its last failure that a task type and model stays frustrated.
+            window (int): The number of recent outcomes the success ratio and latency of each are measured over.
+        """
+        if not 0 < decrease < 1:
+            raise ValueError(f"decrease must be between 0 and 1, got {decrease}.")
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("ConcurrencyController: need 1 <= min_limit <= initial_limit <= max_limit.")
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.frustration_threshold = frustration_threshold
+        self.cooldown = cooldown
+        self.window = window
+
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+        self._outcomes = {}  # (task type, model) -> _Outcomes
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a controller as set in the [ConcurrencyControl] section of the config, with the frustration_threshold
+        of the [CognitiveControlLayer] section.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            ConcurrencyController: The controller, with the defaults for anything not set.
+        """
+        kwargs = {}
+        if config.has_section("ConcurrencyControl"):
+            section = config["ConcurrencyControl"]
+            for key in ("initial_limit", "min_limit", "max_limit", "increase", "decrease", "latency_target",
+                        "cooldown"):
+                if key in section:
+                    kwargs[key] = section.getfloat(key)
+            if "window" in section:
+                kwargs["window"] = section.getint("window")
+        if config.has_option("CognitiveControlLayer", "frustration_threshold"):
+            kwargs["frustration_threshold"] = config.getint("CognitiveControlLayer", "frustration_threshold")
+        return cls(**kwargs)
+
+    def acquire(self, timeout: float | None = None) -> float:
+        """
+        Wait until another task may start, and count it as running.
+
+        Args:
+            timeout (float): The longest wait in seconds, None to wait indefinitely.
+
+        Returns:
+            float: When the task started, as time.monotonic(), to pass to release().
+
+        Raises:
+            TimeoutError: If no task could start within timeout seconds.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                raise TimeoutError(f"No task could start within {timeout}s: {self.in_flight} running, "
+                                   f"limit {int(self.limit)}.")
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, task_type: str, model: str | None = None, ok: bool = True):
+        """
+        Count a task as finished and record its outcome, adjusting the limit.
+
+        Args:
+            started (float): What acquire() returned for the task.
+            task_type (str): The kind of task.
+            model (str): The model the task used, if any.
+            ok (bool): Whether the task succeeded.
+        """
+        latency = time.monotonic() - started
+        with self._condition:
+            self.in_flight -= 1
+            outcomes = self._outcomes.setdefault((task_type, model), _Outcomes(self.window))
+            outcomes.recent.append((ok, latency))
+            if ok:
+                outcomes.successes += 1
+                outcomes.consecutive_failures = 0
+            else:
+                outcomes.failures += 1
+                outcomes.consecutive_failures += 1
+                outcomes.last_failure = time.monotonic()
+
+            if ok and (self.latency_target is None or latency <= self.latency_target):
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            elif started >= self._last_decrease:
+                # Tasks started before the last cut ran under the old limit, and have been backed off for already
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, task_type: str, model: str | None = None, timeout: float | None = None):
+        """
+        Run a task within the limit, as a context manager: the task fails if the block raises.
+
+        Args:
+            task_type (str): The kind of task.
+            model (str): The model the task uses, if any.
+            timeout (float): The longest wait in seconds to start, None to wait indefinitely.
+        """
+        started = self.acquire(timeout)
+        try:
+            yield
+        except BaseException:
+            self.release(started, task_type, model, ok=False)
+            raise
+        self.release(started, task_type, model, ok=True)
+
+    def frustrated(self, task_type: str, model: str | None = None) -> bool:
+        """
+        Check whether a kind of task on a model has been failing too often to keep trying.
+
+        Args:
+            task_type (str): The kind of task.
+            model (str): The model, if any.
+
+        Returns:
+            bool: Whether it has failed frustration_threshold times in a row, the last within cooldown seconds.
+        """
+        with self._condition:
+            return self._frustrated(self._outcomes.get((task_type, model)))
+
+    def _frustrated(self, outcomes) -> bool:
+        return (outcomes is not None and outcomes.consecutive_failures >= self.frustration_threshold
+                and time.monotonic() - outcomes.last_failure < self.cooldown)
+
+    def success_ratio(self, task_type: str, model: str | None = None) -> float | None:
+        """
+        Get the fraction of the recent tasks of a kind on a model that succeeded.
+
+        Returns:
+            float: The fraction, or None if none have run.
+        """
+        with self._condition:
+            outcomes = self._outcomes.get((task_type, model))
+            if outcomes is None or not outcomes.recent:
+                return None
+            return sum(ok for ok, _ in outcomes.recent) / len(outcomes.recent)
+
+    def stats(self) -> dict:
+        """
+        Get the limit, the tasks running and the outcomes of each kind of task on each model.
+
+        Returns:
+            dict: The limit, tasks in flight and number of cuts, and the successes, failures, recent success ratio,
+            recent median latency in seconds, failures in a row and frustration of each task type, by model.
+        """
+        with self._condition:
+            by_task = {}
+            for (task_type, model), outcomes in self._outcomes.items():
+                by_task.setdefault(task_type, {})[model] = outcomes.stats(self._frustrated(outcomes))
+            return {"limit": self.limit, "in_flight": self.in_flight, "decreases": self.decreases,
+                    "tasks": by_task}
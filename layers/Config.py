@@ -0,0 +1,33 @@
+import configparser
+import os
+import threading
+
+_parsed = {}  # absolute path -> (modification time, ConfigParser)
+_parsed_lock = threading.Lock()
+
+
+def load_config(path: str = 'config.ini') -> configparser.ConfigParser:
+    """
+    Get the parsed config, reading the file only when it is first asked for or has changed since.
+
+    Every layer and the architecture read the same config, so it is parsed once rather than by each of them. The
+    parser returned is shared: read it, but do not change it.
+
+    Args:
+        path (str): The config file, relative to the working directory.
+
+    Returns:
+        configparser.ConfigParser: The parsed config, empty if the file does not exist.
+    """
+    path = os.path.abspath(path)
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except OSError:
+        modified = None
+    with _parsed_lock:
+        cached = _parsed.get(path)
+        if cached is None or cached[0] != modified:
+            config = configparser.ConfigParser()
+            config.read(path)
+            cached = _parsed[path] = (modified, config)
+        return cached[1]
@@ -1,5 +1,9 @@
 from .CognitiveLayer import CognitiveLayer
+from .Config import load_config
+from .LayerQueue import Priority
+from .Message import MessageType
 from resource_manager import CurrencyResource
+from product_manager import ProductScheduler
 import capability_manager
 
 class ExecutiveFunctionLayer(CognitiveLayer):
@@ -20,6 +24,9 @@ class ExecutiveFunctionLayer(CognitiveLayer):
         self.resources.add_resource(name="CurrencyResource", resource=CurrencyResource(budget=1.5))
         self.actions = []  # A list of ongoing actions
 
+        config = load_config()
+        self.product_scheduler = ProductScheduler.from_config(config)  # runs the layer's products in parallel
+
 
 
     def process_input(self, input_data):
@@ -32,17 +39,18 @@ class ExecutiveFunctionLayer(CognitiveLayer):
 
         self.initiate_action("something")
 
-        self.monitor_progress("something")
+        self.monitor_progress()
+
+        return self._generate([{"role": "user", "content": "something"}])
+
+    async def aexecute(self):
+        self.process_input("something")
+
+        self.initiate_action("something")
 
-        currency = self.resources.get_resource("CurrencyResource")
-        if currency and currency.budget > 0:
-            messages = [{"role": "user", "content": "something"}]
-            result = self.GPTModel.generate(messages, currency)
-        else:
-            self.logger.warning("Insufficient funds for model call")
-            result = None
+        self.monitor_progress()
 
-        return result
+        return await self._agenerate([{"role": "user", "content": "something"}])
 
     def initiate_action(self, action):
         # Initiate a new action
@@ -52,9 +60,28 @@ class ExecutiveFunctionLayer(CognitiveLayer):
         # Monitor the progress of ongoing actions
         return {}  # Placeholder
 
-    def pass_up_status(self):
-        status = self.get_status()
-        self.pass_up(status)
+    def execute_products(self, dependencies=None) -> dict:
+        """
+        Execute the layer's products, each once the products it depends on are complete, with independent products
+        running concurrently. The layer above is sent the status of each product as it completes.
+
+        Args:
+            dependencies (dict): The names of the products each product depends on, by name, e.g.
+                INITIATION_DEPENDENCIES, overriding the products' own depends_on.
+
+        Returns:
+            dict: The report of ProductScheduler.run().
+        """
+        def report(name, output):
+            self.pass_up_status({"product": name, "state": "complete"}, task=name)
+
+        return self.products.execute_products(dependencies, self.product_scheduler, on_complete=report)
+
+    def pass_up_status(self, status=None, task=None):
+        # Only the latest status of each task matters above, so a newer one replaces any still waiting there
+        status = status if status is not None else self.monitor_progress()
+        self.pass_up(self.envelope(MessageType.STATUS, status), Priority.LOW,
+                     conflation_key=(self.name, "status", task))
 
     def receive_feedback_from_above(self):
         feedback = self.receive_from_above()
@@ -63,7 +90,7 @@ class ExecutiveFunctionLayer(CognitiveLayer):
             # Update status based on feedback
 
     def pass_down_request(self, request):
-        self.pass_down(request)
+        self.pass_down(self.envelope(MessageType.REQUEST, request))
 
     def receive_response_from_below(self):
         response = self.receive_from_below()
@@ -1,4 +1,5 @@
 from .CognitiveLayer import CognitiveLayer
+from .Message import MessageType
 from resource_manager import CurrencyResource
 
 class GlobalStrategyLayer(CognitiveLayer):
@@ -28,17 +29,18 @@ class GlobalStrategyLayer(CognitiveLayer):
 
         self.update_strategy("something")
 
-        self.generate_plan("something")
+        self.generate_plan()
 
-        currency = self.resources.get_resource("CurrencyResource")
-        if currency and currency.budget > 0:
-            messages = [{"role": "user", "content": "something"}]
-            result = self.GPTModel.generate(messages, currency)
-        else:
-            self.logger.warning("Insufficient funds for model call")
-            result = None
+        return self._generate([{"role": "user", "content": "something"}])
 
-        return result
+    async def aexecute(self):
+        self.process_input("something")
+
+        self.update_strategy("something")
+
+        self.generate_plan()
+
+        return await self._agenerate([{"role": "user", "content": "something"}])
 
     def update_strategy(self, feedback):
         # Update the strategy based on feedback
@@ -50,7 +52,7 @@ class GlobalStrategyLayer(CognitiveLayer):
 
     def pass_up_strategy(self):
         strategy = self.get_strategy()
-        self.pass_up(strategy)
+        self.pass_up(self.envelope(MessageType.REPORT, strategy))
 
     def receive_feedback_from_above(self):
         feedback = self.receive_from_above()
@@ -59,7 +61,7 @@ class GlobalStrategyLayer(CognitiveLayer):
             # Update strategy based on feedback
 
     def pass_down_request(self, request):
-        self.pass_down(request)
+        self.pass_down(self.envelope(MessageType.REQUEST, request))
 
     def receive_response_from_below(self):
         response = self.receive_from_below()
@@ -0,0 +1,420 @@
+import asyncio
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from enum import IntEnum
+
+
+class _Stop:
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "STOP"  # unpickles to this module's STOP, so the sentinel survives crossing processes
+
+    def __repr__(self):
+        return "STOP"
+
+
+# Put on a layer's inbound queue to make its main_loop return once the messages ahead of it are handled
+STOP = _Stop()
+
+
+class Priority(IntEnum):
+    """
+    How urgent a message between layers is. Lower values are handled first.
+    """
+    URGENT = 0  # never blocked, shed or rejected, e.g. an ethics veto from the Aspirational Layer
+    HIGH = 1
+    NORMAL = 2
+    LOW = 3  # e.g. routine status updates
+
+
+POLICIES = ("block", "drop", "reject")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)] if ordered else None
+
+
+class _Backlog:
+    """
+    The messages waiting on a queue, ordered by aged priority, and the queue's metrics.
+
+    A message's priority improves by one level for every aging_seconds it waits. As every waiting message ages at the
+    same rate this only changes how newer messages compare with older ones, so the order can be fixed when a message
+    arrives: by priority + arrival time / aging_seconds.
+
+    A message with a conflation key replaces the waiting message with the same key, if there is one, taking over its
+    place in the queue. Only the latest of a series of updates is delivered, and it is not held back by the updates
+    it replaced.
+    """
+
+    def __init__(self, maxsize: int, policy: str, aging_seconds: float | None, window: int = 1000):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}', expected one of {', '.join(POLICIES)}.")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.aging_seconds = aging_seconds
+
+        self.heap = []  # [key, sequence, priority, arrived, item, conflation key]
+        self.conflatable = {}  # conflation key -> its waiting heap entry
+        self._sequence = itertools.count()
+        self.puts = 0
+        self.gets = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.conflated = 0
+        self.max_depth = 0
+        self._waits = deque(maxlen=window)  # (priority, seconds waited)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _key(self, priority, arrived):
+        return priority + arrived / self.aging_seconds if self.aging_seconds else priority
+
+    def full(self, priority, item=None, conflation_key=None) -> bool:
+        if conflation_key is not None and conflation_key in self.conflatable:
+            return False  # replaces a waiting message, so takes no more room
+        return 0 < self.maxsize <= len(self.heap) and priority > Priority.URGENT and item is not STOP
+
+    def conflate(self, item, priority, conflation_key) -> bool:
+        """
+        Replace the waiting message with the same conflation key and priority, if there is one. Returns whether it
+        was replaced.
+        """
+        entry = self.conflatable.get(conflation_key) if conflation_key is not None else None
+        if entry is None or entry[2] != priority:
+            return False
+        entry[4] = item
+        self.puts += 1
+        self.conflated += 1
+        return True
+
+    def push(self, item, priority, conflation_key=None):
+        arrived = time.monotonic()
+        entry = [self._key(priority, arrived), next(self._sequence), priority, arrived, item, conflation_key]
+        if conflation_key is not None:
+            replaced = self.conflatable.get(conflation_key)
+            if replaced is not None:  # queued at another priority, so the new message takes its own place
+                self._remove(self.heap.index(replaced))
+                self.conflated += 1
+            self.conflatable[conflation_key] = entry
+        heapq.heappush(self.heap, entry)
+        self.puts += 1
+        self.max_depth = max(self.max_depth, len(self.heap))
+
+    def _remove(self, index):
+        entry = self.heap[index]
+        self.heap[index] = self.heap[-1]
+        self.heap.pop()
+        heapq.heapify(self.heap)
+        if entry[5] is not None and self.conflatable.get(entry[5]) is entry:
+            del self.conflatable[entry[5]]
+
+    def pop(self):
+        _, _, priority, arrived, item, conflation_key = heapq.heappop(self.heap)
+        if conflation_key is not None:
+            del self.conflatable[conflation_key]
+        self.gets += 1
+        self._waits.append((priority, time.monotonic() - arrived))
+        return item
+
+    def shed(self, priority) -> bool:
+        """
+        Drop the least urgent message to make room for one of the given priority, unless the new message is the
+        least urgent. URGENT messages and STOP are never dropped. Returns whether room was made.
+        """
+        self.dropped += 1
+        victims = [index for index, entry in enumerate(self.heap)
+                   if entry[2] != Priority.URGENT and entry[4] is not STOP]
+        victim = max(victims, key=lambda index: self.heap[index][:2], default=None)
+        if victim is None or self.heap[victim][0] <= self._key(priority, time.monotonic()):
+            return False
+        self._remove(victim)
+        return True
+
+    def stats(self) -> dict:
+        waits = {}
+        for level in Priority:
+            level_waits = [wait for priority, wait in self._waits if priority == level]
+            if level_waits:
+                waits[level.name] = {"mean": sum(level_waits) / len(level_waits),
+                                     "p95": _percentile(level_waits, 95),
+                                     "max": max(level_waits)}
+        return {
+            "depth": len(self.heap),
+            "max_depth": self.max_depth,
+            "maxsize": self.maxsize,
+            "puts": self.puts,
+            "gets": self.gets,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "conflated": self.conflated,
+            "wait": waits,
+        }
+
+
+class LayerQueue:
+    """
+    A thread-safe link between two layers: a priority queue with aging, optionally bounded.
+
+    Messages are taken most urgent first, and in order of arrival within a priority. Waiting raises a message's
+    priority over time (see aging_seconds), so a steady stream of urgent messages cannot starve the rest. When a
+    bounded queue is full, the policy decides what happens to a new message: 'block' waits for room, 'drop' sheds the
+    least urgent message (which may be the new one) and 'reject' raises queue.Full. URGENT messages and STOP are always
+    let in. A message put with a conflation key replaces any waiting message with the same key.
+
+    Besides blocking get() calls, a queue can ring listeners (threading.Condition objects) whenever something is put on
+    it. A layer listens on both of its inbound queues with one condition, so its main_loop sleeps until either has
+    work, without polling.
+    """
+
+    def __init__(self, maxsize: int = 0, policy: str = "block", aging_seconds: float | None = None,
+                 block_timeout: float | None = None):
+        """
+        Initialize the LayerQueue.
+
+        Args:
+            maxsize (int): The most messages the queue holds, 0 for no limit.
+            policy (str): What to do with a message when the queue is full: 'block', 'drop' or 'reject'.
+            aging_seconds (float): The wait after which a message is treated as one priority level more urgent, None
+                for no aging.
+            block_timeout (float): The longest a put() blocks under the 'block' policy before raising queue.Full, None
+                to wait indefinitely.
+        """
+        self._backlog = _Backlog(maxsize, policy, aging_seconds)
+        self.block_timeout = block_timeout
+        self.blocked = 0.0  # total seconds producers spent waiting for room
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+        self._listeners = []
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a queue sized by the [LayerQueue] section of the config.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            LayerQueue: The new queue, unbounded if the section is missing.
+        """
+        if not config.has_section("LayerQueue"):
+            return cls()
+        section = config["LayerQueue"]
+        return cls(maxsize=section.getint("maxsize", fallback=0),
+                   policy=section.get("policy", fallback="block"),
+                   aging_seconds=section.getfloat("aging_seconds", fallback=None),
+                   block_timeout=section.getfloat("block_timeout", fallback=None))
+
+    def add_listener(self, condition: threading.Condition):
+        """
+        Notify condition whenever an item is put on the queue.
+
+        Args:
+            condition (threading.Condition): The condition to notify.
+        """
+        with self._mutex:
+            self._listeners.append(condition)
+
+    def remove_listener(self, condition: threading.Condition):
+        """
+        Stop notifying a condition added with add_listener().
+
+        Args:
+            condition (threading.Condition): The condition.
+        """
+        with self._mutex:
+            self._listeners.remove(condition)
+
+    def put(self, item, priority: Priority = Priority.NORMAL, block: bool = True, timeout: float | None = None,
+            conflation_key=None):
+        """
+        Put an item on the queue.
+
+        Args:
+            item: The item.
+            priority (Priority): How urgent the item is.
+            block (bool): Under the 'block' policy, wait for room if the queue is full.
+            timeout (float): The longest wait in seconds, block_timeout by default.
+            conflation_key: Replace the waiting item with the same key rather than queueing another, e.g. for status
+                updates of which only the latest matters.
+
+        Raises:
+            queue.Full: If the item was rejected, or no room was made in time.
+        """
+        with self._mutex:
+            if self._backlog.conflate(item, priority, conflation_key):
+                return  # already queued, so no need to notify anyone
+            if self._backlog.full(priority, item, conflation_key):
+                if self._backlog.policy == "drop":
+                    if not self._backlog.shed(priority):
+                        return
+                elif self._backlog.policy == "block" and block:
+                    started = time.monotonic()
+                    room = self._not_full.wait_for(lambda: not self._backlog.full(priority, item, conflation_key),
+                                                   timeout if timeout is not None else self.block_timeout)
+                    self.blocked += time.monotonic() - started
+                    if not room:
+                        self._backlog.rejected += 1
+                        raise queue.Full
+                else:
+                    self._backlog.rejected += 1
+                    raise queue.Full
+            self._backlog.push(item, priority, conflation_key)
+            self._not_empty.notify()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            with listener:
+                listener.notify_all()
+
+    def put_nowait(self, item, priority: Priority = Priority.NORMAL, conflation_key=None):
+        self.put(item, priority, block=False, conflation_key=conflation_key)
+
+    def get(self, block: bool = True, timeout: float | None = None):
+        """
+        Take the most urgent item off the queue.
+
+        Args:
+            block (bool): Wait for an item if the queue is empty.
+            timeout (float): The longest wait in seconds, None to wait indefinitely.
+
+        Returns:
+            The item.
+
+        Raises:
+            queue.Empty: If no item is available.
+        """
+        with self._not_empty:
+            if block and not self._not_empty.wait_for(lambda: self._backlog, timeout):
+                raise queue.Empty
+            if not self._backlog:
+                raise queue.Empty
+            item = self._backlog.pop()
+            self._not_full.notify()
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return len(self._backlog)
+
+    def empty(self) -> bool:
+        return not self._backlog
+
+    def stats(self) -> dict:
+        """
+        Report the queue's depth and how long messages waited on it.
+
+        Returns:
+            dict: The current and largest depth, messages put, taken, dropped and rejected, seconds producers were
+            blocked, and the mean, p95 and max seconds waited by recent messages of each priority.
+        """
+        with self._mutex:
+            return {**self._backlog.stats(), "blocked": self.blocked}
+
+
+class AsyncLayerQueue(asyncio.Queue):
+    """
+    An asyncio link between two layers, for architectures whose layers run as coroutines on one event loop. Messages
+    are ordered and bounded as on a LayerQueue, except that put_nowait() cannot block: under the 'block' policy a
+    full queue raises asyncio.QueueFull from put_nowait(), and await put() waits for room.
+
+    put_nowait() sets listeners (asyncio.Event objects), so a layer can wait on both of its inbound queues at once.
+    Like the event loop itself, the queue must only be used from the loop's thread.
+    """
+
+    def __init__(self, maxsize: int = 0, policy: str = "block", aging_seconds: float | None = None):
+        """
+        Initialize the AsyncLayerQueue.
+
+        Args:
+            maxsize (int): The most messages the queue holds, 0 for no limit.
+            policy (str): What to do with a message when the queue is full: 'block', 'drop' or 'reject'.
+            aging_seconds (float): The wait after which a message is treated as one priority level more urgent, None
+                for no aging.
+        """
+        self._backlog = _Backlog(maxsize, policy, aging_seconds)
+        super().__init__()  # unbounded as far as asyncio.Queue knows, the backlog enforces maxsize
+        self._room = asyncio.Event()
+        self._listeners = []
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a queue sized by the [LayerQueue] section of the config.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            AsyncLayerQueue: The new queue, unbounded if the section is missing.
+        """
+        if not config.has_section("LayerQueue"):
+            return cls()
+        section = config["LayerQueue"]
+        return cls(maxsize=section.getint("maxsize", fallback=0),
+                   policy=section.get("policy", fallback="block"),
+                   aging_seconds=section.getfloat("aging_seconds", fallback=None))
+
+    def _init(self, maxsize):
+        self._queue = self._backlog
+
+    def _put(self, entry):
+        self._backlog.push(*entry)
+
+    def _get(self):
+        item = self._backlog.pop()
+        self._room.set()
+        return item
+
+    def add_listener(self, event: asyncio.Event):
+        """
+        Set event whenever an item is put on the queue.
+
+        Args:
+            event (asyncio.Event): The event to set.
+        """
+        self._listeners.append(event)
+
+    def remove_listener(self, event: asyncio.Event):
+        """
+        Stop setting an event added with add_listener().
+
+        Args:
+            event (asyncio.Event): The event.
+        """
+        self._listeners.remove(event)
+
+    async def put(self, item, priority: Priority = Priority.NORMAL, conflation_key=None):
+        while self._backlog.policy == "block" and self._backlog.full(priority, item, conflation_key):
+            self._room.clear()
+            await self._room.wait()
+        self.put_nowait(item, priority, conflation_key)
+
+    def put_nowait(self, item, priority: Priority = Priority.NORMAL, conflation_key=None):
+        if self._backlog.conflate(item, priority, conflation_key):
+            return
+        if self._backlog.full(priority, item, conflation_key):
+            if self._backlog.policy != "drop":
+                self._backlog.rejected += 1
+                raise asyncio.QueueFull
+            if not self._backlog.shed(priority):
+                return
+        super().put_nowait((item, priority, conflation_key))
+        for listener in self._listeners:
+            listener.set()
+
+    def stats(self) -> dict:
+        """
+        Report the queue's depth and how long messages waited on it, see LayerQueue.stats().
+        """
+        return self._backlog.stats()
@@ -0,0 +1,147 @@
+import pickle
+import time
+import uuid
+from enum import Enum
+from multiprocessing import resource_tracker, shared_memory
+
+
+class MessageType(Enum):
+    """
+    What a message between layers is for, so it can be routed without looking at its payload.
+    """
+    REQUEST = "request"  # work asked of the layer below
+    RESPONSE = "response"  # the outcome of a request
+    REPORT = "report"  # beliefs, strategy or decisions passed up
+    STATUS = "status"  # routine progress updates
+    ERROR = "error"
+
+
+class Message:
+    """
+    The envelope layers pass messages in.
+
+    The payload is held by reference: it is never copied or turned into a string on the way, and the envelope's repr
+    leaves it out, so logging a message costs the same whatever it carries. Replies carry the correlation id of the
+    message they answer, so everything to do with one commission can be followed across the layers; with tracing
+    enabled the correlation id is the id of the commission's trace.
+    """
+
+    __slots__ = ("type", "payload", "source", "correlation_id", "timestamp", "span_id", "sent")
+
+    def __init__(self, type: MessageType, payload=None, source: str | None = None, correlation_id: str | None = None,
+                 timestamp: float | None = None):
+        """
+        Initialize the Message.
+
+        Args:
+            type (MessageType): What the message is for.
+            payload: The content, or a BlobHandle for a large one.
+            source (str): The name of the layer that sent the message.
+            correlation_id (str): Identifies the commission the message belongs to, a new one by default.
+            timestamp (float): When the message was created, as time.time(), now by default.
+        """
+        self.type = type
+        self.payload = payload
+        self.source = source
+        self.correlation_id = correlation_id or uuid.uuid4().hex
+        self.timestamp = timestamp or time.time()
+        self.span_id = None  # the span that sent the message, set when tracing
+        self.sent = None  # when the message was put on a queue, set when tracing
+
+    def reply(self, type: MessageType, payload=None, source: str | None = None):
+        """
+        Create a message belonging to the same commission as this one.
+
+        Args:
+            type (MessageType): What the reply is for.
+            payload: The content of the reply.
+            source (str): The name of the layer replying.
+
+        Returns:
+            Message: The reply.
+        """
+        return Message(type, payload, source, self.correlation_id)
+
+    def resolve(self):
+        """
+        Get the payload, fetching it first if it was passed by handle.
+        """
+        return self.payload.resolve() if isinstance(self.payload, BlobHandle) else self.payload
+
+    def __repr__(self):
+        return (f"Message({self.type.name}, {type(self.payload).__name__}, source={self.source}, "
+                f"correlation_id={self.correlation_id})")
+
+
+_UNRESOLVED = object()
+
+
+def _attach(name, size):
+    handle = BlobHandle.__new__(BlobHandle)
+    handle._payload = _UNRESOLVED
+    handle.name = name
+    handle.size = size
+    return handle
+
+
+class BlobHandle:
+    """
+    A large payload passed by handle.
+
+    Within a process the handle simply holds the payload. The first time it is sent to another process the payload is
+    pickled into shared memory, and from then on only the name of the shared memory travels, however many processes
+    the message passes through. A process resolving the handle unpickles the payload once. Call release() when no
+    process needs the payload any more, to free the shared memory.
+    """
+
+    __slots__ = ("_payload", "name", "size")
+
+    def __init__(self, payload):
+        """
+        Initialize the BlobHandle.
+
+        Args:
+            payload: The payload, which must be picklable if it is to reach other processes.
+        """
+        self._payload = payload
+        self.name = None
+        self.size = None
+
+    def resolve(self):
+        """
+        Get the payload.
+        """
+        if self._payload is _UNRESOLVED:
+            segment = shared_memory.SharedMemory(name=self.name)
+            # Attaching registers the segment for clean-up when this process exits, but it belongs to its creator
+            resource_tracker.unregister(segment._name, "shared_memory")
+            try:
+                self._payload = pickle.loads(segment.buf[:self.size])
+            finally:
+                segment.close()
+        return self._payload
+
+    def _share(self):
+        if self.name is None:
+            data = pickle.dumps(self._payload, protocol=pickle.HIGHEST_PROTOCOL)
+            segment = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+            segment.buf[:len(data)] = data
+            self.name, self.size = segment.name, len(data)
+            segment.close()
+        return self.name, self.size
+
+    def __reduce__(self):
+        return _attach, self._share()
+
+    def release(self):
+        """
+        Free the shared memory holding the payload, if it was ever sent to another process.
+        """
+        if self.name is None:
+            return
+        try:
+            segment = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return
+        segment.close()
+        segment.unlink()
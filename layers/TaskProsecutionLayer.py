@@ -1,4 +1,6 @@
 from .CognitiveLayer import CognitiveLayer
+from .LayerQueue import Priority
+from .Message import Message, MessageType
 from resource_manager.built_in_resources import CurrencyResource
 
 
@@ -32,19 +34,23 @@ class TaskProsecutionLayer(CognitiveLayer):
 
             self.initiate_task("something")
 
-            self.monitor_tasks("something")
+            self.monitor_tasks()
 
-            currency = self.resources.get_resource("CurrencyResource")
-            if currency and currency.budget > 0:
-                messages = [{"role": "user", "content": "something"}]
-                result = self.GPTModel.generate(messages, currency)
-            else:
-                self.logger.warning("Insufficient funds for model call")
-                result = None
+            return self._generate([{"role": "user", "content": "something"}])
+        except Exception as e:
+            self.pass_up(self.envelope(MessageType.ERROR, e), Priority.HIGH)
+
+    async def aexecute(self):
+        try:
+            self.process_input("something")
 
-            return result
+            self.initiate_task("something")
+
+            self.monitor_tasks()
+
+            return await self._agenerate([{"role": "user", "content": "something"}])
         except Exception as e:
-            self.pass_up(f"Error: {str(e)}")
+            await self.apass_up(self.envelope(MessageType.ERROR, e), Priority.HIGH)
 
     def initiate_task(self, task):
         # Initiate a new task
@@ -54,9 +60,11 @@ class TaskProsecutionLayer(CognitiveLayer):
         # Monitor the progress of ongoing tasks
         return {}  # Placeholder
 
-    def pass_up_status(self):
-        status = self.get_status()
-        self.pass_up(status)
+    def pass_up_status(self, status=None, task=None):
+        # Only the latest status of each task matters above, so a newer one replaces any still waiting there
+        status = status if status is not None else self.monitor_tasks()
+        self.pass_up(self.envelope(MessageType.STATUS, status), Priority.LOW,
+                     conflation_key=(self.name, "status", task))
 
     def receive_request_from_above(self):
         request = self.receive_from_above()
@@ -64,7 +72,10 @@ class TaskProsecutionLayer(CognitiveLayer):
             print(f"Received request from above: {request}")
             # Execute the requested action and send a response
             response = self.execute(request)
-            self.pass_up(response)
+            if isinstance(request, Message):
+                self.pass_up(request.reply(MessageType.RESPONSE, response, source=self.name))
+            else:
+                self.pass_up(self.envelope(MessageType.RESPONSE, response))
 
     def handle_failure(self):
         pass
@@ -5,6 +5,10 @@ from .ExecutiveFunctionLayer import ExecutiveFunctionLayer
 from .GlobalStrategyLayer import GlobalStrategyLayer
 from .TaskProsecutionLayer import TaskProsecutionLayer
 from .CognitiveLayer import CognitiveLayer
+from .ConcurrencyController import ConcurrencyController
+from .Config import load_config
+from .LayerQueue import AsyncLayerQueue, LayerQueue, Priority, STOP
+from .Message import BlobHandle, Message, MessageType
 
 __all__ = [
     "AgentModelLayer",
@@ -14,4 +18,13 @@ __all__ = [
     "GlobalStrategyLayer",
     "TaskProsecutionLayer",
     "CognitiveLayer",
+    "AsyncLayerQueue",
+    "BlobHandle",
+    "ConcurrencyController",
+    "LayerQueue",
+    "Message",
+    "MessageType",
+    "Priority",
+    "STOP",
+    "load_config",
 ]
@@ -1,7 +1,16 @@
 # test_layers.py
 
+import asyncio
+import configparser
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+
 import pytest
 from layers import AspirationalLayer, GlobalStrategyLayer, AgentModelLayer, ExecutiveFunctionLayer, CognitiveControlLayer, TaskProsecutionLayer
+from layers import AsyncLayerQueue, BlobHandle, ConcurrencyController, LayerQueue, Message, MessageType, Priority
 
 def test_AspirationalLayer_initialization():
     # Test that an AspirationalLayer instance can be created without errors
@@ -59,3 +68,295 @@ def test_CognitiveLayer_methods():
     layer.amend_state(new_state)
     assert layer.mission == "new_mission"
     assert layer.values == ["new_value1", "new_value2"]
+
+def test_CognitiveLayer_main_loop():
+    # Test that main_loop dispatches messages to the handlers, sleeps while idle and returns on stop
+    layer = TaskProsecutionLayer()
+    handled = []
+    layer.handle_from_above = lambda data: handled.append(("above", data))
+    layer.handle_from_below = lambda data: handled.append(("below", data))
+    thread = threading.Thread(target=layer.main_loop, daemon=True)
+    thread.start()
+
+    layer.pass_up("directive")
+    layer.pass_down("feedback")
+    start = time.process_time()
+    time.sleep(0.3)
+    assert time.process_time() - start < 0.1  # idle, not polling
+    layer.stop()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert sorted(handled) == [("above", "directive"), ("below", "feedback")]
+
+def test_CognitiveLayer_receive_blocking():
+    # Test that receive_from_above waits for data when asked to
+    layer = AspirationalLayer()
+    assert layer.receive_from_above() is None
+    assert layer.receive_from_above(block=True, timeout=0.05) is None
+    threading.Timer(0.05, layer.pass_up, args=("late",)).start()
+    assert layer.receive_from_above(block=True, timeout=5) == "late"
+
+def test_CognitiveLayer_pass_up_blocks_on_full_link():
+    # Test that under the 'block' policy pass_up waits for room on a full link, and resumes once it is drained
+    above, below = AspirationalLayer(), GlobalStrategyLayer()
+    above.connect_below(below, lambda: LayerQueue(maxsize=1, policy="block", block_timeout=5))
+    below.pass_up("first")
+    passed = threading.Event()
+    thread = threading.Thread(target=lambda: (below.pass_up("second"), passed.set()), daemon=True)
+    thread.start()
+    assert not passed.wait(0.2)  # blocked on the full link
+    assert above.receive_from_below() == "first"
+    assert passed.wait(5)
+    assert above.receive_from_below() == "second"
+    assert below.up_queue.stats()["blocked"] >= 0.2
+
+    below.up_queue.block_timeout = 0.05
+    below.pass_up("third")
+    with pytest.raises(queue.Full):
+        below.pass_up("fourth")
+
+    async def run():
+        above, below = AspirationalLayer(), GlobalStrategyLayer()
+        above.connect_below(below, lambda: AsyncLayerQueue(maxsize=1, policy="block"))
+        await below.apass_up("first")
+        waiting = asyncio.create_task(below.apass_up("second"))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        assert above.receive_from_below() == "first"
+        await asyncio.wait_for(waiting, 5)
+        assert above.receive_from_below() == "second"
+
+    asyncio.run(run())
+
+def test_LayerQueue_priority_and_aging():
+    # Test that urgent messages jump the backlog, and that aging stops a stream of them starving older messages
+    link = LayerQueue()
+    for n in range(100):
+        link.put(f"status {n}", Priority.LOW)
+    link.put("veto", Priority.URGENT)
+    assert link.get() == "veto"
+    assert link.get() == "status 0"
+
+    aged = LayerQueue(aging_seconds=0.01)
+    aged.put("old", Priority.LOW)
+    time.sleep(0.05)
+    aged.put("new", Priority.HIGH)
+    assert aged.get() == "old"
+
+    stats = link.stats()
+    assert stats["gets"] == 2 and stats["depth"] == 99 and stats["max_depth"] == 101
+    assert set(stats["wait"]) == {"URGENT", "LOW"}
+
+def test_LayerQueue_policies():
+    # Test what happens to a message arriving at a full queue under each policy
+    dropping = LayerQueue(maxsize=2, policy="drop")
+    dropping.put("a", Priority.LOW)
+    dropping.put("b", Priority.NORMAL)
+    dropping.put("c", Priority.HIGH)  # sheds "a"
+    dropping.put("d", Priority.LOW)  # the least urgent, so is shed itself
+    dropping.put("veto", Priority.URGENT)  # always let in
+    assert [dropping.get() for _ in range(3)] == ["veto", "c", "b"]
+    assert dropping.stats()["dropped"] == 2
+
+    aged = LayerQueue(maxsize=2, policy="drop", aging_seconds=10)
+    aged.put("veto", Priority.URGENT)
+    aged.put("old", Priority.LOW)
+    aged.put("new", Priority.HIGH)  # sheds "old", never the veto
+    aged.put("newer", Priority.HIGH)  # only the veto and "new" are left, so it is shed itself
+    assert [aged.get() for _ in range(2)] == ["veto", "new"]
+
+    rejecting = LayerQueue(maxsize=1, policy="reject")
+    rejecting.put("a")
+    with pytest.raises(queue.Full):
+        rejecting.put("b")
+    assert rejecting.stats()["rejected"] == 1
+
+    blocking = LayerQueue(maxsize=1, policy="block", block_timeout=0.05)
+    blocking.put("a")
+    with pytest.raises(queue.Full):
+        blocking.put("b")
+    threading.Timer(0.05, blocking.get).start()
+    blocking.put("c", timeout=5)
+    assert blocking.get() == "c"
+    assert blocking.stats()["blocked"] > 0
+
+    with pytest.raises(ValueError):
+        LayerQueue(policy="spill")
+
+def test_AsyncLayerQueue_policies():
+    # Test that the asyncio queue orders and bounds messages like LayerQueue
+    async def run():
+        link = AsyncLayerQueue(maxsize=2, policy="block")
+        link.put_nowait("a", Priority.LOW)
+        link.put_nowait("b", Priority.HIGH)
+        with pytest.raises(asyncio.QueueFull):
+            link.put_nowait("c")
+        link.put_nowait("veto", Priority.URGENT)
+        assert [await link.get() for _ in range(2)] == ["veto", "b"]
+        waiting = asyncio.create_task(link.put("d"))
+        await link.put("e")  # room for one more, then d waits
+        assert link.qsize() == 2 and not waiting.done()
+        assert await link.get() == "e"
+        await waiting
+        assert [await link.get() for _ in range(2)] == ["d", "a"]
+
+    asyncio.run(run())
+
+def test_Message_envelope():
+    # Test that messages are compact, keep their payload by reference and carry the correlation id on replies
+    layer = ExecutiveFunctionLayer()
+    payload = {"task": "draft the business case", "notes": ["x" * 10000]}
+    request = layer.envelope(MessageType.REQUEST, payload)
+    assert not hasattr(request, "__dict__")
+    assert request.payload is payload and request.source == "ExecutiveFunctionLayer"
+    assert "x" * 100 not in repr(request)
+
+    reply = request.reply(MessageType.RESPONSE, "done", source="TaskProsecutionLayer")
+    assert reply.correlation_id == request.correlation_id and reply.type is MessageType.RESPONSE
+
+    copy = pickle.loads(pickle.dumps(request))
+    assert (copy.type, copy.payload, copy.correlation_id) == (request.type, payload, request.correlation_id)
+
+def _resolve_blob(link, results):
+    message = link.get()
+    results.put((len(message.resolve()), len(pickle.dumps(message))))
+
+def test_BlobHandle_across_processes():
+    # Test that a large payload crosses to another process by handle, and resolves there
+    context = multiprocessing.get_context("fork")
+    link, results = context.Queue(), context.Queue()
+    blob = BlobHandle(b"x" * 1_000_000)
+    message = Message(MessageType.REPORT, blob, source="test")
+    assert message.resolve() is blob.resolve()
+
+    worker = context.Process(target=_resolve_blob, args=(link, results))
+    worker.start()
+    link.put(message)
+    size, pickled_size = results.get(timeout=20)
+    worker.join(timeout=20)
+    blob.release()
+
+    assert size == 1_000_000
+    assert pickled_size < 1000  # only the handle travelled
+
+def test_LayerQueue_conflation():
+    # Test that status updates replace their waiting predecessors, so a slow reader sees one per task
+    link = LayerQueue(maxsize=10, policy="drop")
+    link.put("request")
+    for tick in range(1000):
+        for task in ("a", "b", "c"):
+            link.put((task, tick), Priority.LOW, conflation_key=task)
+    assert link.qsize() == 4
+    assert [link.get() for _ in range(4)] == ["request", ("a", 999), ("b", 999), ("c", 999)]
+    assert link.stats()["conflated"] == 2997
+
+    link.put("old", Priority.LOW, conflation_key="a")
+    link.put("escalated", Priority.HIGH, conflation_key="a")  # takes its own, more urgent, place
+    link.put("other")
+    assert link.qsize() == 2 and link.get() == "escalated"
+
+    # replacing a waiting message at another priority takes no more room, so a full queue still lets it in
+    full = LayerQueue(maxsize=2, policy="reject")
+    full.put("old", Priority.LOW, conflation_key="k")
+    full.put("other")
+    full.put("escalated", Priority.HIGH, conflation_key="k")
+    assert full.qsize() == 2 and full.get() == "escalated"
+
+    layer = TaskProsecutionLayer()
+    for tick in range(50):
+        layer.pass_up_status({"tick": tick}, task="draft")
+        layer.pass_up_status({"tick": tick}, task="review")
+    statuses = [layer.receive_from_above(), layer.receive_from_above(), layer.receive_from_above()]
+    assert [message.payload for message in statuses[:2]] == [{"tick": 49}, {"tick": 49}]
+    assert statuses[2] is None
+
+def test_AsyncLayerQueue_conflation():
+    # Test that the asyncio queue conflates like LayerQueue
+    async def run():
+        link = AsyncLayerQueue()
+        for tick in range(100):
+            link.put_nowait(tick, Priority.LOW, conflation_key="task")
+        await link.put("last", Priority.LOW, conflation_key="task")
+        assert link.qsize() == 1 and await link.get() == "last"
+        link.put_nowait("next", Priority.LOW, conflation_key="task")
+        assert link.qsize() == 1
+
+        full = AsyncLayerQueue(maxsize=2, policy="block")
+        full.put_nowait("old", Priority.LOW, conflation_key="k")
+        full.put_nowait("other")
+        full.put_nowait("escalated", Priority.HIGH, conflation_key="k")
+        await asyncio.wait_for(full.put("again", Priority.NORMAL, conflation_key="k"), 1)
+        assert full.qsize() == 2 and await full.get() == "other"
+
+    asyncio.run(run())
+
+def test_ConcurrencyController_aimd():
+    # Test that the limit grows by about one per round of successes, halves on failure, and halves only once for
+    # failures of tasks started before the cut
+    controller = ConcurrencyController(initial_limit=4, max_limit=8, frustration_threshold=3)
+    for _ in range(4):
+        with controller.slot("draft", "gpt-4"):
+            pass
+    assert 4.9 < controller.limit < 5.0
+
+    started = [controller.acquire() for _ in range(3)]
+    for task in started:
+        controller.release(task, "draft", "gpt-4", ok=False)
+    assert controller.limit == pytest.approx(4.94 / 2, abs=0.05)
+    assert controller.decreases == 1
+    assert controller.frustrated("draft", "gpt-4")
+    assert not controller.frustrated("draft", "gpt-3.5")
+
+    with pytest.raises(ValueError):
+        with controller.slot("draft", "gpt-4"):
+            raise ValueError("provider error")
+    assert controller.decreases == 2 and controller.limit == pytest.approx(1.235, abs=0.05)
+    assert int(controller.limit) == 1
+    controller.acquire()
+    with pytest.raises(TimeoutError):
+        controller.acquire(timeout=0.01)
+
+    stats = controller.stats()
+    assert stats["in_flight"] == 1
+    assert stats["tasks"]["draft"]["gpt-4"]["failures"] == 4
+    assert stats["tasks"]["draft"]["gpt-4"]["success_ratio"] == pytest.approx(0.5)
+
+def test_ConcurrencyController_latency_target_and_config():
+    controller = ConcurrencyController(initial_limit=4, latency_target=0.0)
+    with controller.slot("draft"):
+        time.sleep(0.001)
+    assert controller.limit == 2 and controller.success_ratio("draft") == 1.0
+
+    config = configparser.ConfigParser()
+    config.read_string("[ConcurrencyControl]\nmax_limit = 10\n[CognitiveControlLayer]\nfrustration_threshold = 2")
+    controller = ConcurrencyController.from_config(config)
+    assert controller.max_limit == 10 and controller.frustration_threshold == 2
+
+def test_CognitiveControlLayer_switches_when_frustrated():
+    layer = CognitiveControlLayer()
+    layer.concurrency = ConcurrencyController(frustration_threshold=2)
+    layer.GPTModel.router = None  # only switch between the models tried here
+
+    def failing():
+        raise RuntimeError("503")
+
+    assert layer.run_task(lambda: "ok", "research", model="gpt-3.5") == "ok"
+    research = lambda topic, depth=1: (topic, depth)
+    assert layer.run_task(research, "research", "ai", model="gpt-3.5", depth=2) == ("ai", 2)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            layer.run_task(failing, "research", model="gpt-4")
+
+    assert layer.control_flow_state == {"task_type": "research", "model": "gpt-3.5"}
+    status = layer.receive_from_above()
+    assert status.type is MessageType.STATUS
+    assert status.payload["switch_to"] == {"task_type": "research", "model": "gpt-3.5"}
+    assert layer.receive_from_above() is None  # the second report replaced the first
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            layer.run_task(failing, "research", model="gpt-3.5")
+    assert layer.switch_task("research", "gpt-3.5") is None
+    assert layer.switch_task("research", "gpt-3.5", models=["claude"]) == {"task_type": "research",
+                                                                           "model": "claude"}
@@ -18,121 +18,314 @@ ACE model is a creation of Dave Shapiro: https://github.com/daveshap/Benevolent_
 This implementation is authored by Chris Kemplen: https://github.com/Ckemplen/ACE_Model_Implementation/
 """
 
-import logging
+import asyncio
+import functools
+import multiprocessing
 import threading
-import pathlib
 
 from layers import (AspirationalLayer, GlobalStrategyLayer, AgentModelLayer, ExecutiveFunctionLayer,
-                    CognitiveControlLayer, TaskProsecutionLayer)
+                    CognitiveControlLayer, TaskProsecutionLayer, AsyncLayerQueue, LayerQueue, load_config)
+from telemetry import get_logger
 
 from .LayerHierarchy import LayerHierarchy
+from .LayerProcess import LayerProcess, ProcessLink
+
+LAYER_CLASSES = {
+    LayerHierarchy.ASPIRATIONAL: AspirationalLayer,
+    LayerHierarchy.GLOBAL_STRATEGY: GlobalStrategyLayer,
+    LayerHierarchy.AGENT_MODEL: AgentModelLayer,
+    LayerHierarchy.EXECUTIVE_FUNCTION: ExecutiveFunctionLayer,
+    LayerHierarchy.COGNITIVE_CONTROL: CognitiveControlLayer,
+    LayerHierarchy.TASK_PROSECUTION: TaskProsecutionLayer,
+}
+
+
+def _layer_property(hierarchy):
+    return property(lambda self: self.get_layer_by_hierarchy(hierarchy),
+                    doc=f"The {hierarchy.name.lower().replace('_', ' ')} layer, built on first use.")
 
-project_root = pathlib.Path(__file__).parent.parent.resolve()
 
 class CognitiveArchitecture:
     """
     Represents the entire cognitive architecture model.
     Contains all layers of the model and manages data flow and execution across layers.
+
+    Creating an architecture only creates the queues between its layers. Each layer, with its managers and reasoning
+    engine, is built the first time it is used: when it is asked for, passed data, or sent its first message while
+    running. A short-lived architecture therefore costs only the layers it needs, and warm_up() builds them all ahead
+    of time when first-message latency matters more than start-up time.
     """
 
-    def __init__(self):
+    aspirational_layer = _layer_property(LayerHierarchy.ASPIRATIONAL)
+    global_strategy_layer = _layer_property(LayerHierarchy.GLOBAL_STRATEGY)
+    agent_model_layer = _layer_property(LayerHierarchy.AGENT_MODEL)
+    executive_function_layer = _layer_property(LayerHierarchy.EXECUTIVE_FUNCTION)
+    cognitive_control_layer = _layer_property(LayerHierarchy.COGNITIVE_CONTROL)
+    task_prosecution_layer = _layer_property(LayerHierarchy.TASK_PROSECUTION)
+
+    def __init__(self, asynchronous: bool = False, processes=False, layer_classes: dict | None = None,
+                 start_method: str | None = None, heartbeat_interval: float = 1.0):
         """
         Initialize the CognitiveArchitecture.
+
+        Args:
+            asynchronous (bool): Run the layers as coroutines on an event loop (see astart_execution) rather than in
+                a thread each, so many architectures can share one process.
+            processes: Run the layers in worker processes, so CPU-bound work in one layer does not hold up the
+                others: True for a process per layer, or a list of LayerHierarchy tuples for a process per group of
+                layers. The layers are then built in the workers and messages between processes must be picklable.
+            layer_classes (dict): Classes to use instead of the standard ones, by LayerHierarchy.
+            start_method (str): The multiprocessing start method for worker processes, e.g. 'spawn'.
+            heartbeat_interval (float): Seconds between worker process heartbeats, see check_health().
         """
-        # Instantiate layers
-        self.aspirational_layer = AspirationalLayer()
-        self.global_strategy_layer = GlobalStrategyLayer()
-        self.agent_model_layer = AgentModelLayer()
-        self.executive_function_layer = ExecutiveFunctionLayer()
-        self.cognitive_control_layer = CognitiveControlLayer()
-        self.task_prosecution_layer = TaskProsecutionLayer()
-
-        # Set up input/output queues between layers
-        self.aspirational_layer.down_queue = self.global_strategy_layer.up_queue
-        self.global_strategy_layer.up_queue = self.aspirational_layer.down_queue
-        self.global_strategy_layer.down_queue = self.agent_model_layer.up_queue
-        self.agent_model_layer.up_queue = self.global_strategy_layer.down_queue
-        self.agent_model_layer.down_queue = self.executive_function_layer.up_queue
-        self.executive_function_layer.up_queue = self.agent_model_layer.down_queue
-        self.executive_function_layer.down_queue = self.cognitive_control_layer.up_queue
-        self.cognitive_control_layer.up_queue = self.executive_function_layer.down_queue
-        self.cognitive_control_layer.down_queue = self.task_prosecution_layer.up_queue
-        self.task_prosecution_layer.up_queue = self.cognitive_control_layer.down_queue
+        if asynchronous and processes:
+            raise ValueError("CognitiveArchitecture: choose either asynchronous or processes.")
+        self.asynchronous = asynchronous
+        self.layer_classes = {**LAYER_CLASSES, **(layer_classes or {})}
 
         self.threads = {}
+        self.tasks = {}
+        self.processes = {}
+
+        self._links = {}
+        self._layers = {}
+        self._layers_lock = threading.RLock()
+        self._waiters = {}  # hierarchy -> what wakes the thread or task waiting for the layer's first message
+        self._stopping = False
+        self._stopped = set()
+
+        if processes:
+            self._init_processes(processes, multiprocessing.get_context(start_method), heartbeat_interval)
+        else:
+            # The links between layers are bounded and prioritised as set in the [LayerQueue] section of the config
+            queue_type = AsyncLayerQueue if asynchronous else LayerQueue
+            self._links = self._link(functools.partial(queue_type.from_config, load_config()))
+
+        self.logger = get_logger('Orchestration')
+
+    def _link(self, queue_type, linked=lambda upper, lower: True) -> dict:
+        # The up_queue, down_queue, from_above and from_below of each layer, by hierarchy, with a queue each way
+        # between adjacent layers that are linked
+        links = {hierarchy: dict.fromkeys(("up_queue", "down_queue", "from_above", "from_below"))
+                 for hierarchy in LayerHierarchy}
+        ordered = list(LayerHierarchy)
+        for upper, lower in zip(ordered, ordered[1:]):
+            if linked(upper, lower):
+                down, up = queue_type(), queue_type()
+                links[upper].update(down_queue=down, from_below=up)
+                links[lower].update(up_queue=up, from_above=down)
+
+        # Queues at the edges of the architecture: commissions come in above the top layer, which passes its
+        # reports up to the outbox; the bottom layer passes actions down and hears back their outcomes
+        self.inbox, self.outbox = queue_type(), queue_type()
+        self.actions, self.outcomes = queue_type(), queue_type()
+        links[LayerHierarchy.ASPIRATIONAL].update(from_above=self.inbox, up_queue=self.outbox)
+        links[LayerHierarchy.TASK_PROSECUTION].update(down_queue=self.actions, from_below=self.outcomes)
+        return links
+
+    def _init_processes(self, processes, context, heartbeat_interval):
+        groups = [(hierarchy,) for hierarchy in LayerHierarchy] if processes is True else [tuple(group)
+                                                                                          for group in processes]
+        group_of = {hierarchy: index for index, group in enumerate(groups) for hierarchy in group}
+        if sorted(hierarchy.value for group in groups for hierarchy in group) != [h.value for h in LayerHierarchy]:
+            raise ValueError("CognitiveArchitecture: every layer must be in exactly one process group.")
+
+        # Layers in the same process are connected there, the rest through inter-process queues
+        links = self._link(functools.partial(ProcessLink, context),
+                           lambda upper, lower: group_of[upper] != group_of[lower])
+
+        for group in groups:
+            self.processes[group] = LayerProcess(layer_classes={h: self.layer_classes[h] for h in group},
+                                                 links={h: links[h] for h in group},
+                                                 context=context, heartbeat_interval=heartbeat_interval)
+
+    def check_health(self, restart: bool = False) -> dict:
+        """
+        Check that every layer is still running.
 
-        self.logger = logging.getLogger('Orchestration')  # Create a logger for orchestration
-        self.logger.setLevel(logging.DEBUG)  # Set the logging level
-
-        # Create a console handler
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.DEBUG)
-
-        # Create a file handler
-        fh = logging.FileHandler(f'{project_root}/application.log')
-        fh.setLevel(logging.DEBUG)
-
-        # Create a formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-        # Add the formatter to the console handler
-        ch.setFormatter(formatter)
-
-        # Add the formatter to the file handler
-        fh.setFormatter(formatter)
-
-        # Add the console handler to the logger
-        self.logger.addHandler(ch)
+        Args:
+            restart (bool): Restart worker processes found unhealthy (only when running in processes).
 
-        # Add the file handler to the logger
-        self.logger.addHandler(fh)
+        Returns:
+            dict: The health of each layer's thread or task, or of each worker process, by name.
+        """
+        health = {}
+        for worker in self.processes.values():
+            status = worker.health()
+            if restart and not status["healthy"]:
+                self.logger.warning(f"Restarting {worker.name}: {status}")
+                worker.restart()
+                status = worker.health()
+            health[worker.name] = status
+        for hierarchy, thread in self.threads.items():
+            health[thread.name] = {"alive": thread.is_alive(), "healthy": thread.is_alive()}
+        for hierarchy, task in self.tasks.items():
+            health[task.get_name()] = {"alive": not task.done(), "healthy": not task.done()}
+        return health
 
     def _check_thread_status(self):
         """
         Check the status of all threads.
         """
         # Method to aid debug by checking on status of all threads
-        for key, thread in self.threads:
-            print(f'{key}: running={thread.running()}, done={thread.done()}')
+        for key, thread in self.threads.items():
+            print(f'{key}: alive={thread.is_alive()}')
 
-    def start_execution(self):
+    def start_execution(self, wait: bool = True):
         """
         Start the execution of all layers in separate threads.
+
+        Args:
+            wait (bool): Block until every layer has stopped, see stop_execution().
         """
-        # Create a thread for each layer
-        aspirational_thread = threading.Thread(target=self.aspirational_layer.main_loop)
-        self.threads[LayerHierarchy.ASPIRATIONAL] = aspirational_thread
+        if self.asynchronous:
+            raise ValueError("start_execution: use astart_execution for an asynchronous architecture.")
+
+        if self.processes:
+            for worker in self.processes.values():
+                worker.start()
+            if wait:
+                self.join()
+            return
+
+        # Create a thread for each layer, which builds the layer when its first message arrives
+        self._stopping = False
+        self._stopped.clear()
+        for hierarchy in LayerHierarchy:
+            self.threads[hierarchy] = threading.Thread(target=self._serve, args=(hierarchy,),
+                                                       name=self.layer_classes[hierarchy].__name__, daemon=True)
 
-        global_strategy_thread = threading.Thread(target=self.global_strategy_layer.main_loop)
-        self.threads[LayerHierarchy.GLOBAL_STRATEGY] = global_strategy_thread
+        # Start all threads
+        for thread in self.threads.values():
+            thread.start()
+
+        if wait:
+            self.join()
+
+    def _inbound(self, hierarchy):
+        return self._links[hierarchy]["from_above"], self._links[hierarchy]["from_below"]
+
+    def _received(self, hierarchy) -> bool:
+        return not all(inbound.empty() for inbound in self._inbound(hierarchy))
+
+    def _build_to_serve(self, hierarchy):
+        # Build the layer for its thread or task, stopping it straight away if the architecture is already stopping
+        with self._layers_lock:
+            layer = self.get_layer_by_hierarchy(hierarchy)
+            if self._stopping and hierarchy not in self._stopped:
+                self._stopped.add(hierarchy)
+                layer.stop()
+        return layer
+
+    def _serve(self, hierarchy):
+        # Run a layer's main loop, first waiting for a message if the layer has not been built yet
+        if hierarchy not in self._layers:
+            doorbell = self._waiters[hierarchy] = threading.Condition()
+            for inbound in self._inbound(hierarchy):
+                inbound.add_listener(doorbell)
+            try:
+                with doorbell:
+                    doorbell.wait_for(lambda: self._stopping or self._received(hierarchy))
+            finally:
+                for inbound in self._inbound(hierarchy):
+                    inbound.remove_listener(doorbell)
+            if not self._received(hierarchy) and hierarchy not in self._layers:
+                return  # stopped before the layer was needed
+        self._build_to_serve(hierarchy).main_loop()
+
+    def stop_execution(self, timeout: float | None = None):
+        """
+        Ask every layer to stop once it has handled the messages already received, and wait for them to finish.
+        Layers that were never needed are not built.
 
-        agent_model_thread = threading.Thread(target=self.agent_model_layer.main_loop)
-        self.threads[LayerHierarchy.AGENT_MODEL] = agent_model_thread
+        Args:
+            timeout (float): The longest wait in seconds for each layer, None to wait indefinitely.
+        """
+        for worker in self.processes.values():
+            worker.stop(timeout)
+        self._stop_layers()
+        for doorbell in list(self._waiters.values()):
+            with doorbell:
+                doorbell.notify_all()
+        self.join(timeout)
+
+    def _stop_layers(self):
+        with self._layers_lock:
+            self._stopping = True
+            for hierarchy in self.threads or self.tasks:
+                if hierarchy in self._layers and hierarchy not in self._stopped:
+                    self._stopped.add(hierarchy)
+                    self._layers[hierarchy].stop()
+
+    def join(self, timeout: float | None = None):
+        """
+        Wait for all layer threads to finish.
 
-        executive_function_thread = threading.Thread(target=self.executive_function_layer.main_loop)
-        self.threads[LayerHierarchy.EXECUTIVE_FUNCTION] = executive_function_thread
+        Args:
+            timeout (float): The longest wait in seconds for each layer, None to wait indefinitely.
+        """
+        for worker in self.processes.values():
+            if worker.process is not None:
+                worker.process.join(timeout)
+        for thread in self.threads.values():
+            thread.join(timeout)
 
-        cognitive_control_thread = threading.Thread(target=self.cognitive_control_layer.main_loop)
-        self.threads[LayerHierarchy.COGNITIVE_CONTROL] = cognitive_control_thread
+    async def astart_execution(self, wait: bool = True):
+        """
+        Start the execution of all layers as tasks on the running event loop.
 
-        task_prosecution_thread = threading.Thread(target=self.task_prosecution_layer.main_loop)
-        self.threads[LayerHierarchy.TASK_PROSECUTION] = task_prosecution_thread
+        Args:
+            wait (bool): Wait until every layer has stopped, see astop_execution().
+        """
+        if not self.asynchronous:
+            raise ValueError("astart_execution: the architecture was not created with asynchronous=True.")
+
+        self._stopping = False
+        self._stopped.clear()
+        for hierarchy in LayerHierarchy:
+            self.tasks[hierarchy] = asyncio.create_task(self._aserve(hierarchy),
+                                                        name=self.layer_classes[hierarchy].__name__)
+
+        if wait:
+            await asyncio.gather(*self.tasks.values())
+
+    async def _aserve(self, hierarchy):
+        # As _serve(), as a coroutine
+        if hierarchy not in self._layers:
+            wakeup = self._waiters[hierarchy] = asyncio.Event()
+            for inbound in self._inbound(hierarchy):
+                inbound.add_listener(wakeup)
+            try:
+                while not (self._stopping or self._received(hierarchy)):
+                    wakeup.clear()
+                    await wakeup.wait()
+            finally:
+                for inbound in self._inbound(hierarchy):
+                    inbound.remove_listener(wakeup)
+            if not self._received(hierarchy) and hierarchy not in self._layers:
+                return
+        await self._build_to_serve(hierarchy).amain_loop()
+
+    async def astop_execution(self):
+        """
+        Ask every layer to stop once it has handled the messages already received, and wait for them to finish.
+        Layers that were never needed are not built.
+        """
+        self._stop_layers()
+        for wakeup in list(self._waiters.values()):
+            wakeup.set()
+        await asyncio.gather(*self.tasks.values())
 
-        # Start all threads
-        aspirational_thread.start()
-        global_strategy_thread.start()
-        agent_model_thread.start()
-        executive_function_thread.start()
-        cognitive_control_thread.start()
-        task_prosecution_thread.start()
-
-        # Wait for all threads to finish
-        aspirational_thread.join()
-        global_strategy_thread.join()
-        agent_model_thread.join()
-        executive_function_thread.join()
-        cognitive_control_thread.join()
-        task_prosecution_thread.join()
+    def warm_up(self):
+        """
+        Build every layer and its reasoning engine now rather than when first used, so the first message through the
+        architecture does not pay for them. Does nothing when the layers run in worker processes, which build their
+        layers as they start.
+        """
+        if self.processes:
+            return
+        for hierarchy in LayerHierarchy:
+            self.get_layer_by_hierarchy(hierarchy).GPTModel
 
     def process_input(self, input_data):
         """
@@ -165,6 +358,8 @@ class CognitiveArchitecture:
             layer_hierarchy (LayerHierarchy): The hierarchy of the layer to pass data up to.
             data: The data to pass up.
         """
+        if self.processes:
+            raise ValueError("pass_up: the layers run in worker processes, put data on the edge queues instead.")
         layer = self.get_layer_by_hierarchy(layer_hierarchy)
         layer.pass_up(data)
 
@@ -176,6 +371,8 @@ class CognitiveArchitecture:
             layer_hierarchy (LayerHierarchy): The hierarchy of the layer to pass data down to.
             data: The data to pass down.
         """
+        if self.processes:
+            raise ValueError("pass_down: the layers run in worker processes, put data on the edge queues instead.")
         layer = self.get_layer_by_hierarchy(layer_hierarchy)
         layer.pass_down(data)
 
@@ -187,19 +384,19 @@ class CognitiveArchitecture:
             layer_hierarchy (LayerHierarchy): The hierarchy of the layer to get.
 
         Returns:
-            The layer with the specified hierarchy.
-        """
-        if hierarchy == LayerHierarchy.ASPIRATIONAL:
-            return self.aspirational_layer
-        elif hierarchy == LayerHierarchy.GLOBAL_STRATEGY:
-            return self.global_strategy_layer
-        elif hierarchy == LayerHierarchy.AGENT_MODEL:
-            return self.agent_model_layer
-        elif hierarchy == LayerHierarchy.EXECUTIVE_FUNCTION:
-            return self.executive_function_layer
-        elif hierarchy == LayerHierarchy.COGNITIVE_CONTROL:
-            return self.cognitive_control_layer
-        elif hierarchy == LayerHierarchy.TASK_PROSECUTION:
-            return self.task_prosecution_layer
-        else:
-            raise ValueError("Invalid Layer Hierarchy.")
+            The layer with the specified hierarchy, built and connected to its neighbours' queues if this is its first
+            use, or None if the layers run in worker processes.
+        """
+        if self.processes:
+            return None  # the layers only exist in the workers
+        layer = self._layers.get(hierarchy)
+        if layer is None:
+            with self._layers_lock:
+                layer = self._layers.get(hierarchy)
+                if layer is None:
+                    if hierarchy not in self._links:
+                        raise ValueError("Invalid Layer Hierarchy.")
+                    layer = self.layer_classes[hierarchy]()
+                    layer.attach(**self._links[hierarchy])
+                    self._layers[hierarchy] = layer
+        return layer
@@ -0,0 +1,247 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+
+from layers import LayerQueue, Priority, load_config
+from telemetry import get_logger
+
+
+class ProcessLink:
+    """
+    A link between layers in different processes, or between a layer and the parent process: a multiprocessing queue
+    carrying each message along with its priority and conflation key. Conflation happens on the receiving layer's
+    queue.
+    """
+
+    def __init__(self, context=None):
+        """
+        Initialize the ProcessLink.
+
+        Args:
+            context: The multiprocessing context of the processes using the link, the default one if None.
+        """
+        self.queue = (context or multiprocessing.get_context()).Queue()
+
+    def put(self, item, priority: Priority = Priority.NORMAL, conflation_key=None):
+        """
+        Put an item on the link.
+
+        Args:
+            item: The item, which must be picklable.
+            priority (Priority): How urgent the item is.
+            conflation_key: Replace the item with the same key still waiting on the receiving layer's queue.
+        """
+        self.queue.put((priority, conflation_key, item))
+
+    put_nowait = put
+
+    def receive(self, block: bool = True, timeout: float | None = None):
+        """
+        Take the next item off the link.
+
+        Returns:
+            tuple: The item, its priority and its conflation key.
+
+        Raises:
+            queue.Empty: If no item arrived in time.
+        """
+        priority, conflation_key, item = self.queue.get(block, timeout)
+        return item, priority, conflation_key
+
+    def get(self, block: bool = True, timeout: float | None = None):
+        """
+        Take the next item off the link.
+
+        Returns:
+            The item.
+
+        Raises:
+            queue.Empty: If no item arrived in time.
+        """
+        return self.receive(block, timeout)[0]
+
+
+
+# The longest a pump waits on its link before checking whether to let go of it
+PUMP_INTERVAL = 0.1
+
+
+def _pump(source: ProcessLink, target: LayerQueue, done: threading.Event):
+    # Move messages off an inter-process link onto the layer's own queue, which wakes its main loop. A read holds the
+    # link's read lock, and a process that dies holding it leaves the link unreadable for its replacement, so reads
+    # time out and the pump lets go of the link within PUMP_INTERVAL of done being set
+    while not done.is_set():
+        try:
+            item, priority, conflation_key = source.receive(timeout=PUMP_INTERVAL)
+        except queue.Empty:
+            continue
+        try:
+            target.put(item, priority, conflation_key=conflation_key)
+        except queue.Full:
+            # The layer's queue rejected the message (it is counted in the queue's stats): keep the link draining
+            get_logger("LayerProcess").warning("Dropped %r: the layer's queue is full", item)
+
+
+def serve_layers(layer_classes: dict, links: dict, heartbeat, stop, heartbeat_interval: float):
+    """
+    Run a group of layers in the current (worker) process until stop is set.
+
+    Adjacent layers in the group are connected directly. Every other link is a ProcessLink: outbound ones are written
+    to as they are, inbound ones are pumped onto a local LayerQueue so the layer's main_loop still sleeps until there
+    is work. While all of the group's main loops and pumps are running the heartbeat is set to the current time.
+
+    The pumps are stopped before the process exits, including when it is terminated, so a replacement process can read
+    the same links. A process killed outright (SIGKILL) may leave a link it was reading unreadable.
+
+    Args:
+        layer_classes (dict): The class of each layer in the group, by LayerHierarchy.
+        links (dict): For each layer, its up_queue, down_queue, from_above and from_below ProcessLinks, any of which
+            may be None to keep the layer's own queue.
+        heartbeat (multiprocessing.Value): Set to time.time() every heartbeat_interval seconds while healthy.
+        stop (multiprocessing.Event): Set by the parent to shut the group down.
+        heartbeat_interval (float): Seconds between heartbeats.
+    """
+    config = load_config()
+
+    layers = {hierarchy: layer_class() for hierarchy, layer_class in layer_classes.items()}
+    ordered = sorted(layers, key=lambda hierarchy: hierarchy.value)
+    for upper, lower in zip(ordered, ordered[1:]):
+        if lower.value == upper.value + 1:
+            layers[upper].connect_below(layers[lower], lambda: LayerQueue.from_config(config))
+
+    pumps, pumps_done = [], threading.Event()
+    for hierarchy, layer in layers.items():
+        endpoints = links[hierarchy]
+        inbound = {}
+        for name in ("from_above", "from_below"):
+            if endpoints[name] is not None:
+                inbound[name] = LayerQueue.from_config(config)
+                pumps.append(threading.Thread(target=_pump, args=(endpoints[name], inbound[name], pumps_done),
+                                              daemon=True))
+        layer.attach(up_queue=endpoints["up_queue"], down_queue=endpoints["down_queue"], **inbound)
+
+    def release_links(timeout=None):
+        pumps_done.set()
+        for pump in pumps:
+            pump.join(timeout)
+
+    def terminate(signum, frame):
+        # Die at once, as terminate() asks, but only once no pump holds a link's read lock. A pump still running
+        # after a read's timeout is putting a message on its layer's queue, not holding the link
+        release_links(2 * PUMP_INTERVAL)
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, terminate)
+    for pump in pumps:
+        pump.start()
+
+    threads = [threading.Thread(target=layer.main_loop, name=layer.name) for layer in layers.values()]
+    try:
+        for thread in threads:
+            thread.start()
+
+        heartbeat.value = time.time()
+        while not stop.wait(heartbeat_interval):
+            if all(thread.is_alive() for thread in threads + pumps):
+                heartbeat.value = time.time()
+
+        for layer in layers.values():
+            layer.stop()
+        for thread in threads:
+            thread.join()
+    finally:
+        release_links()
+
+
+class LayerProcess:
+    """
+    A worker process running a group of layers, see serve_layers().
+    """
+
+    def __init__(self, layer_classes: dict, links: dict, context=None, heartbeat_interval: float = 1.0):
+        """
+        Initialize the LayerProcess.
+
+        Args:
+            layer_classes (dict): The class of each layer in the group, by LayerHierarchy.
+            links (dict): The inter-process queues of each layer, see serve_layers().
+            context: The multiprocessing context to start the process with, the default one if None.
+            heartbeat_interval (float): Seconds between heartbeats.
+        """
+        self.layer_classes = layer_classes
+        self.links = links
+        self.context = context or multiprocessing.get_context()
+        self.heartbeat_interval = heartbeat_interval
+        self.name = "+".join(layer_class.__name__ for layer_class in layer_classes.values())
+
+        self.restarts = 0
+        self.process = None
+        self.heartbeat = None
+        self.stop_event = None
+
+    def start(self):
+        """
+        Start the worker process.
+        """
+        self.heartbeat = self.context.Value("d", 0.0)
+        self.stop_event = self.context.Event()
+        self.process = self.context.Process(target=serve_layers, name=self.name, daemon=True,
+                                            args=(self.layer_classes, self.links, self.heartbeat, self.stop_event,
+                                                  self.heartbeat_interval))
+        self.process.start()
+
+    def restart(self):
+        """
+        Replace the worker process with a new one on the same queues. Messages the old process had taken off its
+        queues but not yet handled are lost.
+        """
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.restarts += 1
+        self.start()
+
+    def health(self, max_heartbeat_age: float | None = None) -> dict:
+        """
+        Check on the worker process.
+
+        Args:
+            max_heartbeat_age (float): The oldest heartbeat in seconds that counts as healthy, three heartbeat
+                intervals by default.
+
+        Returns:
+            dict: Whether the process is alive, its exit code, the age of its last heartbeat in seconds (None before
+            the first), its restarts, and whether it is healthy. A worker not yet started is not healthy.
+        """
+        if self.process is None:
+            return {"alive": False, "exitcode": None, "heartbeat_age": None, "restarts": self.restarts,
+                    "healthy": False}
+        max_heartbeat_age = max_heartbeat_age or 3 * self.heartbeat_interval
+        beat = self.heartbeat.value
+        heartbeat_age = time.time() - beat if beat else None
+        alive = self.process.is_alive()
+        return {
+            "alive": alive,
+            "exitcode": self.process.exitcode,
+            "heartbeat_age": heartbeat_age,
+            "restarts": self.restarts,
+            "healthy": alive and (heartbeat_age is None or heartbeat_age <= max_heartbeat_age),
+        }
+
+    def stop(self, timeout: float | None = None):
+        """
+        Ask the worker to stop once its layers have handled the messages already received, and wait for it,
+        terminating it if it has not stopped within timeout seconds. Does nothing if the worker was never started.
+        """
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
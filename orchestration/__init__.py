@@ -1,2 +1,3 @@
 from .CognitiveArchitecture import CognitiveArchitecture
-from .LayerHierarchy import LayerHierarchy
\ No newline at end of file
+from .LayerHierarchy import LayerHierarchy
+from .LayerProcess import LayerProcess, ProcessLink
@@ -1,5 +1,13 @@
+import asyncio
+import queue
+import threading
+import time
+
 import pytest
+from layers import LayerQueue
 from orchestration import CognitiveArchitecture, LayerHierarchy
+from orchestration.CognitiveArchitecture import LAYER_CLASSES
+from orchestration.LayerProcess import ProcessLink, _pump
 
 def test_CognitiveArchitecture_initialization():
     # Test that a CognitiveArchitecture instance can be created without errors
@@ -7,9 +15,20 @@ def test_CognitiveArchitecture_initialization():
     assert cognition_machine is not None
 
 def test_CognitiveArchitecture_start_execution():
-    # Test the start_execution method
-    # This might be difficult to test if it starts threads that run indefinitely
-    pass
+    # Test that the layers hand messages to each other in both directions, and stop cleanly
+    cognition_machine = CognitiveArchitecture()
+    received = queue.Queue()
+    strategy = cognition_machine.global_strategy_layer
+    strategy.handle_from_above = lambda data: received.put(("above", data))
+    strategy.handle_from_below = lambda data: received.put(("below", data))
+
+    cognition_machine.start_execution(wait=False)
+    cognition_machine.aspirational_layer.pass_down("mission")
+    cognition_machine.agent_model_layer.pass_up("capabilities")
+    assert {received.get(timeout=5), received.get(timeout=5)} == {("above", "mission"), ("below", "capabilities")}
+
+    cognition_machine.stop_execution(timeout=5)
+    assert not any(thread.is_alive() for thread in cognition_machine.threads.values())
 
 def test_CognitiveArchitecture_process_input():
     # Test the process_input method
@@ -32,3 +51,176 @@ def test_CognitiveArchitecture_get_layer_by_hierarchy():
     cognition_machine = CognitiveArchitecture()
     layer = cognition_machine.get_layer_by_hierarchy(LayerHierarchy.ASPIRATIONAL)
     assert layer is not None
+
+def test_CognitiveArchitecture_asynchronous():
+    # Test that several architectures run as coroutines on one event loop, their layers awaiting concurrently
+    async def run():
+        cognition_machines = [CognitiveArchitecture(asynchronous=True) for _ in range(3)]
+        received = []
+
+        async def slow_handler(data):
+            await asyncio.sleep(0.2)  # stands in for an LLM call made with GPTModel.agenerate
+            received.append(data)
+
+        for cognition_machine in cognition_machines:
+            cognition_machine.global_strategy_layer.ahandle_from_above = slow_handler
+            cognition_machine.global_strategy_layer.ahandle_from_below = slow_handler
+            await cognition_machine.astart_execution(wait=False)
+
+        start = time.monotonic()
+        for cognition_machine in cognition_machines:
+            cognition_machine.aspirational_layer.pass_down("mission")
+            cognition_machine.agent_model_layer.pass_up("capabilities")
+        for cognition_machine in cognition_machines:
+            await cognition_machine.astop_execution()
+
+        assert sorted(received) == ["capabilities"] * 3 + ["mission"] * 3
+        assert time.monotonic() - start < 1.0  # six slow handlers overlapped rather than ran back to back
+
+    asyncio.run(run())
+    with pytest.raises(ValueError):
+        CognitiveArchitecture(asynchronous=True).start_execution()
+
+def test_CognitiveArchitecture_lazy_layers():
+    # Test that layers are built on first use, and that warm_up builds the rest
+    cognition_machine = CognitiveArchitecture()
+    assert cognition_machine._layers == {}
+    layer = cognition_machine.executive_function_layer
+    assert layer is cognition_machine.get_layer_by_hierarchy(LayerHierarchy.EXECUTIVE_FUNCTION)
+    assert list(cognition_machine._layers) == [LayerHierarchy.EXECUTIVE_FUNCTION]
+    assert layer.from_above is cognition_machine.agent_model_layer.down_queue
+    assert layer.from_below is cognition_machine.cognitive_control_layer.up_queue
+
+    cognition_machine.warm_up()
+    assert set(cognition_machine._layers) == set(LayerHierarchy)
+    assert all("GPTModel" in vars(layer) for layer in cognition_machine._layers.values())
+
+class SlowModel:
+    # Stands in for GPTModel, each call waiting on the network
+    def process(self, input_data):
+        return input_data
+
+    async def agenerate(self, messages, currency_resource=None):
+        await asyncio.sleep(0.3)
+        return "reply"
+
+def test_CognitiveArchitecture_asynchronous_llm_calls_overlap():
+    # Test that layers on one event loop make their LLM calls with aexecute without blocking each other
+    async def run():
+        cognition_machines = [CognitiveArchitecture(asynchronous=True) for _ in range(2)]
+        replies = []
+        for cognition_machine in cognition_machines:
+            for hierarchy in (LayerHierarchy.GLOBAL_STRATEGY, LayerHierarchy.TASK_PROSECUTION):
+                layer = cognition_machine.get_layer_by_hierarchy(hierarchy)
+                layer.GPTModel = SlowModel()
+
+                async def handle(data, layer=layer):
+                    replies.append(await layer.aexecute())
+
+                layer.ahandle_from_above = handle
+            await cognition_machine.astart_execution(wait=False)
+
+        start = time.monotonic()
+        for cognition_machine in cognition_machines:
+            cognition_machine.aspirational_layer.pass_down("mission")
+            cognition_machine.cognitive_control_layer.pass_down("task")
+        for cognition_machine in cognition_machines:
+            await cognition_machine.astop_execution()
+
+        assert replies == ["reply"] * 4
+        assert time.monotonic() - start < 0.9  # four 0.3s calls overlapped rather than ran back to back
+
+    asyncio.run(run())
+
+class Relay:
+    # Passes every message on in the direction it was travelling
+    def handle_from_above(self, data):
+        self.pass_down(data)
+
+    def handle_from_below(self, data):
+        self.pass_up(data)
+
+RELAY_CLASSES = {hierarchy: type(f"Relay{layer_class.__name__}", (Relay, layer_class), {})
+                 for hierarchy, layer_class in LAYER_CLASSES.items()}
+
+@pytest.mark.parametrize("processes", [True, [(LayerHierarchy.ASPIRATIONAL, LayerHierarchy.GLOBAL_STRATEGY,
+                                                LayerHierarchy.AGENT_MODEL),
+                                               (LayerHierarchy.EXECUTIVE_FUNCTION, LayerHierarchy.COGNITIVE_CONTROL,
+                                                LayerHierarchy.TASK_PROSECUTION)]])
+def test_CognitiveArchitecture_processes(processes):
+    # Test that messages cross the worker processes both ways, and that a dead worker is found and restarted
+    cognition_machine = CognitiveArchitecture(processes=processes, layer_classes=RELAY_CLASSES,
+                                              start_method="fork", heartbeat_interval=0.1)
+    assert len(cognition_machine.processes) == (6 if processes is True else 2)
+    cognition_machine.stop_execution()  # nothing to stop before the workers start
+    assert not any(status["healthy"] or status["alive"] for status in cognition_machine.check_health().values())
+    cognition_machine.start_execution(wait=False)
+    try:
+        cognition_machine.inbox.put("mission")
+        assert cognition_machine.actions.get(timeout=20) == "mission"
+        cognition_machine.outcomes.put("done")
+        assert cognition_machine.outbox.get(timeout=20) == "done"
+        assert all(status["healthy"] for status in cognition_machine.check_health().values())
+
+        worker = next(iter(cognition_machine.processes.values()))
+        worker.process.terminate()
+        worker.process.join()
+        assert not cognition_machine.check_health()[worker.name]["healthy"]
+        assert cognition_machine.check_health(restart=True)[worker.name]["restarts"] == 1
+
+        cognition_machine.inbox.put("again")
+        assert cognition_machine.actions.get(timeout=20) == "again"
+    finally:
+        cognition_machine.stop_execution(timeout=10)
+    assert all(worker.process.exitcode == 0 for worker in cognition_machine.processes.values())
+    with pytest.raises(ValueError):
+        cognition_machine.pass_down(LayerHierarchy.ASPIRATIONAL, "mission")
+
+def test_CognitiveArchitecture_lazy_layers_running():
+    # Test that running layers are built by their first message, and that layers never sent one are not built
+    cognition_machine = CognitiveArchitecture(layer_classes=RELAY_CLASSES)
+    cognition_machine.start_execution(wait=False)
+    cognition_machine.stop_execution(timeout=5)
+    assert not any(thread.is_alive() for thread in cognition_machine.threads.values())
+    assert cognition_machine._layers == {}
+
+    cognition_machine = CognitiveArchitecture(layer_classes=RELAY_CLASSES)
+    cognition_machine.start_execution(wait=False)
+    cognition_machine.inbox.put("mission")
+    assert cognition_machine.actions.get(timeout=5) == "mission"
+    assert set(cognition_machine._layers) == set(LayerHierarchy)
+    cognition_machine.stop_execution(timeout=5)
+    assert not any(thread.is_alive() for thread in cognition_machine.threads.values())
+
+    async def run():
+        cognition_machine = CognitiveArchitecture(asynchronous=True, layer_classes=RELAY_CLASSES)
+        await cognition_machine.astart_execution(wait=False)
+        cognition_machine.outcomes.put_nowait("done")
+        assert await asyncio.wait_for(cognition_machine.outbox.get(), 5) == "done"
+        await cognition_machine.astop_execution()
+        assert set(cognition_machine._layers) == set(LayerHierarchy)
+
+        cognition_machine = CognitiveArchitecture(asynchronous=True, layer_classes=RELAY_CLASSES)
+        await cognition_machine.astart_execution(wait=False)
+        await asyncio.sleep(0)
+        await cognition_machine.astop_execution()
+        assert cognition_machine._layers == {}
+
+    asyncio.run(run())
+
+def test_pump_survives_a_full_layer_queue():
+    # Test that a message rejected by the layer's queue is dropped without stopping the pump draining the link
+    link, target, done = ProcessLink(), LayerQueue(maxsize=1, policy="reject"), threading.Event()
+    pump = threading.Thread(target=_pump, args=(link, target, done), daemon=True)
+    pump.start()
+    for item in ("first", "rejected"):
+        link.put(item)
+    deadline = time.monotonic() + 5
+    while target.stats()["rejected"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pump.is_alive() and target.get() == "first"
+    link.put("later")
+    assert target.get(timeout=5) == "later"
+    done.set()
+    pump.join(timeout=5)
+    assert not pump.is_alive()
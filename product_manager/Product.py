@@ -1,6 +1,7 @@
-import logging
 import pathlib
 
+from telemetry import get_logger
+
 project_root = pathlib.Path(__file__).parent.parent.resolve()
 
 class Product:
@@ -8,7 +9,8 @@ class Product:
     Base class for all products.
     """
 
-    def __init__(self, name, description, required_resources=None, required_capabilities=None):
+    def __init__(self, name, description, required_resources=None, required_capabilities=None, depends_on=None,
+                 effort: float = 1.0):
         """
         Initialize the Product.
 
@@ -16,42 +18,32 @@ class Product:
             name (str): The name of the product.
             required_resources (list): The resources required to create the product.
             required_capabilities (list): The capabilities required to create the product.
+            depends_on (list): The names of the products whose outputs this one is built from.
+            effort (float): How long the product takes to create relative to others, used to find the critical path.
         """
         self.name = name
         self.description = description
         self.required_resources = required_resources if required_resources else []
         self.required_capabilities = required_capabilities if required_capabilities else []
+        self.depends_on = depends_on if depends_on else []
+        self.effort = effort
 
         # storage allocated for the product class to make it
         # easier to organise and track data stored by and for products.
         self.storage_root = f"{project_root}/storage/products/{self.name}"
 
         # Set up logging
-        self.logger = logging.getLogger(name)  # Create a logger for this layer
-        self.logger.setLevel(logging.DEBUG)  # Set the logging level
-
-        # Create a console handler
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.DEBUG)
-
-        # Create a file handler
-        fh = logging.FileHandler(f'{project_root}/application.log')
-        fh.setLevel(logging.DEBUG)
-
-        # Create a formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-        # Add the formatter to the console handler
-        ch.setFormatter(formatter)
+        self.logger = get_logger(name)
 
-        # Add the formatter to the file handler
-        fh.setFormatter(formatter)
-
-        # Add the console handler to the logger
-        self.logger.addHandler(ch)
+    def execute(self, inputs=None):
+        """
+        Create the product.
+        This method should be overridden by subclasses to provide the specific creation logic.
 
-        # Add the file handler to the logger
-        self.logger.addHandler(fh)
+        Args:
+            inputs (dict): The outputs of the products this one depends on, by name, when run by a ProductScheduler.
+        """
+        raise NotImplementedError("Subclasses should implement this method.")
 
     def draft(self):
         """
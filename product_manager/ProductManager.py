@@ -2,6 +2,7 @@ import os
 import inspect
 
 from .Product import Product
+from .ProductScheduler import ProductScheduler
 
 
 class ProductManager:
@@ -48,12 +49,13 @@ class ProductManager:
         """
         return self.products.get(name, None)
 
-    def execute_product(self, name):
+    def execute_product(self, name, inputs=None):
         """
         Execute a product.
 
         Args:
             name (str): The name of the product.
+            inputs (dict): The outputs of the products it depends on, by name.
 
         Returns:
             The output of the product execution, or None if the product doesn't exist or if required resources/capabilities are not available.
@@ -66,9 +68,27 @@ class ProductManager:
         # If they are, execute the product and return the output
         # If they are not, return None or raise an exception
 
-        return product.execute()
+        return product.execute() if inputs is None else product.execute(inputs)
 
-    def create_product_class(self, name, description, required_resources=None, required_capabilities=None):
+    def execute_products(self, dependencies=None, scheduler: ProductScheduler | None = None, on_complete=None) -> dict:
+        """
+        Execute all the products, each once the products it depends on are complete, running independent products
+        concurrently and those on the critical path first.
+
+        Args:
+            dependencies (dict): The names of the products each product depends on, by name, overriding the products'
+                own depends_on, e.g. INITIATION_DEPENDENCIES.
+            scheduler (ProductScheduler): Runs the products, a ProductScheduler with its default concurrency if None.
+            on_complete: Called with the name and output of each product as it completes.
+
+        Returns:
+            dict: The report of ProductScheduler.run().
+        """
+        scheduler = scheduler or ProductScheduler()
+        return scheduler.run(self.products, self.execute_product, dependencies, on_complete)
+
+    def create_product_class(self, name, description, required_resources=None, required_capabilities=None,
+                             depends_on=None):
         """
         Dynamically create a new product class.
 
@@ -76,6 +96,7 @@ class ProductManager:
             name (str): The name of the new product class.
             required_resources (list): The resources required for the new product class.
             required_capabilities (list): The capabilities required for the new product class.
+            depends_on (list): The names of the products the new product class is built from.
 
         Returns:
             type: The new product class.
@@ -84,7 +105,8 @@ class ProductManager:
         # The new class should inherit from the Product base class and override its methods as needed
         # The new class is returned, and can then be instantiated and used like any other class
         return type(name, (Product,), {
-            "__init__": lambda self: Product.__init__(self, name, description, required_resources, required_capabilities)
+            "__init__": lambda self: Product.__init__(self, name, description, required_resources, required_capabilities,
+                                                      depends_on)
         })
 
     def create_and_save_product_class(self, name, description, required_resources=None, required_capabilities=None,
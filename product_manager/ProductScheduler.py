@@ -0,0 +1,213 @@
+import heapq
+import time
+from collections import defaultdict
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+# The project initiation deliverables described in main.py, each with the deliverables it is built from
+INITIATION_DEPENDENCIES = {
+    "ProjectCharter": [],
+    "BusinessCase": ["ProjectCharter"],
+    "StakeholderAnalysis": ["ProjectCharter"],
+    "ProjectScopeStatement": ["ProjectCharter", "BusinessCase"],
+    "LegalRegulatoryReview": ["ProjectScopeStatement"],
+    "ProjectOrganisationChart": ["StakeholderAnalysis"],
+    "CommunicationPlan": ["StakeholderAnalysis", "ProjectOrganisationChart"],
+    "ProjectSchedule": ["ProjectScopeStatement"],
+    "QualityManagementPlan": ["ProjectScopeStatement"],
+    "RiskManagementPlan": ["ProjectScopeStatement", "StakeholderAnalysis", "LegalRegulatoryReview"],
+    "ResourcePlan": ["ProjectSchedule", "ProjectOrganisationChart"],
+    "ProcurementStrategy": ["ResourcePlan", "LegalRegulatoryReview"],
+    "BudgetProposal": ["BusinessCase", "ResourcePlan", "ProcurementStrategy"],
+    "ProjectApprovalDocumentation": ["ProjectCharter", "BusinessCase", "BudgetProposal", "RiskManagementPlan",
+                                     "ProjectSchedule", "QualityManagementPlan", "CommunicationPlan"],
+}
+
+
+def _dependents(graph):
+    # Invert the graph: the names of the products depending on each product
+    dependents = defaultdict(list)
+    for name, depends_on in graph.items():
+        for dependency in depends_on:
+            dependents[dependency].append(name)
+    return dependents
+
+
+class ProductScheduler:
+    """
+    Runs products in dependency order, each as soon as the products it depends on are complete.
+
+    The products and their dependencies form a directed acyclic graph. Products whose dependencies are complete run
+    concurrently, up to max_concurrency at once, and when more are ready than can run those heading the longest
+    remaining chain of effort (the critical path) go first, so the whole set takes little longer than its longest
+    chain. A product that fails does not stop the others, but the products depending on it are skipped.
+    """
+
+    def __init__(self, max_concurrency: int = 4):
+        """
+        Initialize the ProductScheduler.
+
+        Args:
+            max_concurrency (int): The most products run at once.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}.")
+        self.max_concurrency = max_concurrency
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create a scheduler as set in the [ProductScheduler] section of the config.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            ProductScheduler: The scheduler, with the defaults for anything not set.
+        """
+        if not config.has_section("ProductScheduler"):
+            return cls()
+        return cls(max_concurrency=config["ProductScheduler"].getint("max_concurrency", fallback=4))
+
+    @staticmethod
+    def build_graph(products: dict, dependencies: dict | None = None) -> dict:
+        """
+        Get the dependencies of each product, checking they form a directed acyclic graph.
+
+        Args:
+            products (dict): The products, by name.
+            dependencies (dict): The names of the products each product depends on, by name, overriding the
+                products' own depends_on.
+
+        Returns:
+            dict: The set of names each product depends on, by name.
+
+        Raises:
+            ValueError: If a product depends on one not in products, or the dependencies form a cycle.
+        """
+        graph = {}
+        for name, product in products.items():
+            depends_on = dependencies.get(name, []) if dependencies is not None else product.depends_on
+            unknown = set(depends_on) - set(products)
+            if unknown:
+                raise ValueError(f"build_graph: '{name}' depends on unknown products {sorted(unknown)}.")
+            graph[name] = set(depends_on)
+        ProductScheduler.topological_order(graph)
+        return graph
+
+    @staticmethod
+    def topological_order(graph: dict) -> list:
+        """
+        Order products so each comes after the products it depends on.
+
+        Args:
+            graph (dict): The set of names each product depends on, by name.
+
+        Returns:
+            list: The names of the products.
+
+        Raises:
+            ValueError: If the dependencies form a cycle.
+        """
+        waiting = {name: len(depends_on) for name, depends_on in graph.items()}
+        dependents = _dependents(graph)
+        ready = [name for name, count in waiting.items() if count == 0]
+        order = []
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for dependent in dependents[name]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(graph):
+            raise ValueError(f"topological_order: dependencies form a cycle among "
+                             f"{sorted(name for name, count in waiting.items() if count)}.")
+        return order
+
+    @staticmethod
+    def critical_path(graph: dict, efforts: dict) -> tuple:
+        """
+        Find the longest chain of effort through the products.
+
+        Args:
+            graph (dict): The set of names each product depends on, by name.
+            efforts (dict): The effort of each product, by name.
+
+        Returns:
+            tuple: The effort of the longest chain starting at each product, by name, and the names of the products
+            on the critical path in order.
+        """
+        dependents = _dependents(graph)
+        remaining = {}
+        for name in reversed(ProductScheduler.topological_order(graph)):
+            remaining[name] = efforts[name] + max((remaining[dependent] for dependent in dependents[name]), default=0)
+
+        path = []
+        candidates = [name for name, depends_on in graph.items() if not depends_on]
+        while candidates:
+            name = max(candidates, key=lambda candidate: remaining[candidate])
+            path.append(name)
+            candidates = dependents[name]
+        return remaining, path
+
+    def run(self, products: dict, run_product, dependencies: dict | None = None, on_complete=None) -> dict:
+        """
+        Run the products.
+
+        Args:
+            products (dict): The products, by name.
+            run_product: Called with a product's name and the outputs of the products it depends on (a dict by name)
+                to run it, e.g. ProductManager.execute_product. Called from worker threads.
+            dependencies (dict): The names of the products each product depends on, by name, overriding the
+                products' own depends_on.
+            on_complete: Called with the name and output of each product as it completes.
+
+        Returns:
+            dict: The output of each completed product, the exception of each failed product and the names of the
+            products skipped because a dependency failed, along with the order products completed in, the critical
+            path, its effort and the run's duration in seconds.
+        """
+        graph = self.build_graph(products, dependencies)
+        remaining, path = self.critical_path(graph, {name: product.effort for name, product in products.items()})
+        waiting = {name: len(depends_on) for name, depends_on in graph.items()}
+        dependents = _dependents(graph)
+
+        # Ready products by the longest chain they head, the critical path first
+        ready = [(-remaining[name], name) for name, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        outputs, errors, completed = {}, {}, []
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            running = {}
+            while ready or running:
+                while ready and len(running) < self.max_concurrency:
+                    _, name = heapq.heappop(ready)
+                    inputs = {dependency: outputs[dependency] for dependency in graph[name]}
+                    running[executor.submit(run_product, name, inputs)] = name
+                done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outputs[name] = future.result()
+                    except Exception as e:
+                        errors[name] = e
+                        continue
+                    completed.append(name)
+                    if on_complete is not None:
+                        on_complete(name, outputs[name])
+                    for dependent in dependents[name]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            heapq.heappush(ready, (-remaining[dependent], dependent))
+
+        return {
+            "outputs": outputs,
+            "errors": errors,
+            "skipped": [name for name in graph if name not in outputs and name not in errors],
+            "completed": completed,
+            "critical_path": path,
+            "critical_path_effort": remaining[path[0]] if path else 0.0,
+            "duration_s": time.perf_counter() - started,
+        }
@@ -1,7 +1,10 @@
 from .Product import Product
 from .ProductManager import ProductManager
+from .ProductScheduler import INITIATION_DEPENDENCIES, ProductScheduler
 
 __all__ = [
+    "INITIATION_DEPENDENCIES",
     "Product",
     "ProductManager",
+    "ProductScheduler",
 ]
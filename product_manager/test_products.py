@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from layers import ExecutiveFunctionLayer, MessageType
+from product_manager import INITIATION_DEPENDENCIES, Product, ProductManager, ProductScheduler
+
+
+class TimedProduct(Product):
+    """Takes effort * 0.1 seconds to create, and records how many products were being created at once."""
+
+    running = 0
+    most_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, name, depends_on=None, effort=1.0, fail=False):
+        super().__init__(name, f"The {name}", depends_on=depends_on, effort=effort)
+        self.fail = fail
+        self.inputs = None
+
+    def execute(self, inputs=None):
+        with self.lock:
+            TimedProduct.running += 1
+            TimedProduct.most_running = max(TimedProduct.most_running, TimedProduct.running)
+        try:
+            time.sleep(self.effort * 0.1)
+            if self.fail:
+                raise RuntimeError(f"{self.name} failed")
+            self.inputs = inputs
+            return f"{self.name} done"
+        finally:
+            with self.lock:
+                TimedProduct.running -= 1
+
+
+@pytest.fixture(autouse=True)
+def reset_counts():
+    TimedProduct.running = TimedProduct.most_running = 0
+
+
+def initiation_products(creator="test", **overrides):
+    manager = ProductManager(creator=creator)
+    for name, depends_on in INITIATION_DEPENDENCIES.items():
+        manager.add_product(name, TimedProduct(name, depends_on, **overrides.get(name, {})))
+    return manager
+
+
+def test_initiation_suite_takes_about_its_longest_chain():
+    manager = initiation_products()
+    report = manager.execute_products(scheduler=ProductScheduler(max_concurrency=4))
+
+    assert not report["errors"] and not report["skipped"]
+    assert len(report["outputs"]) == len(INITIATION_DEPENDENCIES)
+    completed = report["completed"]
+    for name, depends_on in INITIATION_DEPENDENCIES.items():
+        assert all(completed.index(dependency) < completed.index(name) for dependency in depends_on)
+    assert report["critical_path"][0] == "ProjectCharter"
+    assert report["critical_path"][-1] == "ProjectApprovalDocumentation"
+    # 14 products of 0.1s each would take 1.4s one at a time; the longest chain is 8 of them
+    assert report["critical_path_effort"] == 8
+    assert report["duration_s"] < 1.2
+    assert 1 < TimedProduct.most_running <= 4
+    approval = manager.get_product("ProjectApprovalDocumentation")
+    assert approval.inputs["BudgetProposal"] == "BudgetProposal done"
+
+
+def test_critical_path_runs_first_when_concurrency_is_limited():
+    products = {"long": TimedProduct("long", effort=1), "after_long": TimedProduct("after_long", ["long"], effort=3),
+                "short": TimedProduct("short", effort=2)}
+    report = ProductScheduler(max_concurrency=1).run(products, lambda name, inputs: products[name].execute(inputs))
+    assert report["completed"] == ["long", "after_long", "short"]
+    assert report["critical_path"] == ["long", "after_long"]
+
+
+def test_failed_product_skips_its_dependents():
+    manager = initiation_products(ResourcePlan={"fail": True})
+    report = manager.execute_products()
+
+    assert list(report["errors"]) == ["ResourcePlan"]
+    assert set(report["skipped"]) == {"ProcurementStrategy", "BudgetProposal", "ProjectApprovalDocumentation"}
+    assert "CommunicationPlan" in report["outputs"]
+
+
+def test_invalid_dependencies_are_rejected():
+    products = {"a": TimedProduct("a", ["b"]), "b": TimedProduct("b", ["a"])}
+    with pytest.raises(ValueError, match="cycle"):
+        ProductScheduler().build_graph(products)
+    with pytest.raises(ValueError, match="unknown"):
+        ProductScheduler().build_graph({"a": TimedProduct("a", ["missing"])})
+
+
+def test_ExecutiveFunctionLayer_reports_each_product():
+    layer = ExecutiveFunctionLayer()
+    for name in ("ProjectCharter", "BusinessCase"):
+        layer.products.add_product(name, TimedProduct(name))
+    report = layer.execute_products({"ProjectCharter": [], "BusinessCase": ["ProjectCharter"]})
+
+    assert report["completed"] == ["ProjectCharter", "BusinessCase"]
+    statuses = [layer.receive_from_above(), layer.receive_from_above()]
+    assert all(status.type is MessageType.STATUS for status in statuses)
+    assert [status.payload["product"] for status in statuses] == ["ProjectCharter", "BusinessCase"]
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+
+import aiohttp
+
+
+async def _close_at_shutdown(session):
+    # Event loops finalise the async generators still suspended when they shut down (asyncio.run() does so before
+    # closing its loop), so the session is closed while its loop can still run the close
+    try:
+        yield
+    finally:
+        await session.close()
+
+
+def _run_now(awaitable):
+    # Run an awaitable that never has to wait, such as a close on a loop that has already closed, to the end
+    # without handing it to a loop
+    try:
+        awaitable.send(None)
+    except StopIteration:
+        return
+    awaitable.close()
+
+
+class AsyncHTTPTransport:
+    """
+    Pooled asyncio HTTP transport shared by every reasoning engine in the process.
+
+    aiohttp sessions are bound to the event loop they were created on, so one session (and one concurrency semaphore)
+    is kept per running loop. A loop's session is closed when the loop shuts down through asyncio.run() or
+    loop.shutdown_asyncgens(), on aclose(), or failing those by close() once the loop has closed. Use
+    AsyncHTTPTransport.shared() to get the process-wide instance.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 20, max_concurrency: int = 100):
+        """
+        Initialize the AsyncHTTPTransport.
+
+        Args:
+            limit (int): The maximum number of open connections across all hosts.
+            limit_per_host (int): The maximum number of open connections to a single host.
+            max_concurrency (int): The maximum number of requests in flight per event loop, further callers wait.
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.max_concurrency = max_concurrency
+
+        self._sessions = {}  # event loop -> (aiohttp.ClientSession, asyncio.Semaphore, closing async generator)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the process-wide transport, creating it on first use.
+
+        Returns:
+            AsyncHTTPTransport: The shared transport.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _session_for_running_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._sessions:
+            self.close()
+        with self._lock:
+            if loop not in self._sessions:
+                connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+                session = aiohttp.ClientSession(connector=connector)
+                closer = _close_at_shutdown(session)
+                _run_now(anext(closer))  # started while the loop runs, so the loop finalises it at shutdown
+                self._sessions[loop] = (session, asyncio.Semaphore(self.max_concurrency), closer)
+            return self._sessions[loop][:2]
+
+    def close(self):
+        """
+        Close the sessions belonging to event loops that have since been closed without closing them, releasing
+        their connections. Called whenever a session is created for a new loop.
+        """
+        with self._lock:
+            stale = [self._sessions.pop(loop) for loop in list(self._sessions) if loop.is_closed()]
+        for _, _, closer in stale:
+            _run_now(closer.aclose())  # closes the session
+
+    @staticmethod
+    def _timeout(connect_timeout, read_timeout):
+        # no total timeout, a long completion is fine as long as bytes keep arriving
+        return aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+
+    async def post_json(self, url, headers, payload, connect_timeout: float = 10, read_timeout: float = 60) -> dict:
+        """
+        Send a JSON POST request and return the decoded JSON body.
+
+        Cancelling the awaiting task aborts the request and returns its connection to the pool.
+
+        Args:
+            url (str): The URL to post to.
+            headers (dict): The request headers.
+            payload (dict): The JSON payload.
+            connect_timeout (float): The longest wait for a connection in seconds.
+            read_timeout (float): The longest wait for the next chunk of the response in seconds.
+
+        Returns:
+            dict: The decoded response body.
+        """
+        session, semaphore = self._session_for_running_loop()
+        async with semaphore:
+            async with session.post(url, headers=headers, json=payload,
+                                    timeout=self._timeout(connect_timeout, read_timeout)) as response:
+                response.raise_for_status()
+                return await response.json()
+
+    async def stream_lines(self, url, headers, payload, connect_timeout: float = 10, read_timeout: float = 60):
+        """
+        Send a JSON POST request and yield the response body line by line as it arrives.
+
+        Args:
+            url (str): The URL to post to.
+            headers (dict): The request headers.
+            payload (dict): The JSON payload.
+            connect_timeout (float): The longest wait for a connection in seconds.
+            read_timeout (float): The longest wait for the next chunk of the body in seconds.
+
+        Yields:
+            str: Each line of the response body without its line ending.
+        """
+        session, semaphore = self._session_for_running_loop()
+        async with semaphore:
+            async with session.post(url, headers=headers, json=payload,
+                                    timeout=self._timeout(connect_timeout, read_timeout)) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    yield line.decode().rstrip("\r\n")
+
+    async def aclose(self):
+        """
+        Close the session belonging to the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            _, _, closer = self._sessions.pop(loop, (None, None, None))
+        if closer is not None:
+            await closer.aclose()  # closes the session
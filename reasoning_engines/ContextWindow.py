@@ -0,0 +1,166 @@
+from collections import deque
+
+from .TokenCounter import TokenCounter
+
+
+REPLY_PRIMING_TOKENS = 3  # every reply is primed with <|start|>assistant<|message|>
+
+
+class ContextWindow:
+    """
+    A layer's conversation history, kept under a token budget.
+
+    System messages form a pinned prefix that is always sent. Other turns are kept in order until the prompt exceeds
+    max_tokens, at which point the oldest turns are dropped until it is back under low_watermark of the budget, so
+    that trimming happens in occasional batches rather than on every turn. A summarizer, if given, folds the dropped
+    turns into a running summary that is sent after the pinned prefix. Per-message token counts come from the
+    TokenCounter cache and are kept alongside each turn, so the prompt size is known without re-counting.
+    """
+
+    def __init__(self, max_tokens: int = 3000, model: str = 'gpt-3.5-turbo', low_watermark: float = 0.75,
+                 token_counter: TokenCounter | None = None, summarizer=None):
+        """
+        Initialize the ContextWindow.
+
+        Args:
+            max_tokens (int): The token budget for the whole prompt.
+            model (str): The model whose token counting rules apply.
+            low_watermark (float): The fraction of max_tokens to trim the prompt down to once it exceeds max_tokens.
+            token_counter (TokenCounter): Counts message tokens, the shared counter by default.
+            summarizer: A callable taking the dropped turns and the previous summary (or None) and returning the new
+                summary, or None to drop old turns outright.
+        """
+        self.max_tokens = max_tokens
+        self.model = model
+        self.low_watermark = low_watermark
+        self.token_counter = token_counter or TokenCounter.shared()
+        self.summarizer = summarizer
+
+        self.system = []  # pinned prefix, (message, tokens)
+        self.turns = deque()  # (message, tokens), oldest first
+        self.summary = None  # (message, tokens) standing in for the dropped turns
+        self.evicted = 0
+        self.summaries = 0
+
+        self._system_tokens = 0
+        self._turn_tokens = 0
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """
+        Create a context window sized by the [ContextWindow] section of the config. Every layer gets its own.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+            **kwargs: Further keyword arguments passed to ContextWindow.
+
+        Returns:
+            ContextWindow: The new context window.
+        """
+        if config.has_section("ContextWindow"):
+            section = config["ContextWindow"]
+            kwargs.setdefault("max_tokens", section.getint("max_tokens", fallback=3000))
+            kwargs.setdefault("low_watermark", section.getfloat("low_watermark", fallback=0.75))
+        return cls(**kwargs)
+
+    def _count(self, message: dict) -> int:
+        return self.token_counter.count_message(message, self.model)
+
+    @property
+    def prompt_tokens(self) -> int:
+        """The number of tokens the prompt currently uses."""
+        summary_tokens = self.summary[1] if self.summary else 0
+        return self._system_tokens + summary_tokens + self._turn_tokens + REPLY_PRIMING_TOKENS
+
+    def add_system(self, content: str):
+        """
+        Add a message to the pinned system prefix.
+
+        Args:
+            content (str): The message content.
+        """
+        message = {"role": "system", "content": content}
+        tokens = self._count(message)
+        if self._system_tokens + tokens + REPLY_PRIMING_TOKENS > self.max_tokens:
+            raise ValueError(f"Pinned system prefix of {self._system_tokens + tokens} tokens exceeds the context "
+                             f"budget of {self.max_tokens} tokens")
+        self.system.append((message, tokens))
+        self._system_tokens += tokens
+        self.fit()
+
+    def add(self, role: str, content: str, summarizer=None):
+        """
+        Add a turn to the history, trimming older turns if the budget is exceeded.
+
+        Args:
+            role (str): The role, e.g. 'user' or 'assistant'.
+            content (str): The message content.
+            summarizer: Overrides the window's summarizer if this turn triggers a trim.
+        """
+        message = {"role": role, "content": content}
+        tokens = self._count(message)
+        self.turns.append((message, tokens))
+        self._turn_tokens += tokens
+        self.fit(summarizer)
+
+    def fit(self, summarizer=None):
+        """
+        Trim the history to low_watermark of the budget if the prompt exceeds max_tokens. The newest turn is always
+        kept.
+
+        Args:
+            summarizer: Overrides the window's summarizer for this trim.
+        """
+        if self.prompt_tokens <= self.max_tokens:
+            return
+        summarizer = summarizer or self.summarizer
+        target = self.max_tokens * self.low_watermark
+        dropped = []
+        while len(self.turns) > 1 and self.prompt_tokens > target:
+            message, tokens = self.turns.popleft()
+            self._turn_tokens -= tokens
+            dropped.append(message)
+        self.evicted += len(dropped)
+
+        if dropped and summarizer is not None:
+            previous = self.summary[0]["content"] if self.summary else None
+            content = summarizer(dropped, previous)
+            if content:
+                message = {"role": "system", "content": content}
+                self.summary = (message, self._count(message))
+                self.summaries += 1
+            if self.prompt_tokens > self.max_tokens:
+                self.summary = None  # a summary that does not fit is worth less than the turns it would crowd out
+
+    def prompt(self) -> list[dict]:
+        """
+        Get the messages to send: the pinned prefix, the summary of dropped turns if any, then the kept turns.
+        """
+        messages = [message for message, _ in self.system]
+        if self.summary:
+            messages.append(self.summary[0])
+        messages.extend(message for message, _ in self.turns)
+        return messages
+
+    def clear(self):
+        """
+        Forget the history and its summary, keeping the pinned prefix.
+        """
+        self.turns.clear()
+        self._turn_tokens = 0
+        self.summary = None
+
+    def stats(self) -> dict:
+        """
+        Report the size of the prompt.
+
+        Returns:
+            dict: The prompt's tokens and budget, the turns kept, and the turns evicted and summaries made so far.
+        """
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "max_tokens": self.max_tokens,
+            "turns": len(self.turns),
+            "evicted": self.evicted,
+            "summaries": self.summaries,
+        }
@@ -1,39 +1,545 @@
 # GPTModels.py
-import tiktoken
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from .ContextWindow import ContextWindow
+from .Hedging import HedgeLeg, HedgePolicy
+from .ModelRouter import ModelRouter
 from .OpenRouterModel import OpenRouterModel
+from .RateLimiter import RateLimiter
+from .ResponseCache import ResponseCache, request_key
+from .SingleFlight import SingleFlight
+from .TokenCounter import TokenCounter, resolve_token_model
+from .TokenStream import AsyncTokenStream, StreamMetrics, TokenStream
+from telemetry import annotate, traced
+
+
+PRICING_LOOKUP = {"input": {'gpt-3.5-turbo-0613': 0.0015, 'gpt-3.5-turbo-16k-0613': 0.003, 'gpt-4-0314': 0.03,
+                            'gpt-4-32k-0314': 0.06, 'gpt-4-0613': 0.03, 'gpt-4-32k-0613': 0.06},
+                  "output": {'gpt-3.5-turbo-0613': 0.002, 'gpt-3.5-turbo-16k-0613': 0.004, 'gpt-4-0314': 0.06,
+                             'gpt-4-32k-0314': 0.12, 'gpt-4-0613': 0.06, 'gpt-4-32k-0613': 0.12}}
 
 
 class GPTModel:
 
-    def __init__(self, model: str = 'gpt-3.5-turbo'):
+    def __init__(self, model: str = 'gpt-3.5-turbo', cache: ResponseCache | None = None,
+                 single_flight: SingleFlight | None = None, rate_limiter: RateLimiter | None = None,
+                 max_output_tokens: int = 1024, router: ModelRouter | None = None,
+                 latency_slo: float | None = None, hedging: HedgePolicy | None = None,
+                 context: ContextWindow | None = None, summarize_history: bool = False):
         self.model = model
-        self.messages = []
-        self.client = OpenRouterModel()
+        self.cache = cache  # optional ResponseCache, replies are reused for identical requests when set
+        self.single_flight = single_flight  # optional SingleFlight, identical concurrent requests are sent once
+        self.rate_limiter = rate_limiter  # optional RateLimiter, requests wait for the provider's rate limits
+        self.router = router  # optional ModelRouter, each request goes to the cheapest model that can serve it
+        self.latency_slo = latency_slo  # p95 seconds this model's requests need, defaults to the router's SLO
+        self.hedging = hedging  # optional HedgePolicy, generate() duplicates requests that are slow to answer
+        self._hedge_pool = None
+        self._hedge_pool_lock = threading.Lock()
+        # replies are capped at max_output_tokens, bounding the worst case cost reserved before each call
+        self.max_output_tokens = max_output_tokens
+        self.client = OpenRouterModel(max_tokens=max_output_tokens)
+        self.token_counter = TokenCounter.shared()
+        self.stream_metrics = deque(maxlen=100)  # StreamMetrics of the most recent streamed completions
+        # the conversation history chat() sends, kept under a token budget
+        self.context = context or ContextWindow(model=model, token_counter=self.token_counter)
+        self.summarize_history = summarize_history  # fold turns dropped from the context into a summary
 
     def choose_model(self, budget: float) -> str:
-        """Select an OpenRouter model based on remaining budget."""
+        """Select an OpenRouter model based on remaining budget, used when no router is set."""
         if budget > 1:
             return 'openai/gpt-4'
         return 'openai/gpt-3.5-turbo'
 
-    def generate(self, messages, currency_resource=None):
-        """Generate a response using OpenRouter and deduct cost."""
+    def _select_model(self, messages, currency_resource):
+        """Pick the model for a call, by size, budget and live latency when a router is set."""
+        if self.router is not None:
+            input_tokens, _ = self.measure_tokens(messages, self.model, 'input')
+            budget = currency_resource.available if currency_resource else None
+            return self.router.route(input_tokens, self.max_output_tokens, budget, self.latency_slo).name
         if currency_resource:
-            model = self.choose_model(currency_resource.budget)
-        else:
-            model = self.model
+            return self.choose_model(currency_resource.budget)
+        return self.model
+
+    def _record_call(self, model, started, ok):
+        """Feed the latency and outcome of a call to the router's rolling measurements."""
+        if self.router is not None:
+            self.router.record(model, time.monotonic() - started, ok)
+
+    def _cached_reply(self, model, messages, currency_resource):
+        """Return a cached reply for the request, charging its original cost only if the cache is set to."""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(request_key(model, messages))
+        if cached is None:
+            return None
+        reply, cost = cached
+        if currency_resource and self.cache.charge_on_hit:
+            currency_resource.spend(cost)
+        return reply
+
+    def _reserve(self, messages, model, currency_resource):
+        """
+        Reserve the worst case cost of a call, its input plus max_output_tokens of output, before it is sent.
+
+        Returns:
+            tuple: The input tokens, the input cost, and the Reservation to settle (None without a currency resource).
+        """
         input_tokens, input_cost = self.measure_tokens(messages, model, 'input')
-        if currency_resource and currency_resource.budget < input_cost:
-            raise ValueError('Insufficient funds')
-        reply = self.client.generate(model=model, messages=messages)
+        if not currency_resource:
+            return input_tokens, input_cost, None
+        worst_case = input_cost + self.max_output_tokens * self.token_price(model, 'output') / 1000
+        try:
+            reservation = currency_resource.reserve(worst_case)
+        except ValueError as e:
+            raise ValueError(f'Insufficient funds: {e}') from e
+        return input_tokens, input_cost, reservation
+
+    def _settle_call(self, reply, model, messages, input_cost, reservation, share=1.0, leader=True):
+        """
+        Commit the cost of a completed call to its budget reservation and cache the reply.
+
+        When the call was shared with identical in-flight requests, share is the fraction of its cost this caller
+        pays, and only the leader that sent it caches the reply.
+        """
         output_tokens, output_cost = self.measure_tokens([
             {"role": "assistant", "content": reply}
         ], model, 'output')
         total_cost = input_cost + output_cost
-        if currency_resource:
-            currency_resource.spend(total_cost)
+        if reservation is not None and share > 0:
+            reservation.commit(total_cost * share)
+        if self.rate_limiter is not None and leader:
+            self.rate_limiter.consume(output_tokens)
+        if self.cache is not None and leader:
+            self.cache.put(request_key(model, messages), model, reply, total_cost)
+
+    def _call(self, model, messages, input_tokens=0, leg=None):
+        """Send one request once the rate limiter allows it, feeding its latency to the router."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(input_tokens)
+        if leg is not None:
+            leg.sent = True
+        started = time.monotonic()
+        try:
+            reply = self.client.generate(model=model, messages=messages)
+        except Exception:
+            self._record_call(model, started, ok=False)
+            raise
+        self._record_call(model, started, ok=True)
+        return reply
+
+    async def _acall(self, model, messages, input_tokens=0, leg=None):
+        """Send one request without blocking the event loop, see _call()."""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire(input_tokens)
+        if leg is not None:
+            leg.sent = True
+        started = time.monotonic()
+        try:
+            reply = await self.client.agenerate(model=model, messages=messages)
+        except Exception:
+            self._record_call(model, started, ok=False)
+            raise
+        self._record_call(model, started, ok=True)
+        return reply
+
+    def _send(self, model, messages, input_tokens=0):
+        """
+        Send a request, joining an identical one already in flight when single-flight is enabled. Only a request that
+        is actually sent waits for the rate limiter.
+        """
+        if self.single_flight is None:
+            return self._call(model, messages, input_tokens), 1.0, True
+        reply, leader, callers = self.single_flight.do(request_key(model, messages),
+                                                       lambda: self._call(model, messages, input_tokens))
+        return reply, self.single_flight.share(leader, callers), leader
+
+    async def _asend(self, model, messages, input_tokens=0):
+        """Send a request without blocking the event loop, see _send()."""
+        if self.single_flight is None:
+            return await self._acall(model, messages, input_tokens), 1.0, True
+        reply, leader, callers = await self.single_flight.ado(request_key(model, messages),
+                                                              lambda: self._acall(model, messages, input_tokens))
+        return reply, self.single_flight.share(leader, callers), leader
+
+    def _hedge_model(self, model, messages, currency_resource):
+        """Pick the model a hedge goes to, the router's best alternative when the policy asks for one."""
+        if not self.hedging.alternate_model or self.router is None:
+            return model
+        input_tokens, _ = self.measure_tokens(messages, self.model, 'input')
+        budget = currency_resource.available if currency_resource else None
+        try:
+            return self.router.route(input_tokens, self.max_output_tokens, budget, self.latency_slo,
+                                     exclude={model}).name
+        except ValueError:
+            return model
+
+    def _new_leg(self, model, messages, currency_resource):
+        """Reserve the budget for one leg of a hedged call."""
+        input_tokens, input_cost, reservation = self._reserve(messages, model, currency_resource)
+        return HedgeLeg(model, input_cost, reservation), input_tokens
+
+    def _settle_leg(self, leg, messages, reply=None):
+        """
+        Charge a finished leg of a hedged call in full, or hand its reservation back if it failed or was cancelled
+        before it was sent. A leg cancelled after it was sent is charged its input cost, the prompt having already
+        reached the provider.
+        """
+        try:
+            if reply is not None:
+                self._settle_call(reply, leg.model, messages, leg.input_cost, leg.reservation)
+            elif leg.sent and leg.reservation is not None and leg.future.cancelled():
+                leg.reservation.commit(leg.input_cost)
+        finally:
+            if leg.reservation is not None:
+                leg.reservation.release()
+
+    def _first_leg_done(self, leg):
+        """Record how long the first leg took, or had taken when it was cancelled."""
+        def done(future):
+            if future.cancelled() or future.exception() is None:
+                self.hedging.record_first(time.monotonic() - leg.started)
+        return done
+
+    def _hedge_executor(self):
+        with self._hedge_pool_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="GPTModel-hedge")
+            return self._hedge_pool
+
+    def _hedged_generate(self, model, messages, currency_resource):
+        """
+        Send a request, and a hedge if no reply arrives within the policy's delay, and return the first reply.
+
+        A blocking request cannot be interrupted from another thread, so the losing leg runs to completion in the
+        background and is charged in full when it finishes.
+        """
+        executor = self._hedge_executor()
+        legs = []
+
+        def start(leg_model):
+            leg, input_tokens = self._new_leg(leg_model, messages, currency_resource)
+            leg.future = executor.submit(self._call, leg_model, messages, input_tokens, leg)
+            legs.append(leg)
+
+        start(model)
+        first = legs[0]
+        first.future.add_done_callback(self._first_leg_done(first))
+        futures.wait([first.future], timeout=self.hedging.delay())
+        if not first.future.done() and self.hedging.should_hedge():
+            try:
+                start(self._hedge_model(model, messages, currency_resource))
+            except ValueError:
+                pass  # a second leg is not affordable, wait for the first
+
+        pending = {leg.future: leg for leg in legs}
+        winner, error = None, None
+        while pending and winner is None:
+            done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                leg = pending.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    self._settle_leg(leg, messages)
+                elif winner is None:
+                    winner = leg
+                else:
+                    self._settle_leg(leg, messages, future.result())
+        for future, leg in pending.items():
+            future.add_done_callback(
+                lambda f, leg=leg: self._settle_leg(leg, messages, None if f.exception() else f.result()))
+
+        self.hedging.record(time.monotonic() - first.started, hedged=len(legs) > 1,
+                            hedge_won=winner is not None and winner is not first)
+        if winner is None:
+            raise error
+        reply = winner.future.result()
+        self._settle_leg(winner, messages, reply)
+        return reply
+
+    async def _ahedged_generate(self, model, messages, currency_resource):
+        """
+        Send a request without blocking the event loop, and a hedge if no reply arrives within the policy's delay.
+        The first reply is returned and the losing leg is cancelled.
+        """
+        legs, settled = [], set()
+
+        def start(leg_model):
+            leg, input_tokens = self._new_leg(leg_model, messages, currency_resource)
+            leg.future = asyncio.ensure_future(self._acall(leg_model, messages, input_tokens, leg))
+            legs.append(leg)
+
+        start(model)
+        first = legs[0]
+        first.future.add_done_callback(self._first_leg_done(first))
+        winner, error = None, None
+        try:
+            await asyncio.wait({first.future}, timeout=self.hedging.delay())
+            if not first.future.done() and self.hedging.should_hedge():
+                try:
+                    start(self._hedge_model(model, messages, currency_resource))
+                except ValueError:
+                    pass  # a second leg is not affordable, wait for the first
+
+            pending = {leg.future: leg for leg in legs}
+            while pending and winner is None:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    leg = pending.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                    elif winner is None:
+                        winner = leg
+                        continue
+                    else:
+                        self._settle_leg(leg, messages, future.result())
+                        settled.add(leg)
+                        continue
+                    self._settle_leg(leg, messages)
+                    settled.add(leg)
+        finally:
+            for leg in legs:
+                if leg is winner or leg in settled:
+                    continue
+                leg.future.cancel()
+                try:
+                    await leg.future  # let the cancellation land so the leg's state is final
+                except BaseException:
+                    pass
+                self._settle_leg(leg, messages, None if leg.future.cancelled() or leg.future.exception()
+                                 else leg.future.result())
+
+        self.hedging.record(time.monotonic() - first.started, hedged=len(legs) > 1,
+                            hedge_won=winner is not None and winner is not first)
+        if winner is None:
+            raise error
+        reply = winner.future.result()
+        self._settle_leg(winner, messages, reply)
+        return reply
+
+    @traced("GPTModel.generate")
+    def generate(self, messages, currency_resource=None):
+        """
+        Generate a response using OpenRouter and deduct cost.
+
+        With a hedging policy set, a request slow to answer is duplicated and the first reply is used, both legs being
+        charged. Hedged requests are not coalesced with identical ones in flight.
+        """
+        model = self._select_model(messages, currency_resource)
+        reply = self._cached_reply(model, messages, currency_resource)
+        annotate(model=model, cached=reply is not None)
+        if reply is not None:
+            return reply
+        if self.hedging is not None:
+            return self._hedged_generate(model, messages, currency_resource)
+        input_tokens, input_cost, reservation = self._reserve(messages, model, currency_resource)
+        try:
+            reply, share, leader = self._send(model, messages, input_tokens)
+            self._settle_call(reply, model, messages, input_cost, reservation, share, leader)
+        finally:
+            if reservation is not None:
+                reservation.release()  # a failed or free call hands its reservation back
         return reply
 
+    @traced("GPTModel.generate")
+    async def agenerate(self, messages, currency_resource=None):
+        """
+        Generate a response using OpenRouter without blocking the event loop, and deduct cost.
+
+        Cancelling the awaiting task aborts the request, its reservation is released and nothing is charged to the
+        currency resource.
+        """
+        model = self._select_model(messages, currency_resource)
+        reply = self._cached_reply(model, messages, currency_resource)
+        annotate(model=model, cached=reply is not None)
+        if reply is not None:
+            return reply
+        if self.hedging is not None:
+            return await self._ahedged_generate(model, messages, currency_resource)
+        input_tokens, input_cost, reservation = self._reserve(messages, model, currency_resource)
+        try:
+            reply, share, leader = await self._asend(model, messages, input_tokens)
+            self._settle_call(reply, model, messages, input_cost, reservation, share, leader)
+        finally:
+            if reservation is not None:
+                reservation.release()
+        return reply
+
+    def _check_batch_budget(self, message_lists, currency_resource):
+        """Check the combined input cost of a batch against the budget before anything is sent."""
+        if not currency_resource:
+            return
+        batch_cost = sum(self.measure_tokens(messages, self._select_model(messages, currency_resource), 'input')[1]
+                         for messages in message_lists)
+        if currency_resource.available < batch_cost:
+            raise ValueError(f'Insufficient funds for batch of {len(message_lists)}: '
+                             f'needs ${batch_cost:.4f}, has ${currency_resource.available:.4f}')
+
+    def generate_many(self, message_lists, currency_resource=None, max_concurrency: int = 8) -> list:
+        """
+        Generate responses for several prompts in parallel and return them in input order.
+
+        The input cost of the whole batch is checked against the budget up front. A failing prompt does not stop the
+        others, its exception is returned in its place instead.
+
+        Args:
+            message_lists (list[list[dict]]): One list of chat messages per prompt.
+            currency_resource (CurrencyResource): The budget to charge.
+            max_concurrency (int): The maximum number of requests in flight at once.
+
+        Returns:
+            list: The reply, or the exception raised, for each prompt.
+        """
+        message_lists = list(message_lists)
+        if not message_lists:
+            return []
+        self._check_batch_budget(message_lists, currency_resource)
+
+        def generate_one(messages):
+            try:
+                return self.generate(messages, currency_resource)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(message_lists))) as executor:
+            return list(executor.map(generate_one, message_lists))
+
+    async def agenerate_many(self, message_lists, currency_resource=None, max_concurrency: int = 8) -> list:
+        """
+        Generate responses for several prompts concurrently on the running event loop, see generate_many().
+        """
+        message_lists = list(message_lists)
+        if not message_lists:
+            return []
+        self._check_batch_budget(message_lists, currency_resource)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate_one(messages):
+            async with semaphore:
+                return await self.agenerate(messages, currency_resource)
+
+        return await asyncio.gather(*[generate_one(messages) for messages in message_lists], return_exceptions=True)
+
+    def _stream_parts(self, messages, currency_resource):
+        """
+        Build the metrics, delta pricing, reservation and settlement shared by stream and astream.
+
+        The worst case cost is only reserved when the stream is first iterated, so a stream that is dropped unread
+        holds none of the budget.
+        """
+        model = self._select_model(messages, currency_resource)
+        cached = self._cached_reply(model, messages, currency_resource)
+        if cached is not None:
+            return model, cached, StreamMetrics(model), lambda delta: (0, 0.0), self.stream_metrics.append, None
+
+        metrics = StreamMetrics(model)
+        reservation = None
+        encoding = self.token_counter.encoding_for(model)
+        price_per_token = self.token_price(model, 'output') / 1000
+
+        def on_start():
+            nonlocal reservation
+            metrics.input_tokens, metrics.input_cost, reservation = self._reserve(messages, model, currency_resource)
+
+        def price_delta(delta):
+            tokens = len(encoding.encode(delta))
+            return tokens, tokens * price_per_token
+
+        def on_finish(text, finished_metrics):
+            self.stream_metrics.append(finished_metrics)
+            if finished_metrics.first_token_at is None:
+                if reservation is not None:
+                    reservation.release()  # nothing was generated, as with a failed generate() nothing is charged
+                return
+            if reservation is not None:
+                reservation.commit(finished_metrics.total_cost)
+            if self.rate_limiter is not None:
+                self.rate_limiter.consume(finished_metrics.output_tokens)
+            if self.cache is not None and finished_metrics.completed:
+                self.cache.put(request_key(model, messages), model, text, finished_metrics.total_cost)
+
+        return model, None, metrics, price_delta, on_finish, on_start
+
+    def stream(self, messages, currency_resource=None) -> TokenStream:
+        """
+        Stream a response using OpenRouter, yielding text deltas as they arrive.
+
+        Nothing is reserved or sent until the stream is first iterated. Output cost is tallied on the stream's metrics
+        as deltas arrive, along with time to first token and tokens per second, and the total is deducted once the
+        stream finishes or is closed.
+        """
+        model, cached, metrics, price_delta, on_finish, on_start = self._stream_parts(messages, currency_resource)
+        if cached is not None:
+            return TokenStream(iter([cached]), metrics, price_delta, on_finish)
+
+        def deltas():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(metrics.input_tokens)
+            yield from self.client.stream(model=model, messages=messages)
+        return TokenStream(deltas(), metrics, price_delta, on_finish, on_start)
+
+    def astream(self, messages, currency_resource=None) -> AsyncTokenStream:
+        """
+        Stream a response using OpenRouter without blocking the event loop, see stream().
+        """
+        model, cached, metrics, price_delta, on_finish, on_start = self._stream_parts(messages, currency_resource)
+        if cached is not None:
+            async def cached_deltas():
+                yield cached
+            return AsyncTokenStream(cached_deltas(), metrics, price_delta, on_finish)
+
+        async def deltas():
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(metrics.input_tokens)
+            async for delta in self.client.astream(model=model, messages=messages):
+                yield delta
+        return AsyncTokenStream(deltas(), metrics, price_delta, on_finish, on_start)
+
+    @property
+    def messages(self) -> list[dict]:
+        """The conversation history as it would be sent, see ContextWindow.prompt()."""
+        return self.context.prompt()
+
+    def chat(self, content, currency_resource=None):
+        """
+        Add a user message to the conversation history, generate a reply to the whole history and add it too.
+
+        Args:
+            content (str): The user message.
+            currency_resource (CurrencyResource): The budget to charge, including any summaries of dropped turns.
+
+        Returns:
+            str: The reply.
+        """
+        summarizer = None
+        if self.summarize_history:
+            def summarizer(dropped, previous):
+                return self.summarize(dropped, previous, currency_resource)
+        self.context.add("user", content, summarizer)
+        reply = self.generate(self.context.prompt(), currency_resource)
+        self.context.add("assistant", reply, summarizer)
+        return reply
+
+    def summarize(self, messages, previous_summary=None, currency_resource=None) -> str:
+        """
+        Summarize conversation turns, folding in the summary of the turns before them.
+
+        Returns:
+            str: The summary.
+        """
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        if previous_summary:
+            transcript = f"Earlier summary: {previous_summary}\n{transcript}"
+        return self.generate([
+            {"role": "system", "content": "Summarise this conversation in a few sentences, keeping the decisions, "
+                                          "facts and open questions needed to continue it."},
+            {"role": "user", "content": transcript},
+        ], currency_resource)
+
     def execute(self, args):
         pass
 
@@ -41,54 +547,33 @@ class GPTModel:
         pass
 
     def add_system_message(self, args):
-        pass
+        """Add a message to the pinned system prefix of the conversation history."""
+        self.context.add_system(args)
 
     def add_user_message(self, args):
-        pass
+        """Add a user message to the conversation history."""
+        self.context.add("user", args)
+
+    def add_assistant_message(self, args):
+        """Add an assistant message to the conversation history."""
+        self.context.add("assistant", args)
+
+    def token_price(self, model, direction):
+        """
+        Price in USD per 1000 tokens for a model, direction is 'input' or 'output'. Models in the router's table are
+        priced from it, others from PRICING_LOOKUP.
+        """
+        spec = self.router.spec(model) if self.router is not None else None
+        if spec is not None:
+            return spec.input_price if direction == 'input' else spec.output_price
+        return PRICING_LOOKUP[direction][resolve_token_model(model)]
 
     def measure_tokens(self, messages, model, direction):
         """Counts tokens in a message using tiktoken, calculates cost based on current OpenAI pricing."""
+        spec = self.router.spec(model) if self.router is not None else None
 
-        def _num_tokens_from_messages(messages, model="gpt-3.5-turbo-0613"):
-            """Return the number of tokens used by a list of messages."""
-            try:
-                encoding = tiktoken.encoding_for_model(model)
-            except KeyError:
-                print("Warning: model not found. Using cl100k_base encoding.")
-                encoding = tiktoken.get_encoding("cl100k_base")
-            if model in {"gpt-3.5-turbo-0613", "gpt-3.5-turbo-16k-0613", "gpt-4-0314", "gpt-4-32k-0314", "gpt-4-0613",
-                "gpt-4-32k-0613", }:
-                tokens_per_message = 3
-                tokens_per_name = 1
-            elif model == "gpt-3.5-turbo-0301":
-                tokens_per_message = 4  # every message follows <|start|>{role/name}\n{content}<|end|>\n
-                tokens_per_name = -1  # if there's a name, the role is omitted
-            elif "gpt-3.5-turbo" in model:
-                print("Warning: gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0613.")
-                return _num_tokens_from_messages(messages, model="gpt-3.5-turbo-0613")
-            elif "gpt-4" in model:
-                print("Warning: gpt-4 may update over time. Returning num tokens assuming gpt-4-0613.")
-                return _num_tokens_from_messages(messages, model="gpt-4-0613")
-            else:
-                raise NotImplementedError(
-                    f"""num_tokens_from_messages() is not implemented for model {model}. See https://github.com/openai/openai-python/blob/main/chatml.md for information on how messages are converted to tokens.""")
-            num_tokens = 0
-            for message in messages:
-                num_tokens += tokens_per_message
-                for key, value in message.items():
-                    num_tokens += len(encoding.encode(value))
-                    if key == "name":
-                        num_tokens += tokens_per_name
-            num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
-            return num_tokens
-
-        token_count = _num_tokens_from_messages(messages, model)
-
-        pricing_lookup = {"input": {'gpt-3.5-turbo-0613': 0.0015, 'gpt-3.5-turbo-16k-0613': 0.003, 'gpt-4-0314': 0.03,
-                                    'gpt-4-32k-0314': 0.06, 'gpt-4-0613': 0.03, 'gpt-4-32k-0613': 0.06},
-                          "output": {'gpt-3.5-turbo-0613': 0.002, 'gpt-3.5-turbo-16k-0613': 0.004, 'gpt-4-0314': 0.06,
-                                     'gpt-4-32k-0314': 0.12, 'gpt-4-0613': 0.06, 'gpt-4-32k-0613': 0.12}}
-
-        cost = (token_count * pricing_lookup[direction][model]) / 1000
+        token_count = self.token_counter.count_messages(messages, spec.tokenizer if spec is not None else model)
+
+        cost = (token_count * self.token_price(model, direction)) / 1000
 
         return token_count, cost
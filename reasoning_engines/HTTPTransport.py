@@ -0,0 +1,111 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPTransport:
+    """
+    Pooled keep-alive HTTP transport shared by every reasoning engine in the process.
+
+    A single requests.Session is reused for all calls so that TCP and TLS handshakes are only paid when the pool has
+    no idle connection for the target host. Use HTTPTransport.shared() to get the process-wide instance.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 20, pool_block: bool = True):
+        """
+        Initialize the HTTPTransport.
+
+        Args:
+            pool_connections (int): The number of per-host connection pools to keep.
+            pool_maxsize (int): The maximum number of connections kept open to a single host.
+            pool_block (bool): Whether callers wait for a free connection once a host's pool is exhausted, rather than
+                opening extra connections that are discarded afterwards.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the process-wide transport, creating it on first use.
+
+        Returns:
+            HTTPTransport: The shared transport.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def configure_shared(cls, **kwargs):
+        """
+        Replace the process-wide transport with one built from the given pool settings.
+
+        Args:
+            **kwargs: Keyword arguments passed to HTTPTransport.
+
+        Returns:
+            HTTPTransport: The new shared transport.
+        """
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.close()
+            cls._shared = cls(**kwargs)
+        return cls._shared
+
+    def post(self, url, **kwargs):
+        """
+        Send a POST request over the pooled session.
+
+        Args:
+            url (str): The URL to post to.
+            **kwargs: Keyword arguments passed to requests.Session.post.
+
+        Returns:
+            requests.Response: The response.
+        """
+        return self.session.post(url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        Report how often pooled connections have been reused.
+
+        Returns:
+            dict: Requests sent, connections opened and reused, and the reuse ratio across all host pools.
+        """
+        requests_sent = 0
+        connections_opened = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
+
+        connections_reused = max(requests_sent - connections_opened, 0)
+        return {
+            "requests": requests_sent,
+            "connections_opened": connections_opened,
+            "connections_reused": connections_reused,
+            "reuse_ratio": connections_reused / requests_sent if requests_sent else 0.0,
+        }
+
+    def close(self):
+        """
+        Close the session and every pooled connection.
+        """
+        self.session.close()
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)] if ordered else None
+
+
+class HedgeLeg:
+    """
+    One of the requests sent for a hedged call, along with the budget reserved for it.
+    """
+
+    def __init__(self, model: str, input_cost: float, reservation):
+        self.model = model
+        self.input_cost = input_cost
+        self.reservation = reservation
+        self.started = time.monotonic()
+        self.sent = False  # set once the request has passed the rate limiter and gone out
+        self.future = None  # concurrent.futures.Future or asyncio.Task of the request
+
+
+class HedgePolicy:
+    """
+    Decides when a slow request gets a duplicate (a hedge) and measures what hedging buys.
+
+    A hedge is sent once the first request has been outstanding for longer than the given percentile of recent
+    request latencies, as long as no more than max_hedge_rate of requests have been hedged, so hedging adds a bounded
+    amount of extra load. Until min_samples latencies are known, initial_delay is used instead. Use
+    HedgePolicy.from_config() so the hedge rate is capped across all layers.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, percentile: float = 95, initial_delay: float = 5.0, min_delay: float = 0.5,
+                 max_hedge_rate: float = 0.1, alternate_model: bool = False, window: int = 500,
+                 min_samples: int = 20):
+        """
+        Initialize the HedgePolicy.
+
+        Args:
+            percentile (float): The percentile of recent latencies after which to hedge.
+            initial_delay (float): The delay in seconds before hedging while there are too few latencies known.
+            min_delay (float): The shortest delay in seconds before hedging.
+            max_hedge_rate (float): The largest fraction of requests that may be hedged.
+            alternate_model (bool): Send the hedge to the router's next best model instead of the same one.
+            window (int): The number of recent requests the latencies and metrics are taken over.
+            min_samples (int): The number of latencies needed before the percentile is used.
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.alternate_model = alternate_model
+        self.min_samples = min_samples
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._first_latencies = deque(maxlen=window)  # latency the first request took, or at least took
+        self._served_latencies = deque(maxlen=window)  # latency the caller saw
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, **kwargs):
+        """
+        Get the process-wide policy, creating it on first use.
+
+        Args:
+            **kwargs: Keyword arguments passed to HedgePolicy when the shared policy is created.
+
+        Returns:
+            HedgePolicy: The shared policy.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(**kwargs)
+        return cls._shared
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Get the shared policy if hedging is enabled in the [Hedging] section of the config.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            HedgePolicy: The shared policy, or None if hedging is disabled.
+        """
+        if not config.has_section("Hedging"):
+            return None
+        section = config["Hedging"]
+        if not section.getboolean("enabled", fallback=False):
+            return None
+        return cls.shared(percentile=section.getfloat("percentile", fallback=95),
+                          initial_delay=section.getfloat("initial_delay", fallback=5.0),
+                          min_delay=section.getfloat("min_delay", fallback=0.5),
+                          max_hedge_rate=section.getfloat("max_hedge_rate", fallback=0.1),
+                          alternate_model=section.getboolean("alternate_model", fallback=False))
+
+    def delay(self) -> float:
+        """
+        Get how long to wait for the first request before hedging.
+        """
+        with self._lock:
+            if len(self._first_latencies) < self.min_samples:
+                return self.initial_delay
+            return max(_percentile(self._first_latencies, self.percentile), self.min_delay)
+
+    def should_hedge(self) -> bool:
+        """
+        Check that one more hedge stays within max_hedge_rate.
+        """
+        with self._lock:
+            return self.hedged + 1 <= self.max_hedge_rate * (self.requests + 1)
+
+    def record(self, served_latency: float, hedged: bool, hedge_won: bool):
+        """
+        Record a finished call.
+
+        Args:
+            served_latency (float): How long the caller waited for a reply.
+            hedged (bool): Whether a hedge was sent.
+            hedge_won (bool): Whether the hedge's reply was used.
+        """
+        with self._lock:
+            self.requests += 1
+            self.hedged += hedged
+            self.hedge_wins += hedge_won
+            self._served_latencies.append(served_latency)
+
+    def record_first(self, latency: float):
+        """
+        Record how long the first request of a call took, or had taken when it was cancelled.
+        """
+        with self._lock:
+            self._first_latencies.append(latency)
+
+    def stats(self) -> dict:
+        """
+        Report how often requests were hedged and what it did to tail latency.
+
+        The p99 without hedging is taken from how long the first requests took. A first request cancelled because its
+        hedge won counts as taking only as long as it had run, so the improvement reported is a lower bound.
+
+        Returns:
+            dict: Requests, hedges sent and won, hedge rate, and p99 latency with and without hedging in seconds.
+        """
+        with self._lock:
+            p99 = _percentile(self._served_latencies, 99)
+            p99_unhedged = _percentile(self._first_latencies, 99)
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+                "p99_latency": p99,
+                "p99_latency_unhedged": p99_unhedged,
+                "p99_improvement": p99_unhedged - p99 if None not in (p99, p99_unhedged) else 0.0,
+            }
@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import deque
+
+
+class ModelSpec:
+    """
+    A model the router can send requests to, as configured in a [Model:<name>] section of config.ini.
+    """
+
+    def __init__(self, name: str, input_price: float, output_price: float, context_window: int, tokenizer: str):
+        """
+        Initialize the ModelSpec.
+
+        Args:
+            name (str): The OpenRouter model name, e.g. 'openai/gpt-3.5-turbo'.
+            input_price (float): The price in USD per 1000 input tokens.
+            output_price (float): The price in USD per 1000 output tokens.
+            context_window (int): The most tokens a request and its reply may use together.
+            tokenizer (str): The model whose token counting rules apply, e.g. 'gpt-3.5-turbo-0613'.
+        """
+        self.name = name
+        self.input_price = input_price
+        self.output_price = output_price
+        self.context_window = context_window
+        self.tokenizer = tokenizer
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        """Get the cost in USD of a request of the given size."""
+        return (input_tokens * self.input_price + output_tokens * self.output_price) / 1000
+
+    def __repr__(self):
+        return f"ModelSpec({self.name!r})"
+
+
+class ModelRouter:
+    """
+    Picks the cheapest model able to serve each request.
+
+    A model is eligible when the request and its longest reply fit its context window, its worst case cost fits the
+    budget, and, over a rolling window of recent calls, its error rate is at most max_error_rate and its p95 latency
+    meets the latency SLO. Models without enough recent calls to judge are given the benefit of the doubt, so a model
+    that was routed around is tried again once its bad measurements age out of the window. When no model meets the
+    SLO, the fastest one that fits is used. Use ModelRouter.from_config() to share one router, and its measurements,
+    between all layers.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, models: list[ModelSpec], latency_slo: float | None = None, max_error_rate: float = 0.25,
+                 window: int = 50, window_seconds: float = 300.0, min_samples: int = 5):
+        """
+        Initialize the ModelRouter.
+
+        Args:
+            models (list[ModelSpec]): The models to route between.
+            latency_slo (float): The p95 latency in seconds a model must keep to, None for no SLO.
+            max_error_rate (float): The highest recent error rate a model may have.
+            window (int): The number of recent calls per model the measurements are taken over.
+            window_seconds (float): How long a call counts towards the measurements.
+            min_samples (int): The number of recent calls needed before a model's measurements are trusted.
+        """
+        if not models:
+            raise ValueError("ModelRouter needs at least one model.")
+        self.models = {spec.name: spec for spec in models}
+        self.latency_slo = latency_slo
+        self.max_error_rate = max_error_rate
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+
+        self._samples = {name: deque(maxlen=window) for name in self.models}  # name -> (time, latency, ok)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, **kwargs):
+        """
+        Get the process-wide router, creating it on first use.
+
+        Args:
+            **kwargs: Keyword arguments passed to ModelRouter when the shared router is created.
+
+        Returns:
+            ModelRouter: The shared router.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(**kwargs)
+        return cls._shared
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Get the shared router if it is enabled in the [ModelRouter] section of the config, routing between the
+        models in its [Model:<name>] sections.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            ModelRouter: The shared router, or None if routing is disabled.
+        """
+        if not config.has_section("ModelRouter"):
+            return None
+        section = config["ModelRouter"]
+        if not section.getboolean("enabled", fallback=False):
+            return None
+        models = [ModelSpec(name=name.split(":", 1)[1].strip(),
+                            input_price=config[name].getfloat("input_price"),
+                            output_price=config[name].getfloat("output_price"),
+                            context_window=config[name].getint("context_window"),
+                            tokenizer=config[name].get("tokenizer"))
+                  for name in config.sections() if name.startswith("Model:")]
+        latency_slo_ms = section.getfloat("latency_slo_ms", fallback=None)
+        return cls.shared(models=models,
+                          latency_slo=latency_slo_ms / 1000 if latency_slo_ms else None,
+                          max_error_rate=section.getfloat("max_error_rate", fallback=0.25),
+                          window=section.getint("window", fallback=50),
+                          window_seconds=section.getfloat("window_seconds", fallback=300.0),
+                          min_samples=section.getint("min_samples", fallback=5))
+
+    def spec(self, model: str):
+        """
+        Get the spec of a model.
+
+        Returns:
+            ModelSpec: The spec, or None if the router does not know the model.
+        """
+        return self.models.get(model)
+
+    def record(self, model: str, latency: float, ok: bool = True):
+        """
+        Record the outcome of a call.
+
+        Args:
+            model (str): The model called.
+            latency (float): How long the call took in seconds.
+            ok (bool): Whether the call succeeded.
+        """
+        with self._lock:
+            if model in self._samples:
+                self._samples[model].append((time.monotonic(), latency, ok))
+
+    def measurements(self, model: str) -> dict:
+        """
+        Get the rolling measurements of a model.
+
+        Returns:
+            dict: The number of recent calls, their error rate, and the p95 latency of the successful ones (None if
+            there are none).
+        """
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            samples = [sample for sample in self._samples[model] if sample[0] >= cutoff]
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        return {
+            "calls": len(samples),
+            "error_rate": sum(1 for *_, ok in samples if not ok) / len(samples) if samples else 0.0,
+            "p95_latency": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else None,
+        }
+
+    def _meets_slo(self, measured, latency_slo):
+        if measured["calls"] < self.min_samples:
+            return True
+        if measured["error_rate"] > self.max_error_rate:
+            return False
+        return latency_slo is None or measured["p95_latency"] is None or measured["p95_latency"] <= latency_slo
+
+    def route(self, input_tokens: int, max_output_tokens: int, budget: float | None = None,
+              latency_slo: float | None = None, exclude=()) -> ModelSpec:
+        """
+        Pick the model for a request.
+
+        Args:
+            input_tokens (int): The tokens in the request.
+            max_output_tokens (int): The most tokens the reply may have.
+            budget (float): The most the request may cost, None for no limit.
+            latency_slo (float): The p95 latency in seconds the request needs, defaults to the router's SLO.
+            exclude: Names of models not to route to.
+
+        Returns:
+            ModelSpec: The cheapest eligible model.
+
+        Raises:
+            ValueError: If no model fits the request in its context window and the budget.
+        """
+        latency_slo = latency_slo if latency_slo is not None else self.latency_slo
+        fitting = [spec for spec in self.models.values()
+                   if spec.name not in exclude and spec.context_window >= input_tokens + max_output_tokens
+                   and (budget is None or spec.cost(input_tokens, max_output_tokens) <= budget)]
+        if not fitting:
+            raise ValueError(f"No model fits a request of {input_tokens} + {max_output_tokens} tokens"
+                             + (f" within ${budget:.4f}" if budget is not None else ""))
+
+        measured = {spec.name: self.measurements(spec.name) for spec in fitting}
+        eligible = [spec for spec in fitting if self._meets_slo(measured[spec.name], latency_slo)]
+        if eligible:
+            return min(eligible, key=lambda spec: spec.cost(input_tokens, max_output_tokens))
+
+        # nothing meets the SLO, prefer the healthiest and then fastest model that fits
+        def slowness(spec):
+            p95_latency = measured[spec.name]["p95_latency"]
+            return measured[spec.name]["error_rate"], p95_latency if p95_latency is not None else float("inf")
+        return min(fitting, key=slowness)
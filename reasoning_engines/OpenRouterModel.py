@@ -1,21 +1,138 @@
+import json
 import os
-import requests
+
+from .AsyncHTTPTransport import AsyncHTTPTransport
+from .HTTPTransport import HTTPTransport
+from .Resilience import Resilience
+
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
 
 class OpenRouterModel:
-    """Simple wrapper for OpenRouter chat completion API."""
+    """
+    Simple wrapper for OpenRouter chat completion API.
+
+    Set OPENROUTER_BASE_URL (or pass base_url) to point every model at another endpoint, such as the local stand-in
+    in benchmarks.MockOpenRouterServer.
+    """
 
-    def __init__(self, api_key: str | None = None):
+    def __init__(self, api_key: str | None = None, transport: HTTPTransport | None = None,
+                 async_transport: AsyncHTTPTransport | None = None, resilience: Resilience | None = None,
+                 connect_timeout: float = 10, read_timeout: float = 60, base_url: str | None = None,
+                 max_tokens: int | None = None):
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
-        self.url = "https://openrouter.ai/api/v1/chat/completions"
+        base_url = base_url or os.getenv("OPENROUTER_BASE_URL") or DEFAULT_BASE_URL
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        # every instance shares the process-wide keep-alive pools and circuit breakers unless told otherwise
+        self.transport = transport or HTTPTransport.shared()
+        self.async_transport = async_transport or AsyncHTTPTransport.shared()
+        self.resilience = resilience or Resilience.shared()
+        # a short connect timeout fails fast on a dead host, the read timeout bounds a hung socket between chunks
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_tokens = max_tokens  # caps the length of every reply when set
 
-    def generate(self, model: str, messages: list[dict]) -> str:
-        """Send a chat completion request and return the assistant text."""
-        headers = {
+    def _headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+
+    @staticmethod
+    def _parse_event(line: str):
+        """
+        Parse one line of a server-sent event stream.
+
+        Returns:
+            tuple: Whether the stream is done, and the content delta carried by the line (None if there is none).
+        """
+        if not line.startswith("data:"):
+            return False, None  # blank separators and ': keep-alive' comments
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return True, None
+        choices = json.loads(data).get("choices") or [{}]
+        return False, choices[0].get("delta", {}).get("content")
+
+    def _payload(self, model, messages, stream=False) -> dict:
         payload = {"model": model, "messages": messages}
-        response = requests.post(self.url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
+        if self.max_tokens is not None:
+            payload["max_tokens"] = self.max_tokens
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _post(self, payload, stream=False):
+        response = self.transport.post(self.url, headers=self._headers(), json=payload,
+                                       timeout=(self.connect_timeout, self.read_timeout), stream=stream)
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return response
+
+    def generate(self, model: str, messages: list[dict]) -> str:
+        """Send a chat completion request and return the assistant text, retrying transient failures."""
+        payload = self._payload(model, messages)
+        response = self.resilience.call(model, lambda: self._post(payload))
         data = response.json()
         return data["choices"][0]["message"]["content"]
+
+    async def agenerate(self, model: str, messages: list[dict]) -> str:
+        """Send a chat completion request without blocking the event loop and return the assistant text."""
+        payload = self._payload(model, messages)
+        data = await self.resilience.acall(model, lambda: self.async_transport.post_json(
+            self.url, headers=self._headers(), payload=payload,
+            connect_timeout=self.connect_timeout, read_timeout=self.read_timeout))
+        return data["choices"][0]["message"]["content"]
+
+    def stream(self, model: str, messages: list[dict]):
+        """Send a streaming chat completion request and yield the assistant text deltas as they arrive."""
+        payload = self._payload(model, messages, stream=True)
+        # only opening the stream is retried, a stream that fails part way has already produced output
+        response = self.resilience.call(model, lambda: self._post(payload, stream=True))
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                done, delta = self._parse_event(line)
+                if done:
+                    break
+                if delta:
+                    yield delta
+        finally:
+            response.close()
+
+    async def astream(self, model: str, messages: list[dict]):
+        """Send a streaming chat completion request without blocking the event loop and yield the text deltas."""
+        payload = self._payload(model, messages, stream=True)
+
+        async def open_stream():
+            lines = self.async_transport.stream_lines(self.url, headers=self._headers(), payload=payload,
+                                                      connect_timeout=self.connect_timeout,
+                                                      read_timeout=self.read_timeout)
+            try:
+                return lines, await lines.__anext__()
+            except StopAsyncIteration:
+                return lines, None
+            except BaseException:
+                await lines.aclose()
+                raise
+
+        # only opening the stream is retried, a stream that fails part way has already produced output
+        lines, first_line = await self.resilience.acall(model, open_stream)
+        try:
+            if first_line is not None:
+                done, delta = self._parse_event(first_line)
+                if done:
+                    return
+                if delta:
+                    yield delta
+            async for line in lines:
+                done, delta = self._parse_event(line)
+                if done:
+                    break
+                if delta:
+                    yield delta
+        finally:
+            await lines.aclose()
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    A bucket refilled at a constant rate up to its capacity. The level may go negative, which is how callers queue:
+    each one takes what it needs straight away and waits out its share of the deficit.
+    """
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        """
+        Initialize the TokenBucket.
+
+        Args:
+            per_minute (float): The sustained rate the bucket refills at, per minute.
+            capacity (float): The largest burst allowed, defaults to one minute's worth.
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until the bucket holds amount, assuming no one else takes from it."""
+        return max(amount - self.level, 0.0) / self.rate
+
+
+class RateLimiter:
+    """
+    Process-wide limiter on requests per minute and tokens per minute to the LLM provider.
+
+    Callers are never rejected, they wait until both budgets allow their request. Callers are served in arrival
+    order, and the pre-call token estimate from GPTModel.measure_tokens is reconciled with the actual output once the
+    reply arrives. Works from threads (acquire) and coroutines (aacquire). Use RateLimiter.from_config() or
+    RateLimiter.shared() so all layers draw on the same budgets.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, requests_per_minute: float = 60, tokens_per_minute: float = 90000):
+        """
+        Initialize the RateLimiter.
+
+        Args:
+            requests_per_minute (float): The sustained number of requests allowed per minute.
+            tokens_per_minute (float): The sustained number of prompt and completion tokens allowed per minute.
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waiting = 0  # callers currently queued
+
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, **kwargs):
+        """
+        Get the process-wide limiter, creating it on first use.
+
+        Args:
+            **kwargs: Keyword arguments passed to RateLimiter when the shared limiter is created.
+
+        Returns:
+            RateLimiter: The shared limiter.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(**kwargs)
+        return cls._shared
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Get the shared limiter if it is enabled in the [RateLimiter] section of the config.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            RateLimiter: The shared limiter, or None if rate limiting is disabled.
+        """
+        if not config.has_section("RateLimiter"):
+            return None
+        section = config["RateLimiter"]
+        if not section.getboolean("enabled", fallback=False):
+            return None
+        return cls.shared(requests_per_minute=section.getfloat("requests_per_minute", fallback=60),
+                          tokens_per_minute=section.getfloat("tokens_per_minute", fallback=90000))
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self.requests.wait_for(1), self.tokens.wait_for(tokens))
+            self.requests.level -= 1
+            self.tokens.level -= tokens
+
+            self.acquired += 1
+            if wait > 0:
+                self.waited += 1
+                self.waiting += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def _done_waiting(self):
+        with self._lock:
+            self.waiting -= 1
+
+    def acquire(self, tokens: int = 0):
+        """
+        Block until a request of the given size is allowed.
+
+        Args:
+            tokens (int): The estimated number of tokens the request uses.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                self._done_waiting()
+
+    async def aacquire(self, tokens: int = 0):
+        """
+        Wait without blocking the event loop until a request of the given size is allowed. A cancelled waiter hands
+        its reservation back.
+
+        Args:
+            tokens (int): The estimated number of tokens the request uses.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.release(tokens, requests=1)
+                raise
+            finally:
+                self._done_waiting()
+
+    def consume(self, tokens: int):
+        """
+        Take tokens used beyond the pre-call estimate, such as the completion, without waiting.
+
+        Args:
+            tokens (int): The number of extra tokens used.
+        """
+        with self._lock:
+            self.tokens.level -= tokens
+
+    def release(self, tokens: int, requests: int = 0):
+        """
+        Hand back a reservation that was not used.
+
+        Args:
+            tokens (int): The number of tokens to hand back.
+            requests (int): The number of requests to hand back.
+        """
+        with self._lock:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + tokens)
+            self.requests.level = min(self.requests.capacity, self.requests.level + requests)
+
+    def stats(self) -> dict:
+        """
+        Report how long callers have been queued.
+
+        Returns:
+            dict: Requests admitted and queued, callers waiting now, total, mean and max wait, and the wait a new
+            single request would face right now.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return {
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "waiting": self.waiting,
+                "total_wait": self.total_wait,
+                "mean_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+                "max_wait": self.max_wait,
+                "current_wait": max(self.requests.wait_for(1), self.tokens.wait_for(0)),
+            }
@@ -0,0 +1,251 @@
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+import aiohttp
+import requests
+
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while a model's circuit breaker is open.
+    """
+
+    def __init__(self, model: str, retry_in: float):
+        super().__init__(f"Circuit open for {model}, upstream unhealthy. Retry in {retry_in:.1f}s.")
+        self.model = model
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date.
+
+    Returns:
+        float: The number of seconds to wait, or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def classify_error(error):
+    """
+    Decide whether a failed request is worth retrying.
+
+    Returns:
+        tuple: Whether the error is transient, and the Retry-After delay the server asked for (or None).
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return (error.response.status_code in RETRYABLE_STATUSES,
+                parse_retry_after(error.response.headers.get("Retry-After")))
+    if isinstance(error, aiohttp.ClientResponseError):
+        headers = error.headers or {}
+        return error.status in RETRYABLE_STATUSES, parse_retry_after(headers.get("Retry-After"))
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, aiohttp.ClientConnectionError,
+                          asyncio.TimeoutError)):
+        return True, None
+    return False, None
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an upstream is unhealthy.
+
+    After failure_threshold consecutive transient failures the circuit opens and calls are rejected for reset_timeout
+    seconds. A single trial call is then let through (half-open), closing the circuit again if it succeeds.
+    """
+
+    def __init__(self, model: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Check the circuit before sending a request.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a trial call already in flight.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == "open" and elapsed >= self.reset_timeout:
+                self.state = "half_open"  # this caller is the trial call
+                return
+            raise CircuitOpenError(self.model, max(self.reset_timeout - elapsed, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+
+    def abandon_trial(self):
+        """
+        Let the next caller make the trial call when a half-open trial ends without an answer, e.g. is cancelled.
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class Resilience:
+    """
+    Retries transient OpenRouter failures with exponential backoff and full jitter, honouring Retry-After, behind a
+    per-model circuit breaker. Use Resilience.shared() so every layer sees the same breaker state.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 30.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the Resilience.
+
+        Args:
+            max_retries (int): The number of retries after the first attempt.
+            base_delay (float): The backoff ceiling in seconds for the first retry, doubling on each further retry.
+            max_delay (float): The longest wait between attempts, including waits asked for by Retry-After.
+            failure_threshold (int): Consecutive transient failures that open a model's circuit.
+            reset_timeout (float): Seconds an open circuit rejects calls before letting a trial call through.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.retries = 0
+        self._breakers = {}  # model -> CircuitBreaker
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the process-wide instance, creating it on first use.
+
+        Returns:
+            Resilience: The shared instance.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """
+        Get the circuit breaker of a model.
+        """
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(model, self.failure_threshold, self.reset_timeout)
+            return self._breakers[model]
+
+    def backoff(self, attempt: int, retry_after=None) -> float:
+        """
+        Get the wait before the next attempt.
+
+        Args:
+            attempt (int): The number of attempts made so far.
+            retry_after (float): The wait the server asked for, if any.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _should_retry(self, breaker, error, attempt):
+        retryable, retry_after = classify_error(error)
+        if not retryable:
+            breaker.record_success()  # the upstream answered, the request itself was at fault
+            return None
+        breaker.record_failure()
+        if attempt > self.max_retries:
+            return None
+        self.retries += 1
+        return self.backoff(attempt, retry_after)
+
+    def call(self, model: str, fn):
+        """
+        Call fn, retrying transient failures.
+
+        Args:
+            model (str): The model the request is for, selecting the circuit breaker.
+            fn: A callable sending the request.
+
+        Returns:
+            The result of fn.
+        """
+        breaker = self.breaker(model)
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._should_retry(breaker, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                breaker.abandon_trial()
+                raise
+            breaker.record_success()
+            return result
+
+    async def acall(self, model: str, coroutine_fn):
+        """
+        Await coroutine_fn(), retrying transient failures without blocking the event loop, see call().
+        """
+        breaker = self.breaker(model)
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before_call()
+            try:
+                result = await coroutine_fn()
+            except Exception as e:
+                delay = self._should_retry(breaker, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                breaker.abandon_trial()
+                raise
+            breaker.record_success()
+            return result
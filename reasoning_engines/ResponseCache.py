@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+project_root = pathlib.Path(__file__).parent.parent.resolve()
+
+
+def normalize_messages(messages: list[dict]) -> list[dict]:
+    """
+    Normalise chat messages so that prompts differing only in line endings or surrounding whitespace share a cache
+    entry.
+    """
+    normalized = []
+    for message in messages:
+        entry = {key: value.replace("\r\n", "\n").strip() if isinstance(value, str) else value
+                 for key, value in message.items()}
+        normalized.append(dict(sorted(entry.items())))
+    return normalized
+
+
+def request_key(model: str, messages: list[dict], params: dict | None = None) -> str:
+    """
+    Build the content address of a completion request.
+
+    Args:
+        model (str): The model the request is sent to.
+        messages (list[dict]): The chat messages.
+        params (dict): Any other request parameters that change the reply.
+
+    Returns:
+        str: A hex digest identifying the request.
+    """
+    document = json.dumps({"model": model, "messages": normalize_messages(messages), "params": params or {}},
+                          sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(document.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent content-addressed cache of LLM replies stored in a local SQLite file.
+
+    Entries expire after a TTL, and the least recently used entries are evicted once the entry or size limits are
+    exceeded. Hits, misses and the upstream dollars saved by hits are tracked for reporting. Use
+    ResponseCache.shared() for the process-wide cache, or ResponseCache.from_config() to honour config.ini.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str | None = None, max_entries: int = 10000, max_bytes: int = 100 * 1024 * 1024,
+                 ttl_seconds: float = 7 * 24 * 60 * 60, charge_on_hit: bool = False):
+        """
+        Initialize the ResponseCache.
+
+        Args:
+            path (str): The SQLite file to store replies in, ':memory:' keeps the cache in memory.
+            max_entries (int): The maximum number of cached replies.
+            max_bytes (int): The maximum total size of cached replies in bytes.
+            ttl_seconds (float): How long a reply stays valid after it was cached.
+            charge_on_hit (bool): Whether callers are still charged the original cost when served from the cache.
+        """
+        self.path = path or f"{project_root}/storage/reasoning_engines/ResponseCache/responses.sqlite3"
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.charge_on_hit = charge_on_hit
+
+        self.hits = 0
+        self.misses = 0
+        self.dollars_saved = 0.0
+
+        self._connection = None  # opened on first use so an unused cache never touches disk
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, **kwargs):
+        """
+        Get the process-wide cache, creating it on first use.
+
+        Args:
+            **kwargs: Keyword arguments passed to ResponseCache when the shared cache is created.
+
+        Returns:
+            ResponseCache: The shared cache.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(**kwargs)
+        return cls._shared
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Get the shared cache if it is enabled in the [ResponseCache] section of the config.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            ResponseCache: The shared cache, or None if caching is disabled.
+        """
+        if not config.has_section("ResponseCache"):
+            return None
+        section = config["ResponseCache"]
+        if not section.getboolean("enabled", fallback=False):
+            return None
+
+        path = section.get("path", fallback=None)
+        if path and not os.path.isabs(path):
+            path = f"{project_root}/{path}"
+        return cls.shared(path=path,
+                          max_entries=section.getint("max_entries", fallback=10000),
+                          max_bytes=section.getint("max_bytes", fallback=100 * 1024 * 1024),
+                          ttl_seconds=section.getfloat("ttl_seconds", fallback=7 * 24 * 60 * 60),
+                          charge_on_hit=section.getboolean("charge_on_hit", fallback=False))
+
+    def _connect(self):
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, reply TEXT, cost REAL, "
+                "size INTEGER, created_at REAL, last_access REAL)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key: str):
+        """
+        Look up a cached reply.
+
+        Args:
+            key (str): The request key from request_key().
+
+        Returns:
+            tuple: The cached reply and the cost originally paid for it, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT reply, cost, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                connection.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            connection.commit()
+            self.hits += 1
+            self.dollars_saved += row[1]
+            return row[0], row[1]
+
+    def put(self, key: str, model: str, reply: str, cost: float):
+        """
+        Store a reply and evict expired and least recently used entries beyond the limits.
+
+        Args:
+            key (str): The request key from request_key().
+            model (str): The model that produced the reply.
+            reply (str): The reply text.
+            cost (float): The cost paid for the request.
+        """
+        now = time.time()
+        size = len(reply.encode())
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (key, model, reply, cost, size, now, now))
+            self._evict(connection, now)
+            connection.commit()
+
+    def _evict(self, connection, now):
+        connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        entries, total_bytes = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        doomed = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            doomed.append((key,))
+            entries -= 1
+            total_bytes -= size
+        connection.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self) -> dict:
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: Hits, misses, hit rate, upstream dollars saved, and the current number and size of entries.
+        """
+        with self._lock:
+            entries, total_bytes = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "dollars_saved": self.dollars_saved,
+            "entries": entries,
+            "bytes": total_bytes,
+        }
+
+    def clear(self):
+        """
+        Remove every cached reply.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM responses")
+            connection.commit()
+
+    def close(self):
+        """
+        Close the SQLite connection.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
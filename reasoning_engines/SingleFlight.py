@@ -0,0 +1,193 @@
+import asyncio
+import threading
+
+
+class _Flight:
+    """
+    A request in flight and the callers waiting on it.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.callers = 1
+
+
+class _AsyncFlight:
+    """
+    A request in flight on an event loop and the callers awaiting it.
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.callers = 1
+        self.leaderless = False  # the leader was cancelled, so the first caller to get the result takes its place
+
+
+class SingleFlight:
+    """
+    Coalesces identical requests that are in flight at the same time, so that only the first caller (the leader)
+    sends the request and later callers wait for and share its result.
+
+    How the cost of a shared request is divided between its callers is set by charge_policy:
+    - 'leader': the leader pays the full cost, followers pay nothing
+    - 'each': every caller pays the full cost, as if it had sent the request itself
+    - 'split': the cost is divided evenly between all callers
+    """
+
+    CHARGE_POLICIES = ("leader", "each", "split")
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, charge_policy: str = "split"):
+        """
+        Initialize the SingleFlight.
+
+        Args:
+            charge_policy (str): One of 'leader', 'each' or 'split'.
+        """
+        if charge_policy not in self.CHARGE_POLICIES:
+            raise ValueError(f"charge_policy must be one of {self.CHARGE_POLICIES}, got '{charge_policy}'.")
+        self.charge_policy = charge_policy
+
+        self.leaders = 0
+        self.followers = 0
+
+        self._flights = {}  # key -> _Flight
+        self._async_flights = {}  # (event loop, key) -> _AsyncFlight
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, **kwargs):
+        """
+        Get the process-wide coordinator, creating it on first use.
+
+        Args:
+            **kwargs: Keyword arguments passed to SingleFlight when the shared coordinator is created.
+
+        Returns:
+            SingleFlight: The shared coordinator.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(**kwargs)
+        return cls._shared
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Get the shared coordinator if it is enabled in the [SingleFlight] section of the config.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            SingleFlight: The shared coordinator, or None if de-duplication is disabled.
+        """
+        if not config.has_section("SingleFlight"):
+            return None
+        section = config["SingleFlight"]
+        if not section.getboolean("enabled", fallback=False):
+            return None
+        return cls.shared(charge_policy=section.get("charge_policy", fallback="split"))
+
+    def share(self, leader: bool, callers: int) -> float:
+        """
+        Get the fraction of a request's cost that one of its callers pays.
+
+        Args:
+            leader (bool): Whether the caller sent the request.
+            callers (int): How many callers shared the request.
+
+        Returns:
+            float: The fraction of the cost to charge.
+        """
+        if self.charge_policy == "each":
+            return 1.0
+        if self.charge_policy == "leader":
+            return 1.0 if leader else 0.0
+        return 1.0 / callers
+
+    def do(self, key, fn):
+        """
+        Call fn unless an identical request is already in flight, in which case wait for its result instead.
+
+        Args:
+            key: Identifies identical requests, see request_key().
+            fn: A callable sending the request.
+
+        Returns:
+            tuple: The result, whether this caller was the leader, and how many callers shared the result.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                flight.callers += 1
+                self.followers += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, False, flight.callers
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # no caller can join once the key is removed, so callers is final for everyone woken below
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, True, flight.callers
+
+    async def ado(self, key, coroutine_fn):
+        """
+        Await coroutine_fn() unless an identical request is already in flight on this event loop, in which case
+        wait for its result instead. The request is only cancelled once every caller waiting on it is cancelled. If
+        the leader is cancelled while others still wait, the first of them to receive the result becomes the leader,
+        so the reply is still cached and paid for.
+
+        Args:
+            key: Identifies identical requests, see request_key().
+            coroutine_fn: A callable returning a coroutine that sends the request.
+
+        Returns:
+            tuple: The result, whether this caller was the leader, and how many callers shared the result.
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            flight = self._async_flights.get(flight_key)
+            if flight is None:
+                flight = self._async_flights[flight_key] = _AsyncFlight(asyncio.ensure_future(coroutine_fn()))
+                flight.task.add_done_callback(lambda _: self._async_flights.pop(flight_key, None))
+                self.leaders += 1
+                leader = True
+            else:
+                flight.callers += 1
+                self.followers += 1
+                leader = False
+
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            flight.callers -= 1
+            if flight.callers == 0:
+                flight.task.cancel()
+            elif leader:
+                flight.leaderless = True
+            raise
+        if flight.leaderless:
+            flight.leaderless = False
+            leader = True
+        return result, leader, flight.callers
@@ -0,0 +1,162 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import tiktoken
+
+
+# Per-model framing overheads, see https://github.com/openai/openai-python/blob/main/chatml.md
+MESSAGE_OVERHEADS = {
+    "gpt-3.5-turbo-0613": (3, 1),
+    "gpt-3.5-turbo-16k-0613": (3, 1),
+    "gpt-4-0314": (3, 1),
+    "gpt-4-32k-0314": (3, 1),
+    "gpt-4-0613": (3, 1),
+    "gpt-4-32k-0613": (3, 1),
+    "gpt-3.5-turbo-0301": (4, -1),  # every message follows <|start|>{role/name}\n{content}<|end|>\n, if there's a
+                                    # name the role is omitted
+}
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_token_model(model: str) -> str:
+    """
+    Map a model name, including OpenRouter 'provider/model' names and undated aliases, to the dated model whose
+    token counting rules apply. Resolved once per name so alias warnings are only printed once.
+    """
+    name = model.split("/", 1)[-1]
+    if name in MESSAGE_OVERHEADS:
+        return name
+    if "gpt-3.5-turbo" in name:
+        print("Warning: gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0613.")
+        return "gpt-3.5-turbo-0613"
+    if "gpt-4" in name:
+        print("Warning: gpt-4 may update over time. Returning num tokens assuming gpt-4-0613.")
+        return "gpt-4-0613"
+    raise NotImplementedError(
+        f"""num_tokens_from_messages() is not implemented for model {model}. See https://github.com/openai/openai-python/blob/main/chatml.md for information on how messages are converted to tokens.""")
+
+
+class TokenCounter:
+    """
+    Counts chat message tokens with one cached tiktoken encoder per model and a bounded LRU of per-message counts.
+
+    Layer histories resend the same messages on every call, so each message is only encoded the first time it is
+    seen and counting a growing conversation costs about the same as encoding the newest message. Use
+    TokenCounter.shared() to get the process-wide instance.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_cached_messages: int = 4096):
+        """
+        Initialize the TokenCounter.
+
+        Args:
+            max_cached_messages (int): The number of per-message token counts to keep before evicting the least
+                recently used.
+        """
+        self.max_cached_messages = max_cached_messages
+        self.hits = 0
+        self.misses = 0
+
+        self._encodings = {}  # resolved model -> tiktoken encoding
+        self._message_counts = OrderedDict()  # (resolved model, message digest) -> token count
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the process-wide token counter, creating it on first use.
+
+        Returns:
+            TokenCounter: The shared token counter.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def encoding_for(self, model: str):
+        """
+        Get the cached tiktoken encoding for a model.
+
+        Args:
+            model (str): The model name, aliases are resolved first.
+
+        Returns:
+            tiktoken.Encoding: The encoding used by the model.
+        """
+        resolved = resolve_token_model(model)
+        encoding = self._encodings.get(resolved)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(resolved)
+            except KeyError:
+                print("Warning: model not found. Using cl100k_base encoding.")
+                encoding = tiktoken.get_encoding("cl100k_base")
+            self._encodings[resolved] = encoding
+        return encoding
+
+    @staticmethod
+    def _digest(message: dict) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        for key, value in message.items():
+            digest.update(key.encode())
+            digest.update(b"\0")
+            digest.update(value.encode())
+            digest.update(b"\0")
+        return digest.digest()
+
+    def count_message(self, message: dict, model: str) -> int:
+        """
+        Count the tokens one message adds to a prompt, including its framing overhead.
+
+        Args:
+            message (dict): A chat message with role, content and optional name.
+            model (str): The model name.
+
+        Returns:
+            int: The number of tokens used by the message.
+        """
+        resolved = resolve_token_model(model)
+        key = (resolved, self._digest(message))
+        with self._lock:
+            count = self._message_counts.get(key)
+            if count is not None:
+                self._message_counts.move_to_end(key)
+                self.hits += 1
+                return count
+
+        tokens_per_message, tokens_per_name = MESSAGE_OVERHEADS[resolved]
+        encoding = self.encoding_for(resolved)
+        count = tokens_per_message
+        for key_name, value in message.items():
+            count += len(encoding.encode(value))
+            if key_name == "name":
+                count += tokens_per_name
+
+        with self._lock:
+            self.misses += 1
+            self._message_counts[key] = count
+            if len(self._message_counts) > self.max_cached_messages:
+                self._message_counts.popitem(last=False)
+        return count
+
+    def count_messages(self, messages: list[dict], model: str) -> int:
+        """
+        Count the tokens used by a list of messages.
+
+        Args:
+            messages (list[dict]): The chat messages.
+            model (str): The model name.
+
+        Returns:
+            int: The number of prompt tokens, including the priming of the reply.
+        """
+        num_tokens = sum(self.count_message(message, model) for message in messages)
+        num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
+        return num_tokens
@@ -0,0 +1,212 @@
+import time
+
+
+class StreamMetrics:
+    """
+    Timing and cost of a single streamed completion, updated as each delta arrives.
+    """
+
+    def __init__(self, model: str, input_tokens: int = 0, input_cost: float = 0.0):
+        self.model = model
+        self.input_tokens = input_tokens
+        self.input_cost = input_cost
+        self.output_tokens = 0
+        self.output_cost = 0.0
+
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+        self.completed = False  # True once the server signalled the end of the stream
+
+    def record(self, tokens: int, cost: float):
+        """
+        Record a delta that has just arrived.
+
+        Args:
+            tokens (int): The number of tokens in the delta.
+            cost (float): The cost of those tokens.
+        """
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.output_tokens += tokens
+        self.output_cost += cost
+
+    @property
+    def total_cost(self) -> float:
+        return self.input_cost + self.output_cost
+
+    @property
+    def time_to_first_token(self):
+        """Seconds from sending the request to receiving the first delta, or None if nothing has arrived."""
+        if self.started_at is None or self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_second(self):
+        """Output tokens per second after the first delta arrived, or None until the stream has finished."""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return self.output_tokens / elapsed if elapsed > 0 else None
+
+    def as_dict(self) -> dict:
+        return {
+            "model": self.model,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_cost": self.total_cost,
+            "time_to_first_token": self.time_to_first_token,
+            "tokens_per_second": self.tokens_per_second,
+            "completed": self.completed,
+        }
+
+
+class TokenStream:
+    """
+    Iterator over the token deltas of a streamed completion.
+
+    Cost is tallied on metrics as deltas arrive and on_finish is called exactly once, with the full text and the
+    metrics, when the stream is exhausted or closed early. on_start is called on the first iteration, so a stream that
+    is created but never iterated holds nothing.
+    """
+
+    def __init__(self, deltas, metrics: StreamMetrics, price_delta, on_finish, on_start=None):
+        """
+        Initialize the TokenStream.
+
+        Args:
+            deltas: An iterator of text deltas.
+            metrics (StreamMetrics): The metrics to update.
+            price_delta: A callable returning (tokens, cost) for a delta.
+            on_finish: A callable taking the full text and the metrics.
+            on_start: An optional callable run before the first delta is requested.
+        """
+        self.metrics = metrics
+        self._deltas = deltas
+        self._price_delta = price_delta
+        self._on_finish = on_finish
+        self._on_start = on_start
+        self._parts = []
+        self._finished = False
+
+    @property
+    def text(self) -> str:
+        """The text received so far."""
+        return "".join(self._parts)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._finished:
+            raise StopIteration
+        try:
+            if self.metrics.started_at is None:
+                if self._on_start is not None:
+                    self._on_start()
+                self.metrics.started_at = time.perf_counter()
+            delta = next(self._deltas)
+        except StopIteration:
+            self.metrics.completed = True
+            self._finish()
+            raise
+        except BaseException:
+            self._finish()
+            raise
+        self._parts.append(delta)
+        self.metrics.record(*self._price_delta(delta))
+        return delta
+
+    def _finish(self):
+        if not self._finished:
+            self._finished = True
+            self.metrics.finished_at = time.perf_counter()
+            self._on_finish(self.text, self.metrics)
+
+    def close(self):
+        """
+        Stop the stream early, closing the underlying request and settling what was received.
+        """
+        if hasattr(self._deltas, "close"):
+            self._deltas.close()
+        self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncTokenStream:
+    """
+    Async iterator over the token deltas of a streamed completion, see TokenStream.
+    """
+
+    def __init__(self, deltas, metrics: StreamMetrics, price_delta, on_finish, on_start=None):
+        """
+        Initialize the AsyncTokenStream.
+
+        Args:
+            deltas: An async iterator of text deltas.
+            metrics (StreamMetrics): The metrics to update.
+            price_delta: A callable returning (tokens, cost) for a delta.
+            on_finish: A callable taking the full text and the metrics.
+            on_start: An optional callable run before the first delta is requested.
+        """
+        self.metrics = metrics
+        self._deltas = deltas
+        self._price_delta = price_delta
+        self._on_finish = on_finish
+        self._on_start = on_start
+        self._parts = []
+        self._finished = False
+
+    @property
+    def text(self) -> str:
+        """The text received so far."""
+        return "".join(self._parts)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        if self._finished:
+            raise StopAsyncIteration
+        try:
+            if self.metrics.started_at is None:
+                if self._on_start is not None:
+                    self._on_start()
+                self.metrics.started_at = time.perf_counter()
+            delta = await self._deltas.__anext__()
+        except StopAsyncIteration:
+            self.metrics.completed = True
+            self._finish()
+            raise
+        except BaseException:
+            self._finish()
+            raise
+        self._parts.append(delta)
+        self.metrics.record(*self._price_delta(delta))
+        return delta
+
+    def _finish(self):
+        if not self._finished:
+            self._finished = True
+            self.metrics.finished_at = time.perf_counter()
+            self._on_finish(self.text, self.metrics)
+
+    async def aclose(self):
+        """
+        Stop the stream early, closing the underlying request and settling what was received.
+        """
+        if hasattr(self._deltas, "aclose"):
+            await self._deltas.aclose()
+        self._finish()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
@@ -1,4 +1,33 @@
+from .AsyncHTTPTransport import AsyncHTTPTransport
+from .ContextWindow import ContextWindow
 from .GPTModels import GPTModel
+from .Hedging import HedgePolicy
+from .HTTPTransport import HTTPTransport
+from .ModelRouter import ModelRouter, ModelSpec
 from .OpenRouterModel import OpenRouterModel
+from .RateLimiter import RateLimiter
+from .Resilience import CircuitOpenError, Resilience
+from .ResponseCache import ResponseCache
+from .SingleFlight import SingleFlight
+from .TokenCounter import TokenCounter
+from .TokenStream import AsyncTokenStream, StreamMetrics, TokenStream
 
-__all__ = ["GPTModel", "OpenRouterModel"]
+__all__ = [
+    "AsyncHTTPTransport",
+    "AsyncTokenStream",
+    "CircuitOpenError",
+    "ContextWindow",
+    "GPTModel",
+    "HTTPTransport",
+    "HedgePolicy",
+    "ModelRouter",
+    "ModelSpec",
+    "OpenRouterModel",
+    "RateLimiter",
+    "Resilience",
+    "ResponseCache",
+    "SingleFlight",
+    "StreamMetrics",
+    "TokenCounter",
+    "TokenStream",
+]
@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.delay)
+        self.server.requests_seen += 1
+        if self.server.failures:
+            status, headers = self.server.failures.pop(0)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if payload.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            for delta in self.server.stream_deltas:
+                chunk = {"choices": [{"delta": {"content": delta}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+        body = json.dumps({"choices": [{"message": {"content": "pong"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CompletionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops connections when many requests arrive at once
+
+
+@pytest.fixture
+def completion_server():
+    """A local stand-in for the chat completions endpoint, set server.delay or server.failures to misbehave."""
+    server = CompletionServer(("127.0.0.1", 0), CompletionHandler)
+    server.delay = 0
+    server.stream_deltas = ["po", "ng"]
+    server.failures = []  # (status, headers) to answer with before succeeding
+    server.requests_seen = 0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
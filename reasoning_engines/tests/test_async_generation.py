@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import AsyncHTTPTransport, GPTModel
+from resource_manager.built_in_resources import CurrencyResource
+
+
+def make_model(server, **transport_kwargs):
+    model = GPTModel()
+    model.client.url = server.url
+    model.client.async_transport = AsyncHTTPTransport(**transport_kwargs)
+    return model
+
+
+@patch.object(GPTModel, "measure_tokens", return_value=(1, 0.1))
+def test_agenerate_spends_after_reply(mock_measure, completion_server):
+    model = make_model(completion_server)
+    currency = CurrencyResource(budget=1.0)
+
+    async def run():
+        try:
+            return await model.agenerate([{"role": "user", "content": "ping"}], currency)
+        finally:
+            await model.client.async_transport.aclose()
+
+    assert asyncio.run(run()) == "pong"
+    assert currency.budget == pytest.approx(0.8)
+
+
+@patch.object(GPTModel, "measure_tokens", return_value=(1, 0.1))
+def test_agenerate_runs_many_calls_on_one_loop(mock_measure, completion_server):
+    completion_server.delay = 0.2
+    model = make_model(completion_server, max_concurrency=10)
+
+    async def run():
+        try:
+            return await asyncio.gather(*[model.agenerate([{"role": "user", "content": str(i)}])
+                                          for i in range(10)])
+        finally:
+            await model.client.async_transport.aclose()
+
+    started = time.perf_counter()
+    replies = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+
+    assert replies == ["pong"] * 10
+    assert elapsed < 1.0
+
+
+@patch.object(GPTModel, "measure_tokens", return_value=(1, 0.1))
+def test_cancelled_agenerate_is_not_charged(mock_measure, completion_server):
+    completion_server.delay = 1
+    model = make_model(completion_server)
+    currency = CurrencyResource(budget=1.0)
+
+    async def run():
+        task = asyncio.create_task(model.agenerate([{"role": "user", "content": "ping"}], currency))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        try:
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        finally:
+            await model.client.async_transport.aclose()
+
+    asyncio.run(run())
+    assert currency.budget == pytest.approx(1.0)
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import GPTModel
+from resource_manager.built_in_resources import CurrencyResource
+
+
+@pytest.fixture
+def model():
+    gpt = GPTModel(max_output_tokens=100)
+    # input costs $0.05, the worst case adds 100 output tokens at $1 per 1000
+    with patch.object(GPTModel, "measure_tokens", return_value=(10, 0.05)), \
+            patch.object(GPTModel, "token_price", return_value=1.0):
+        yield gpt
+
+
+def test_generate_reserves_worst_case_and_commits_actual(model):
+    currency = CurrencyResource(budget=1.0)
+    seen = []
+
+    def fake_generate(model, messages):
+        seen.append((currency.reserved, currency.budget))
+        return "ok"
+
+    with patch.object(model.client, "generate", side_effect=fake_generate):
+        assert model.generate([{"role": "user", "content": "hi"}], currency) == "ok"
+
+    assert seen == [(pytest.approx(0.15), pytest.approx(1.0))]
+    assert currency.reserved == pytest.approx(0.0)
+    assert currency.budget == pytest.approx(0.9)
+
+
+def test_failed_call_releases_its_reservation(model):
+    currency = CurrencyResource(budget=1.0)
+    with patch.object(model.client, "generate", side_effect=RuntimeError("upstream failed")):
+        with pytest.raises(RuntimeError):
+            model.generate([{"role": "user", "content": "hi"}], currency)
+
+    assert currency.reserved == 0.0
+    assert currency.budget == pytest.approx(1.0)
+
+
+def test_parallel_calls_cannot_overdraw_a_shared_budget(model):
+    currency = CurrencyResource(budget=0.5)  # room for three worst cases of $0.15
+
+    def slow_generate(model, messages):
+        time.sleep(0.05)
+        return "ok"
+
+    prompts = [[{"role": "user", "content": str(i)}] for i in range(6)]
+    with patch.object(model.client, "generate", side_effect=slow_generate), \
+            patch.object(GPTModel, "_check_batch_budget"):
+        replies = model.generate_many(prompts, currency, max_concurrency=6)
+
+    insufficient = [reply for reply in replies if isinstance(reply, ValueError)]
+    assert replies.count("ok") == 3
+    assert len(insufficient) == 3 and "Insufficient funds" in str(insufficient[0])
+    assert currency.budget == pytest.approx(0.2)
+    assert currency.reserved == pytest.approx(0.0)
+
+
+def test_cancelled_agenerate_releases_its_reservation(model):
+    currency = CurrencyResource(budget=1.0)
+    started = threading.Event()
+
+    async def hang(model, messages):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.create_task(model.agenerate([{"role": "user", "content": "hi"}], currency))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        assert currency.reserved == pytest.approx(0.15)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with patch.object(model.client, "agenerate", side_effect=hang):
+        asyncio.run(main())
+
+    assert currency.reserved == 0.0
+    assert currency.budget == pytest.approx(1.0)
@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import ContextWindow, GPTModel, TokenCounter
+
+
+class WordEncoding:
+    """Stand-in tiktoken encoding that counts whitespace separated words."""
+
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture
+def counter():
+    with patch("reasoning_engines.TokenCounter.tiktoken.encoding_for_model", return_value=WordEncoding()):
+        yield TokenCounter()
+
+
+def words(n):
+    return " ".join(["word"] * n)
+
+
+def test_prompt_size_matches_a_full_count(counter):
+    window = ContextWindow(max_tokens=1000, token_counter=counter)
+    window.add_system("you are helpful")
+    window.add("user", "hello there")
+    window.add("assistant", "hi")
+
+    assert window.prompt_tokens == counter.count_messages(window.prompt(), "gpt-3.5-turbo")
+
+
+def test_old_turns_are_evicted_down_to_the_low_watermark(counter):
+    # each turn costs 3 framing + 1 role + 10 words = 14 tokens, the system prefix 3 + 1 + 2 = 6
+    window = ContextWindow(max_tokens=100, low_watermark=0.5, token_counter=counter)
+    window.add_system("be brief")
+    for i in range(6):
+        window.add("user", words(10))
+    assert window.stats()["evicted"] == 0
+    assert window.prompt_tokens == 6 + 6 * 14 + 3
+
+    window.add("user", words(10))  # 107 tokens, over budget
+    assert window.prompt_tokens <= 50
+    assert window.prompt()[0] == {"role": "system", "content": "be brief"}
+    assert window.stats() == {"prompt_tokens": 6 + 2 * 14 + 3, "max_tokens": 100, "turns": 2, "evicted": 5,
+                              "summaries": 0}
+
+
+def test_evicted_turns_are_summarized(counter):
+    seen = []
+
+    def summarizer(dropped, previous):
+        seen.append((len(dropped), previous))
+        return f"summary {len(seen)}"
+
+    window = ContextWindow(max_tokens=60, low_watermark=0.5, token_counter=counter, summarizer=summarizer)
+    window.add_system("be brief")
+    for _ in range(8):
+        window.add("user", words(10))
+
+    assert seen[0] == (3, None)
+    assert seen[1][1] == "summary 1"
+    assert window.prompt()[1] == {"role": "system", "content": f"summary {len(seen)}"}
+    assert window.prompt_tokens <= 60
+
+
+def test_pinned_prefix_must_fit_the_budget(counter):
+    window = ContextWindow(max_tokens=10, token_counter=counter)
+    with pytest.raises(ValueError, match="exceeds the context budget"):
+        window.add_system(words(20))
+
+
+def test_chat_sends_the_history_and_records_the_reply(counter):
+    model = GPTModel(context=ContextWindow(max_tokens=1000, token_counter=counter))
+    model.add_system_message("you are helpful")
+
+    with patch.object(GPTModel, "measure_tokens", return_value=(1, 0.0)), \
+            patch.object(model.client, "generate", return_value="hi there") as fake_generate:
+        assert model.chat("hello") == "hi there"
+        model.chat("again")
+
+    sent = fake_generate.call_args.kwargs["messages"]
+    assert [message["role"] for message in sent] == ["system", "user", "assistant", "user"]
+    assert [message["role"] for message in model.messages] == ["system", "user", "assistant", "user", "assistant"]
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import GPTModel
+from resource_manager.built_in_resources import CurrencyResource
+
+
+@pytest.fixture
+def model():
+    with patch.object(GPTModel, "measure_tokens", return_value=(1, 0.01)):
+        yield GPTModel()
+
+
+def test_generate_many_runs_in_parallel_and_keeps_order(model):
+    in_flight = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def fake_generate(model, messages):
+        with lock:
+            in_flight.append(1)
+            peak[0] = max(peak[0], len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.pop()
+        return messages[0]["content"].upper()
+
+    prompts = [[{"role": "user", "content": f"prompt {i}"}] for i in range(8)]
+    with patch.object(model.client, "generate", side_effect=fake_generate):
+        replies = model.generate_many(prompts, max_concurrency=4)
+
+    assert replies == [f"PROMPT {i}" for i in range(8)]
+    assert peak[0] == 4
+
+
+def test_generate_many_reports_errors_per_item(model):
+    def fake_generate(model, messages):
+        if messages[0]["content"] == "bad":
+            raise RuntimeError("upstream failed")
+        return "ok"
+
+    currency = CurrencyResource(budget=1.0)
+    prompts = [[{"role": "user", "content": content}] for content in ("good", "bad", "good")]
+    with patch.object(model.client, "generate", side_effect=fake_generate):
+        replies = model.generate_many(prompts, currency)
+
+    assert replies[0] == replies[2] == "ok"
+    assert isinstance(replies[1], RuntimeError)
+    assert currency.budget == pytest.approx(1.0 - 2 * 0.02)
+
+
+def test_generate_many_checks_batch_budget_up_front(model):
+    currency = CurrencyResource(budget=0.025)
+    prompts = [[{"role": "user", "content": str(i)}] for i in range(3)]
+    with patch.object(model.client, "generate") as fake_generate:
+        with pytest.raises(ValueError, match="Insufficient funds for batch of 3"):
+            model.generate_many(prompts, currency)
+    fake_generate.assert_not_called()
+
+
+def test_agenerate_many_keeps_order(model):
+    async def fake_agenerate(model, messages):
+        await asyncio.sleep(0.01 * int(messages[0]["content"]))
+        return messages[0]["content"]
+
+    prompts = [[{"role": "user", "content": str(i)}] for i in (3, 1, 2)]
+    with patch.object(model.client, "agenerate", side_effect=fake_agenerate):
+        replies = asyncio.run(model.agenerate_many(prompts, max_concurrency=2))
+    assert replies == ["3", "1", "2"]
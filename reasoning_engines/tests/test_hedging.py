@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import GPTModel, HedgePolicy, ModelRouter, ModelSpec
+from resource_manager.built_in_resources import CurrencyResource
+
+
+@pytest.fixture(autouse=True)
+def pricing():
+    # every leg costs $0.05 of input and $0.05 of output
+    with patch.object(GPTModel, "measure_tokens", return_value=(10, 0.05)), \
+            patch.object(GPTModel, "token_price", return_value=0.0):
+        yield
+
+
+def slow_then_fast(first_delay):
+    calls = itertools.count()
+    models = []
+
+    def fake_generate(model, messages):
+        models.append(model)
+        if next(calls) == 0:
+            time.sleep(first_delay)
+            return "slow"
+        return "fast"
+    return fake_generate, models
+
+
+def test_slow_request_is_hedged_and_both_legs_are_charged():
+    policy = HedgePolicy(initial_delay=0.05, max_hedge_rate=1.0)
+    model = GPTModel(hedging=policy)
+    currency = CurrencyResource(budget=1.0)
+    fake_generate, models = slow_then_fast(0.3)
+
+    with patch.object(model.client, "generate", side_effect=fake_generate):
+        start = time.monotonic()
+        assert model.generate([{"role": "user", "content": "hi"}], currency) == "fast"
+        assert time.monotonic() - start < 0.25
+        assert currency.budget == pytest.approx(0.9)
+        time.sleep(0.4)  # the losing leg runs to completion and is charged too
+
+    assert currency.budget == pytest.approx(0.8)
+    assert currency.reserved == pytest.approx(0.0)
+    stats = policy.stats()
+    assert (stats["requests"], stats["hedged"], stats["hedge_wins"]) == (1, 1, 1)
+    assert stats["hedge_rate"] == 1.0
+    assert stats["p99_improvement"] > 0.1
+
+
+def test_fast_request_is_not_hedged():
+    policy = HedgePolicy(initial_delay=0.2, max_hedge_rate=1.0)
+    model = GPTModel(hedging=policy)
+    currency = CurrencyResource(budget=1.0)
+
+    with patch.object(model.client, "generate", return_value="ok") as fake_generate:
+        assert model.generate([{"role": "user", "content": "hi"}], currency) == "ok"
+
+    fake_generate.assert_called_once()
+    assert currency.budget == pytest.approx(0.9)
+    assert policy.stats()["hedged"] == 0
+
+
+def test_hedge_rate_is_capped():
+    policy = HedgePolicy(initial_delay=0.0, max_hedge_rate=0.0)
+    model = GPTModel(hedging=policy)
+
+    with patch.object(model.client, "generate", side_effect=lambda model, messages: time.sleep(0.05) or "ok") \
+            as fake_generate:
+        model.generate([{"role": "user", "content": "hi"}])
+
+    fake_generate.assert_called_once()
+
+
+def test_delay_follows_the_latency_percentile():
+    policy = HedgePolicy(percentile=90, initial_delay=5.0, min_delay=0.1, min_samples=10)
+    assert policy.delay() == 5.0
+    for latency in range(1, 11):
+        policy.record_first(latency / 10)
+    assert policy.delay() == pytest.approx(1.0)
+
+
+def test_hedge_can_go_to_an_alternate_model():
+    router = ModelRouter([ModelSpec("cheap/slow", 0.001, 0.001, 4096, "gpt-3.5-turbo-0613"),
+                          ModelSpec("pricey/fast", 0.01, 0.01, 4096, "gpt-4-0613")])
+    model = GPTModel(router=router, hedging=HedgePolicy(initial_delay=0.05, max_hedge_rate=1.0,
+                                                        alternate_model=True))
+    fake_generate, models = slow_then_fast(0.2)
+
+    with patch.object(model.client, "generate", side_effect=fake_generate):
+        assert model.generate([{"role": "user", "content": "hi"}]) == "fast"
+        time.sleep(0.25)
+
+    assert models == ["cheap/slow", "pricey/fast"]
+
+
+def test_async_hedge_cancels_the_loser_and_charges_its_input():
+    policy = HedgePolicy(initial_delay=0.05, max_hedge_rate=1.0)
+    model = GPTModel(hedging=policy)
+    currency = CurrencyResource(budget=1.0)
+    calls = itertools.count()
+    cancelled = threading.Event()
+
+    async def fake_agenerate(model, messages):
+        if next(calls) == 0:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return "fast"
+
+    with patch.object(model.client, "agenerate", side_effect=fake_agenerate):
+        assert asyncio.run(model.agenerate([{"role": "user", "content": "hi"}], currency)) == "fast"
+
+    assert cancelled.is_set()
+    # the winner's input and output, and the cancelled leg's input
+    assert currency.budget == pytest.approx(1.0 - 0.1 - 0.05)
+    assert currency.reserved == pytest.approx(0.0)
+    assert policy.stats()["hedge_wins"] == 1
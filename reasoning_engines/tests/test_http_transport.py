@@ -0,0 +1,55 @@
+import asyncio
+import gc
+import warnings
+
+from reasoning_engines import AsyncHTTPTransport, GPTModel, HTTPTransport, OpenRouterModel
+
+
+def test_models_share_process_wide_transport():
+    assert GPTModel().client.transport is GPTModel().client.transport
+    assert OpenRouterModel().transport is HTTPTransport.shared()
+
+
+def test_connections_are_reused(completion_server):
+    transport = HTTPTransport(pool_maxsize=2)
+    client = OpenRouterModel(api_key="test", transport=transport)
+    client.url = completion_server.url
+
+    for _ in range(5):
+        assert client.generate("openai/gpt-3.5-turbo", [{"role": "user", "content": "ping"}]) == "pong"
+
+    stats = transport.stats()
+    transport.close()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+
+
+def test_async_sessions_are_closed_with_their_event_loop(completion_server):
+    transport = AsyncHTTPTransport()
+    client = OpenRouterModel(api_key="test", async_transport=transport)
+    client.url = completion_server.url
+    sessions = []
+
+    async def call():
+        sessions.append(transport._session_for_running_loop()[0])
+        return await client.agenerate("openai/gpt-3.5-turbo", [{"role": "user", "content": "ping"}])
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        # each short-lived asyncio.run() closes its session as its loop shuts down
+        assert [asyncio.run(call()) for _ in range(3)] == ["pong"] * 3
+        assert all(session.closed for session in sessions)
+
+        # a loop closed without shutting down has its session closed once the next loop needs one
+        loop = asyncio.new_event_loop()
+        assert loop.run_until_complete(call()) == "pong"
+        loop.close()
+        assert not sessions[-1].closed
+        assert asyncio.run(call()) == "pong"
+        assert sessions[-2].closed
+        assert len(transport._sessions) == 1
+
+        sessions.clear()
+        gc.collect()
+    assert not [warning for warning in caught if "Unclosed" in str(warning.message)]
@@ -0,0 +1,105 @@
+import configparser
+
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import GPTModel, ModelRouter, ModelSpec
+from resource_manager.built_in_resources import CurrencyResource
+
+
+def make_router(**kwargs):
+    return ModelRouter([
+        ModelSpec("cheap/small", 0.001, 0.002, 4096, "gpt-3.5-turbo-0613"),
+        ModelSpec("mid/large", 0.003, 0.004, 16384, "gpt-3.5-turbo-16k-0613"),
+        ModelSpec("pricey/fast", 0.03, 0.06, 8192, "gpt-4-0613"),
+    ], **kwargs)
+
+
+def test_routes_to_cheapest_model_that_fits_the_context():
+    router = make_router()
+    assert router.route(1000, 1000).name == "cheap/small"
+    assert router.route(6000, 1000).name == "mid/large"
+    with pytest.raises(ValueError, match="No model fits"):
+        router.route(20000, 1000)
+
+
+def test_budget_excludes_models_whose_worst_case_it_cannot_cover():
+    router = make_router()
+    assert router.route(6000, 1000, budget=0.05).name == "mid/large"
+    with pytest.raises(ValueError, match="within"):
+        router.route(6000, 1000, budget=0.01)
+
+
+def test_slow_or_failing_models_are_routed_around():
+    router = make_router(latency_slo=1.0, min_samples=3)
+    for _ in range(3):
+        router.record("cheap/small", 2.5)
+        router.record("mid/large", 0.5, ok=False)
+        router.record("pricey/fast", 0.4)
+
+    assert router.measurements("cheap/small")["p95_latency"] == 2.5
+    assert router.measurements("mid/large")["error_rate"] == 1.0
+    assert router.route(1000, 1000).name == "pricey/fast"
+    # a looser SLO for this request lets the cheap model serve it again
+    assert router.route(1000, 1000, latency_slo=3.0).name == "cheap/small"
+
+
+def test_measurements_age_out_of_the_window():
+    router = make_router(latency_slo=1.0, min_samples=1, window_seconds=60)
+    with patch("reasoning_engines.ModelRouter.time.monotonic", return_value=1000.0):
+        router.record("cheap/small", 5.0)
+    with patch("reasoning_engines.ModelRouter.time.monotonic", return_value=1030.0):
+        assert router.route(100, 100).name == "mid/large"
+    with patch("reasoning_engines.ModelRouter.time.monotonic", return_value=1100.0):
+        assert router.route(100, 100).name == "cheap/small"
+
+
+def test_falls_back_to_fastest_when_nothing_meets_the_slo():
+    router = make_router(latency_slo=0.1, min_samples=1)
+    router.record("cheap/small", 3.0)
+    router.record("mid/large", 1.0)
+    router.record("pricey/fast", 2.0)
+    assert router.route(100, 100).name == "mid/large"
+
+
+def test_from_config_reads_the_model_table():
+    config = configparser.ConfigParser()
+    config.read_string("""
+[ModelRouter]
+enabled = true
+latency_slo_ms = 1500
+
+[Model:openai/gpt-3.5-turbo]
+input_price = 0.0015
+output_price = 0.002
+context_window = 4096
+tokenizer = gpt-3.5-turbo-0613
+""")
+    with patch.object(ModelRouter, "_shared", None):
+        router = ModelRouter.from_config(config)
+        assert router.latency_slo == 1.5
+        assert router.spec("openai/gpt-3.5-turbo").context_window == 4096
+
+    config["ModelRouter"]["enabled"] = "false"
+    assert ModelRouter.from_config(config) is None
+
+
+def test_gpt_model_routes_prices_and_records_latency():
+    router = make_router(min_samples=1)
+    model = GPTModel(router=router, max_output_tokens=100)
+    currency = CurrencyResource(budget=1.0)
+    counted = []
+
+    def count_messages(messages, model):
+        counted.append(model)
+        return 500
+
+    with patch.object(model.token_counter, "count_messages", side_effect=count_messages), \
+            patch.object(model.client, "generate", return_value="ok") as fake_generate:
+        assert model.generate([{"role": "user", "content": "hi"}], currency) == "ok"
+
+    assert fake_generate.call_args.kwargs["model"] == "cheap/small"
+    assert "gpt-3.5-turbo-0613" in counted  # the routed model's tokenizer
+    # 500 input tokens at $0.001 and 500 output tokens at $0.002 per 1000
+    assert currency.budget == pytest.approx(1.0 - 0.0005 - 0.001)
+    assert router.measurements("cheap/small")["calls"] == 1
@@ -15,7 +15,7 @@ def make_response(text="ok"):
     return Resp()
 
 
-@patch("reasoning_engines.OpenRouterModel.requests.post")
+@patch("requests.Session.post")
 def test_spend_after_api_call(mock_post):
     events = []
 
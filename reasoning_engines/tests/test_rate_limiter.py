@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from reasoning_engines import GPTModel, RateLimiter
+
+
+def test_requests_within_budget_do_not_wait():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=600)
+    start = time.monotonic()
+    limiter.acquire(300)
+    limiter.acquire(300)
+    assert time.monotonic() - start < 0.05
+    assert limiter.stats()["waited"] == 0
+
+
+def test_callers_queue_for_tokens_instead_of_failing():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=600)  # 10 tokens per second
+    limiter.acquire(600)
+    start = time.monotonic()
+    limiter.acquire(3)
+    assert time.monotonic() - start == pytest.approx(0.3, abs=0.1)
+
+    stats = limiter.stats()
+    assert stats["waited"] == 1
+    assert stats["waiting"] == 0
+    assert stats["max_wait"] == pytest.approx(0.3, abs=0.05)
+
+
+def test_queued_callers_are_spaced_out():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=600)
+    limiter.acquire(600)
+    finished = []
+
+    def call():
+        limiter.acquire(2)
+        finished.append(time.monotonic())
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert limiter.stats()["waiting"] == 3
+    assert limiter.stats()["current_wait"] > 0.4
+    for thread in threads:
+        thread.join()
+
+    assert [t - start for t in sorted(finished)] == pytest.approx([0.2, 0.4, 0.6], abs=0.1)
+
+
+def test_async_callers_wait_without_blocking_the_loop():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=600)
+    limiter.acquire(600)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick_task = asyncio.create_task(ticker())
+        await limiter.aacquire(2)
+        tick_task.cancel()
+        return ticks
+
+    assert asyncio.run(main()) > 5
+
+
+def test_cancelled_async_caller_hands_back_its_reservation():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=600)
+    limiter.acquire(600)
+
+    async def main():
+        task = asyncio.create_task(limiter.aacquire(100))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert limiter.tokens.level > -1
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_generate_waits_for_input_estimate_and_charges_output():
+    limiter = MagicMock(spec=RateLimiter)
+    model = GPTModel(rate_limiter=limiter)
+    with patch.object(GPTModel, "measure_tokens", return_value=(42, 0.0)), \
+            patch("reasoning_engines.OpenRouterModel.OpenRouterModel.generate", return_value="hi"):
+        assert model.generate([{"role": "user", "content": "hello"}]) == "hi"
+
+    limiter.acquire.assert_called_once_with(42)
+    limiter.consume.assert_called_once_with(42)
+
+
+def test_agenerate_waits_on_the_limiter():
+    limiter = MagicMock(spec=RateLimiter)
+    model = GPTModel(rate_limiter=limiter)
+
+    async def fake_agenerate(model, messages):
+        return "hi"
+
+    with patch.object(GPTModel, "measure_tokens", return_value=(7, 0.0)), \
+            patch("reasoning_engines.OpenRouterModel.OpenRouterModel.agenerate", side_effect=fake_agenerate):
+        assert asyncio.run(model.agenerate([{"role": "user", "content": "hello"}])) == "hi"
+
+    limiter.aacquire.assert_awaited_once_with(7)
+    limiter.acquire.assert_not_called()
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+import requests
+from unittest.mock import patch
+
+from reasoning_engines import AsyncHTTPTransport, HTTPTransport, OpenRouterModel, Resilience
+from reasoning_engines.Resilience import CircuitOpenError, parse_retry_after
+
+
+def make_client(server, **resilience_kwargs):
+    client = OpenRouterModel(api_key="test", transport=HTTPTransport(), async_transport=AsyncHTTPTransport(),
+                             resilience=Resilience(base_delay=0, **resilience_kwargs))
+    client.url = server.url
+    return client
+
+
+def test_transient_failures_are_retried(completion_server):
+    completion_server.failures = [(503, {}), (502, {})]
+    client = make_client(completion_server)
+
+    assert client.generate("openai/gpt-4", [{"role": "user", "content": "ping"}]) == "pong"
+    assert completion_server.requests_seen == 3
+    assert client.resilience.retries == 2
+
+
+def test_retry_after_is_honoured(completion_server):
+    completion_server.failures = [(429, {"Retry-After": "2"})]
+    client = make_client(completion_server)
+
+    with patch("reasoning_engines.Resilience.time.sleep") as sleep:
+        client.generate("openai/gpt-4", [{"role": "user", "content": "ping"}])
+    sleep.assert_any_call(2.0)
+
+
+def test_client_errors_are_not_retried(completion_server):
+    completion_server.failures = [(400, {})]
+    client = make_client(completion_server)
+
+    with pytest.raises(requests.HTTPError):
+        client.generate("openai/gpt-4", [{"role": "user", "content": "ping"}])
+    assert completion_server.requests_seen == 1
+
+
+def test_circuit_opens_and_fails_fast(completion_server):
+    completion_server.failures = [(500, {})] * 2
+    client = make_client(completion_server, max_retries=1, failure_threshold=2, reset_timeout=60)
+
+    with pytest.raises(requests.HTTPError):
+        client.generate("openai/gpt-4", [{"role": "user", "content": "ping"}])
+    with pytest.raises(CircuitOpenError):
+        client.generate("openai/gpt-4", [{"role": "user", "content": "ping"}])
+    assert completion_server.requests_seen == 2
+
+    # other models have their own breaker
+    assert client.generate("openai/gpt-3.5-turbo", [{"role": "user", "content": "ping"}]) == "pong"
+
+
+def test_half_open_trial_closes_the_circuit(completion_server):
+    completion_server.failures = [(500, {})]
+    client = make_client(completion_server, max_retries=0, failure_threshold=1, reset_timeout=0)
+
+    with pytest.raises(requests.HTTPError):
+        client.generate("openai/gpt-4", [{"role": "user", "content": "ping"}])
+    assert client.resilience.breaker("openai/gpt-4").state == "open"
+    assert client.generate("openai/gpt-4", [{"role": "user", "content": "ping"}]) == "pong"
+    assert client.resilience.breaker("openai/gpt-4").state == "closed"
+
+
+def test_async_transient_failures_are_retried(completion_server):
+    completion_server.failures = [(429, {"Retry-After": "0"})]
+    client = make_client(completion_server)
+
+    async def run():
+        try:
+            return await client.agenerate("openai/gpt-4", [{"role": "user", "content": "ping"}])
+        finally:
+            await client.async_transport.aclose()
+
+    assert asyncio.run(run()) == "pong"
+    assert completion_server.requests_seen == 2
+
+
+def test_parse_retry_after_accepts_http_dates():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("soon") is None
@@ -0,0 +1,64 @@
+import configparser
+import time
+
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import GPTModel, ResponseCache
+from reasoning_engines.ResponseCache import request_key
+from resource_manager.built_in_resources import CurrencyResource
+
+
+def test_request_key_ignores_whitespace_and_key_order():
+    first = request_key("openai/gpt-4", [{"role": "user", "content": "hello\r\n"}])
+    second = request_key("openai/gpt-4", [{"content": "hello", "role": "user"}])
+    assert first == second
+    assert first != request_key("openai/gpt-3.5-turbo", [{"role": "user", "content": "hello"}])
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(path=":memory:", ttl_seconds=60)
+    with patch("reasoning_engines.ResponseCache.time.time", return_value=1000):
+        cache.put("key", "model", "reply", 0.1)
+    with patch("reasoning_engines.ResponseCache.time.time", return_value=1030):
+        assert cache.get("key") == ("reply", 0.1)
+    with patch("reasoning_engines.ResponseCache.time.time", return_value=1061):
+        assert cache.get("key") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(path=":memory:", max_entries=2)
+    now = time.time()
+    with patch("reasoning_engines.ResponseCache.time.time", side_effect=[now - 4, now - 3, now - 2, now - 1]):
+        cache.put("a", "model", "reply a", 0.1)
+        cache.put("b", "model", "reply b", 0.1)
+        cache.get("a")
+        cache.put("c", "model", "reply c", 0.1)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["entries"] == 2
+
+
+@patch("requests.Session.post")
+@patch.object(GPTModel, "measure_tokens", return_value=(1, 0.1))
+def test_hit_skips_api_call_and_spend(mock_measure, mock_post, tmp_path):
+    mock_post.return_value.json.return_value = {"choices": [{"message": {"content": "hi"}}]}
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    model = GPTModel(cache=cache)
+    currency = CurrencyResource(budget=1.0)
+    messages = [{"role": "user", "content": "hello"}]
+
+    assert model.generate(messages, currency) == "hi"
+    assert model.generate(messages, currency) == "hi"
+
+    assert mock_post.call_count == 1
+    assert currency.budget == pytest.approx(0.8)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["dollars_saved"] == pytest.approx(0.2)
+
+
+def test_from_config_respects_enabled_flag():
+    config = configparser.ConfigParser()
+    config.read_dict({"ResponseCache": {"enabled": "false"}})
+    assert ResponseCache.from_config(config) is None
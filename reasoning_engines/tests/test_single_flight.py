@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import GPTModel, ResponseCache, SingleFlight
+from resource_manager.built_in_resources import CurrencyResource
+
+
+def run_concurrently(policy, callers=3):
+    flight = SingleFlight(charge_policy=policy)
+    calls = []
+
+    def fake_generate(model, messages):
+        calls.append(model)
+        time.sleep(0.1)
+        return "shared"
+
+    models = [GPTModel(single_flight=flight) for _ in range(callers)]
+    currencies = [CurrencyResource(budget=1.0) for _ in range(callers)]
+    replies = [None] * callers
+
+    def call(i):
+        replies[i] = models[i].generate([{"role": "user", "content": "same question"}], currencies[i])
+
+    with patch.object(GPTModel, "measure_tokens", return_value=(1, 0.15)), \
+            patch("reasoning_engines.OpenRouterModel.OpenRouterModel.generate", side_effect=fake_generate):
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+
+    return calls, replies, [currency.budget for currency in currencies]
+
+
+def test_identical_concurrent_requests_are_sent_once_and_split():
+    calls, replies, budgets = run_concurrently("split")
+    assert len(calls) == 1
+    assert replies == ["shared"] * 3
+    assert budgets == pytest.approx([0.9] * 3)
+
+
+def test_leader_policy_charges_only_the_leader():
+    calls, replies, budgets = run_concurrently("leader")
+    assert sorted(budgets) == pytest.approx([0.7, 1.0, 1.0])
+
+
+def test_each_policy_charges_every_caller():
+    calls, replies, budgets = run_concurrently("each")
+    assert budgets == pytest.approx([0.7] * 3)
+
+
+def test_followers_receive_the_leaders_error():
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("upstream failed")
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    call()
+    leader.join()
+    assert len(errors) == 2
+    assert errors[0] is errors[1]
+
+
+def test_async_request_is_only_cancelled_when_every_caller_is():
+    flight = SingleFlight()
+
+    async def run():
+        async def slow():
+            await asyncio.sleep(0.1)
+            return "done"
+
+        first = asyncio.create_task(flight.ado("key", slow))
+        second = asyncio.create_task(flight.ado("key", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == ("done", True, 1)  # the follower took over from the cancelled leader
+
+
+def test_cancelled_leader_hands_over_caching_and_charging():
+    flight = SingleFlight(charge_policy="leader")
+    calls = []
+
+    async def fake_agenerate(model, messages):
+        calls.append(model)
+        await asyncio.sleep(0.1)
+        return "shared"
+
+    async def run():
+        cache = ResponseCache(path=":memory:")
+        models = [GPTModel(single_flight=flight, cache=cache) for _ in range(3)]
+        currencies = [CurrencyResource(budget=1.0) for _ in range(3)]
+        messages = [{"role": "user", "content": "same question"}]
+        tasks = []
+        for model, currency in zip(models, currencies):
+            tasks.append(asyncio.create_task(model.agenerate(messages, currency)))
+            await asyncio.sleep(0.01)
+        tasks[0].cancel()
+        replies = await asyncio.gather(*tasks[1:])
+        replies.append(await models[0].agenerate(messages, currencies[0]))  # served from the cache
+        return currencies, replies
+
+    with patch.object(GPTModel, "measure_tokens", return_value=(1, 0.15)), \
+            patch("reasoning_engines.OpenRouterModel.OpenRouterModel.agenerate", side_effect=fake_agenerate):
+        currencies, replies = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert replies == ["shared"] * 3
+    # the cancelled leader pays nothing, and exactly one of the others pays and caches the reply in its place
+    assert currencies[0].budget == pytest.approx(1.0)
+    assert sorted(currency.budget for currency in currencies[1:]) == pytest.approx([0.7, 1.0])
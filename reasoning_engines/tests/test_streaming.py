@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import AsyncHTTPTransport, GPTModel, TokenCounter
+from resource_manager.built_in_resources import CurrencyResource
+
+
+class CharEncoding:
+    """Stand-in tiktoken encoding with one token per character."""
+
+    def encode(self, text):
+        return list(text)
+
+
+@pytest.fixture
+def model(completion_server):
+    completion_server.stream_deltas = ["Hel", "lo", " world"]
+    gpt = GPTModel(max_output_tokens=50)  # keeps the worst case reservation within the test budgets
+    gpt.client.url = completion_server.url
+    gpt.client.async_transport = AsyncHTTPTransport()
+    with patch.object(GPTModel, "measure_tokens", return_value=(10, 0.1)), \
+            patch.object(GPTModel, "token_price", return_value=10.0), \
+            patch.object(TokenCounter, "encoding_for", return_value=CharEncoding()):
+        yield gpt
+
+
+def test_stream_yields_deltas_and_charges_on_finish(model):
+    currency = CurrencyResource(budget=1.0)
+    stream = model.stream([{"role": "user", "content": "hi"}], currency)
+
+    assert next(stream) == "Hel"
+    assert stream.metrics.output_tokens == 3
+    assert stream.metrics.time_to_first_token is not None
+    assert currency.budget == pytest.approx(1.0)
+
+    assert list(stream) == ["lo", " world"]
+    assert stream.text == "Hello world"
+    assert stream.metrics.completed
+    assert stream.metrics.tokens_per_second is not None
+    assert currency.budget == pytest.approx(1.0 - 0.1 - 11 * 0.01)
+    assert model.stream_metrics[-1] is stream.metrics
+
+
+def test_closing_stream_early_charges_partial_output(model):
+    currency = CurrencyResource(budget=1.0)
+    with model.stream([{"role": "user", "content": "hi"}], currency) as stream:
+        next(stream)
+    assert not stream.metrics.completed
+    assert currency.budget == pytest.approx(1.0 - 0.1 - 3 * 0.01)
+
+
+def test_astream_yields_deltas(model):
+    currency = CurrencyResource(budget=1.0)
+
+    async def run():
+        try:
+            stream = model.astream([{"role": "user", "content": "hi"}], currency)
+            return [delta async for delta in stream], stream.metrics
+        finally:
+            await model.client.async_transport.aclose()
+
+    deltas, metrics = asyncio.run(run())
+    assert deltas == ["Hel", "lo", " world"]
+    assert metrics.completed
+    assert currency.budget == pytest.approx(1.0 - 0.1 - 11 * 0.01)
+
+
+def test_stream_reserves_on_first_iteration(model):
+    currency = CurrencyResource(budget=1.0)
+    stream = model.stream([{"role": "user", "content": "hi"}], currency)
+    assert currency.reserved == 0.0  # a stream dropped before it is read holds nothing
+
+    next(stream)
+    assert currency.reserved > 0.0
+    stream.close()
+    assert currency.reserved == 0.0
+
+
+def test_stream_with_insufficient_funds_fails_on_first_iteration(model):
+    currency = CurrencyResource(budget=0.1)
+    stream = model.stream([{"role": "user", "content": "hi"}], currency)
+    with pytest.raises(ValueError, match="Insufficient funds"):
+        next(stream)
+    assert currency.reserved == 0.0
+    assert currency.budget == pytest.approx(0.1)
+
+
+def test_astream_reserves_on_first_iteration(model):
+    currency = CurrencyResource(budget=1.0)
+
+    async def run():
+        try:
+            stream = model.astream([{"role": "user", "content": "hi"}], currency)
+            reserved_before = currency.reserved
+            await stream.__anext__()
+            reserved_during = currency.reserved
+            await stream.aclose()
+            return reserved_before, reserved_during
+        finally:
+            await model.client.async_transport.aclose()
+
+    reserved_before, reserved_during = asyncio.run(run())
+    assert reserved_before == 0.0
+    assert reserved_during > 0.0
+    assert currency.reserved == 0.0
@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import patch
+
+from reasoning_engines import GPTModel, TokenCounter
+
+
+class WordEncoding:
+    """Stand-in tiktoken encoding that counts whitespace separated words."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split()
+
+
+@pytest.fixture
+def encoding():
+    word_encoding = WordEncoding()
+    with patch("reasoning_engines.TokenCounter.tiktoken.encoding_for_model", return_value=word_encoding) as factory:
+        word_encoding.factory = factory
+        yield word_encoding
+
+
+def test_encoder_resolved_once_per_model(encoding):
+    counter = TokenCounter()
+    messages = [{"role": "user", "content": "hello there"}]
+
+    counter.count_messages(messages, "openai/gpt-3.5-turbo")
+    counter.count_messages(messages, "gpt-3.5-turbo-0613")
+
+    encoding.factory.assert_called_once_with("gpt-3.5-turbo-0613")
+
+
+def test_growing_history_only_encodes_new_messages(encoding):
+    counter = TokenCounter()
+    history = [{"role": "system", "content": "you are helpful"}]
+
+    assert counter.count_messages(history, "gpt-4") == 3 + 1 + 3 + 3
+    history.append({"role": "user", "content": "one two"})
+    calls_before = encoding.calls
+    assert counter.count_messages(history, "gpt-4") == (3 + 1 + 3) + (3 + 1 + 2) + 3
+    assert encoding.calls - calls_before == 2  # role and content of the new message only
+    assert counter.hits == 1
+
+
+def test_message_cache_is_bounded(encoding):
+    counter = TokenCounter(max_cached_messages=2)
+    for i in range(5):
+        counter.count_message({"role": "user", "content": f"message {i}"}, "gpt-4")
+    assert len(counter._message_counts) == 2
+
+
+def test_measure_tokens_prices_openrouter_names(encoding):
+    model = GPTModel()
+    model.token_counter = TokenCounter()
+    tokens, cost = model.measure_tokens([{"role": "user", "content": "hi"}], "openai/gpt-4", "input")
+    assert tokens == 3 + 1 + 1 + 3
+    assert cost == pytest.approx(tokens * 0.03 / 1000)
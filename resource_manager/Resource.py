@@ -1,6 +1,7 @@
-import logging
 import pathlib
 
+from telemetry import get_logger
+
 project_root = pathlib.Path(__file__).parent.parent.resolve()
 class Resource:
     """
@@ -26,31 +27,7 @@ class Resource:
         self.storage_root = f"{project_root}/storage/resources/{self.name}"
 
         # Set up logging
-        self.logger = logging.getLogger(name)  # Create a logger for this layer
-        self.logger.setLevel(logging.DEBUG)  # Set the logging level
-
-        # Create a console handler
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.DEBUG)
-
-        # Create a file handler
-        fh = logging.FileHandler(f'{project_root}/application.log')
-        fh.setLevel(logging.DEBUG)
-
-        # Create a formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-        # Add the formatter to the console handler
-        ch.setFormatter(formatter)
-
-        # Add the formatter to the file handler
-        fh.setFormatter(formatter)
-
-        # Add the console handler to the logger
-        self.logger.addHandler(ch)
-
-        # Add the file handler to the logger
-        self.logger.addHandler(fh)
+        self.logger = get_logger(name)
 
         self.logger.debug(f"Instance of {name} resource created.")
 
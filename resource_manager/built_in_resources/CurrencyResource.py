@@ -1,8 +1,50 @@
+import threading
+
 from resource_manager import Resource
 
 
+class Reservation:
+    """
+    Budget held back for a call in flight, see CurrencyResource.reserve().
+
+    Settle it with commit() once the actual cost is known, or release() if the call did not happen. Used as a context
+    manager, a reservation still held on exit is released.
+    """
+
+    def __init__(self, resource, amount: float):
+        self.resource = resource
+        self.amount = amount
+        self.state = "held"  # 'held', 'committed' or 'released'
+
+    def commit(self, actual: float) -> None:
+        """
+        Spend the actual cost of the call in place of the held amount.
+
+        Args:
+            actual (float): The actual cost, normally no more than the amount held.
+        """
+        self.resource.spend(actual, reservation=self)
+
+    def release(self) -> None:
+        """
+        Hand the held amount back to the budget. Does nothing if the reservation is already settled.
+        """
+        self.resource.release_reservation(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
 class CurrencyResource(Resource):
-    """Currency resource tracking API budget."""
+    """
+    Currency resource tracking API budget.
+
+    Concurrent callers reserve their worst case cost before a call, so that the calls in flight can never overdraw
+    the budget between them, and commit the actual cost once it is known.
+    """
 
     def __init__(self, budget: float = 0.0):
         super().__init__(
@@ -10,12 +52,63 @@ class CurrencyResource(Resource):
             description="Resource to represent available real-word currency for spend on LLM API calls",
             budget=budget,
         )
+        self.reserved: float = 0.0  # held back by reservations of calls in flight
+        self._lock = threading.Lock()  # concurrent generate calls share one budget
+
+    @property
+    def available(self) -> float:
+        """The budget not held back by reservations."""
+        return self.budget - self.reserved
+
+    def reserve(self, amount: float) -> Reservation:
+        """
+        Hold back amount of the budget for a call about to be made.
+
+        Args:
+            amount (float): The most the call can cost.
+
+        Returns:
+            Reservation: The reservation to commit or release once the call is over.
+        """
+        if amount < 0:
+            raise ValueError("Reserve amount must be positive")
+        with self._lock:
+            if self.budget - self.reserved - amount < 0:
+                raise ValueError(f"Insufficient currency budget: needs ${amount:.4f}, "
+                                 f"has ${self.budget - self.reserved:.4f} available")
+            self.reserved += amount
+        return Reservation(self, amount)
+
+    def release_reservation(self, reservation: Reservation) -> None:
+        """Hand a reservation's held amount back to the budget if it is still held."""
+        with self._lock:
+            if reservation.state != "held":
+                return
+            reservation.state = "released"
+            self.reserved -= reservation.amount
+
+    def spend(self, amount: float, reservation: Reservation | None = None) -> None:
+        """
+        Deduct amount from budget and log the spend.
 
-    def spend(self, amount: float) -> None:
-        """Deduct amount from budget and log the spend."""
+        Args:
+            amount (float): The amount to spend.
+            reservation (Reservation): The reservation the spend settles. The money has then already been spent
+                upstream, so it is deducted even if it exceeds what was reserved.
+        """
         if amount < 0:
             raise ValueError("Spend amount must be positive")
-        if self.budget - amount < 0:
-            raise ValueError("Insufficient currency budget")
-        self.budget -= amount
+        with self._lock:
+            if reservation is None:
+                if self.budget - self.reserved - amount < 0:
+                    raise ValueError("Insufficient currency budget")
+            else:
+                if reservation.state != "held":
+                    raise ValueError(f"Reservation already {reservation.state}")
+                reservation.state = "committed"
+                self.reserved -= reservation.amount
+            self.budget -= amount
+        if reservation is not None and amount > reservation.amount:
+            self.logger.warning(f"CurrencyResource spend of ${amount:.4f} exceeded its reservation "
+                                f"of ${reservation.amount:.4f}")
         self.logger.debug(f"CurrencyResource spent ${amount:.4f}, remaining ${self.budget:.4f}")
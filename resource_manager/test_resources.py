@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from resource_manager import CurrencyResource
+
+
+def test_reservation_holds_budget_until_committed():
+    currency = CurrencyResource(budget=1.0)
+    reservation = currency.reserve(0.6)
+    assert currency.available == pytest.approx(0.4)
+    assert currency.budget == pytest.approx(1.0)
+
+    with pytest.raises(ValueError, match="Insufficient currency budget"):
+        currency.reserve(0.5)
+    with pytest.raises(ValueError, match="Insufficient currency budget"):
+        currency.spend(0.5)
+
+    reservation.commit(0.25)
+    assert currency.budget == pytest.approx(0.75)
+    assert currency.available == pytest.approx(0.75)
+
+
+def test_released_reservation_returns_to_budget():
+    currency = CurrencyResource(budget=1.0)
+    with currency.reserve(0.6) as reservation:
+        assert currency.available == pytest.approx(0.4)
+    assert reservation.state == "released"
+    assert currency.available == pytest.approx(1.0)
+
+    reservation.release()  # releasing twice does nothing
+    assert currency.available == pytest.approx(1.0)
+    with pytest.raises(ValueError, match="already released"):
+        reservation.commit(0.1)
+
+
+def test_commit_over_reservation_is_still_charged():
+    currency = CurrencyResource(budget=1.0)
+    reservation = currency.reserve(0.1)
+    reservation.commit(0.3)
+    assert currency.budget == pytest.approx(0.7)
+    reservation.release()  # already committed, nothing to hand back
+    assert currency.available == pytest.approx(0.7)
+
+
+def test_concurrent_reservations_never_overdraw():
+    currency = CurrencyResource(budget=1.0)
+    granted = []
+    barrier = threading.Barrier(20)
+
+    def reserve():
+        barrier.wait()
+        try:
+            granted.append(currency.reserve(0.1))
+        except ValueError:
+            pass
+
+    threads = [threading.Thread(target=reserve) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(granted) == 10
+    for reservation in granted:
+        reservation.commit(0.1)
+    assert currency.budget == pytest.approx(0.0)
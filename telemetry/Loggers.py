@@ -0,0 +1,59 @@
+import logging
+import pathlib
+import sys
+import threading
+
+project_root = pathlib.Path(__file__).parent.parent.resolve()
+
+_handlers = None
+_handlers_lock = threading.Lock()
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    # Writes to whatever sys.stderr is when a record is emitted, so a handler shared for the life of the process
+    # follows any redirection of stderr
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def _shared_handlers():
+    global _handlers
+    if _handlers is None:
+        with _handlers_lock:
+            if _handlers is None:
+                formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+                console = _ConsoleHandler()
+                # The log file is opened by the first record written to it, not when the handler is created
+                file = logging.FileHandler(f'{project_root}/application.log', delay=True)
+                for handler in (console, file):
+                    handler.setLevel(logging.DEBUG)
+                    handler.setFormatter(formatter)
+                _handlers = (console, file)
+    return _handlers
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger writing DEBUG and above to the console and to application.log.
+
+    Every logger shares the same two handlers, and each is added to a logger once however often the logger is asked
+    for, so creating many layers, resources, capabilities or products neither opens more files nor writes a record
+    more than once.
+
+    Args:
+        name (str): The name of the logger, usually that of the layer or component logging.
+
+    Returns:
+        logging.Logger: The logger.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    for handler in _shared_handlers():
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
+    return logger
@@ -0,0 +1,313 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _otlp_value(value) -> dict:
+    # OTLP/JSON carries 64-bit integers as strings
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """
+    One timed step of a trace: a hop between layers, the handling of a message, an LLM call or a capability run.
+
+    Used as a context manager the span times the block it wraps and becomes the parent of the spans started inside
+    it, on the same thread or task. It is exported when the block exits.
+    """
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "layer", "start", "end", "attributes",
+                 "error", "_token")
+
+    def __init__(self, tracer, name: str, trace_id: str, parent_id: str | None = None, layer: str | None = None,
+                 attributes: dict | None = None):
+        """
+        Initialize the Span.
+
+        Args:
+            tracer (Tracer): Exports the span when it ends.
+            name (str): What the span times.
+            trace_id (str): The trace the span belongs to, 32 hex digits such as a Message's correlation_id.
+            parent_id (str): The span this one is part of, None for the root of a trace.
+            layer (str): The name of the layer the span ran in.
+            attributes (dict): Further details to record with the span.
+        """
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.layer = layer
+        self.start = time.time()
+        self.end = None
+        self.attributes = attributes or {}
+        self.error = None
+        self._token = None
+
+    def set(self, **attributes):
+        """
+        Record further details with the span.
+        """
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.time()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.time()
+        if exc is not None:
+            self.error = repr(exc)
+        _current_span.reset(self._token)
+        self.tracer.export(self)
+        return False
+
+    @property
+    def duration(self) -> float:
+        """
+        The span's length in seconds, None while it is running.
+        """
+        return None if self.end is None else self.end - self.start
+
+    def to_otlp(self) -> dict:
+        """
+        Get the span in the shape of an OTLP/JSON span.
+
+        Returns:
+            dict: The span.
+        """
+        attributes = dict(self.attributes)
+        if self.layer is not None:
+            attributes["ace.layer"] = self.layer
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(int(self.start * 1e9)),
+            "endTimeUnixNano": str(int(self.end * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},  # ERROR or OK
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Tracer:
+    """
+    Records spans to a JSON-lines file, one OTLP/JSON export request per line, the format the OpenTelemetry
+    Collector's file exporter writes and its otlpjsonfile receiver reads.
+
+    A message's correlation_id is its trace id, so every hop, LLM call and capability run on the way to fulfilling a
+    commission lands in one trace. Spans are appended to the file as they end, by every layer and process sharing
+    it; `python -m telemetry` summarises the file as a latency waterfall per trace.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = "traces.jsonl", service_name: str = "ace"):
+        """
+        Initialize the Tracer.
+
+        Args:
+            path (str): The file spans are appended to.
+            service_name (str): The service.name resource attribute of the spans.
+        """
+        self.path = path
+        self.service_name = service_name
+        self.spans = 0  # spans exported by this tracer
+
+        self._fd = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, **kwargs):
+        """
+        Get the process-wide tracer, creating it on first use.
+
+        Args:
+            **kwargs: Keyword arguments passed to Tracer when the shared tracer is created.
+
+        Returns:
+            Tracer: The shared tracer.
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(**kwargs)
+        return cls._shared
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Get the shared tracer if tracing is enabled in the [Tracing] section of the config.
+
+        Args:
+            config (configparser.ConfigParser): The parsed config.ini.
+
+        Returns:
+            Tracer: The shared tracer, or None if tracing is disabled.
+        """
+        if not config.has_section("Tracing"):
+            return None
+        section = config["Tracing"]
+        if not section.getboolean("enabled", fallback=False):
+            return None
+        return cls.shared(path=section.get("path", fallback="traces.jsonl"),
+                          service_name=section.get("service_name", fallback="ace"))
+
+    @classmethod
+    def active(cls):
+        """
+        Get the shared tracer if one has been created, for code with no tracer of its own to record spans to.
+
+        Returns:
+            Tracer: The shared tracer, or None.
+        """
+        return cls._shared
+
+    def span(self, name: str, layer: str | None = None, trace_id: str | None = None, parent_id: str | None = None,
+             **attributes) -> Span:
+        """
+        Start a span, to be used as a context manager.
+
+        Anything not given is taken from the span currently open on this thread or task, if it belongs to the same
+        trace; with no span open the span starts a new trace.
+
+        Args:
+            name (str): What the span times.
+            layer (str): The name of the layer the span runs in.
+            trace_id (str): The trace the span belongs to.
+            parent_id (str): The span this one is part of.
+            **attributes: Further details to record with the span.
+
+        Returns:
+            Span: The span.
+        """
+        parent = _current_span.get()
+        if parent is not None:
+            if trace_id is None:
+                trace_id = parent.trace_id
+            if parent_id is None and trace_id == parent.trace_id:
+                parent_id = parent.span_id
+            layer = layer or parent.layer
+        return Span(self, name, trace_id or uuid.uuid4().hex, parent_id, layer, attributes)
+
+    def record(self, name: str, start: float, end: float | None = None, **kwargs) -> Span:
+        """
+        Export a span for something that has already happened, such as the time a message spent queued.
+
+        Args:
+            name (str): What the span times.
+            start (float): When it started, as time.time().
+            end (float): When it ended, now by default.
+            **kwargs: Passed to span().
+
+        Returns:
+            Span: The span.
+        """
+        span = self.span(name, **kwargs)
+        span.start = start
+        span.end = end or time.time()
+        self.export(span)
+        return span
+
+    def export(self, span: Span):
+        """
+        Append a finished span to the file.
+
+        Args:
+            span (Span): The span.
+        """
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": _otlp_value(self.service_name)}]},
+            "scopeSpans": [{"scope": {"name": "ace.telemetry"}, "spans": [span.to_otlp()]}],
+        }]}
+        line = (json.dumps(request, default=str) + "\n").encode()
+        with self._lock:
+            if self._fd is None:
+                # One write per span to a file opened for appending, so lines from other processes never interleave
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            os.write(self._fd, line)
+            self.spans += 1
+
+    def close(self):
+        """
+        Close the file. It is opened again if another span is exported.
+        """
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def current_span() -> Span | None:
+    """
+    Get the span open on this thread or task.
+
+    Returns:
+        Span: The innermost open span, or None.
+    """
+    return _current_span.get()
+
+
+def annotate(**attributes):
+    """
+    Record further details with the span open on this thread or task, if there is one.
+
+    Args:
+        **attributes: The details.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def traced(name: str | None = None):
+    """
+    Decorate a function or coroutine function to record a span for each call while a shared tracer is active.
+
+    Args:
+        name (str): The name of the spans, the function's qualified name by default.
+
+    Returns:
+        The decorator.
+    """
+    def decorate(function):
+        span_name = name or function.__qualname__
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                tracer = Tracer.active()
+                if tracer is None:
+                    return await function(*args, **kwargs)
+                with tracer.span(span_name):
+                    return await function(*args, **kwargs)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                tracer = Tracer.active()
+                if tracer is None:
+                    return function(*args, **kwargs)
+                with tracer.span(span_name):
+                    return function(*args, **kwargs)
+        return wrapper
+
+    return decorate
@@ -0,0 +1,133 @@
+import json
+from collections import defaultdict
+
+
+def _attribute(value: dict):
+    # The inverse of Tracer's _otlp_value
+    for kind, raw in value.items():
+        if kind == "intValue":
+            return int(raw)
+        return raw
+
+
+def load_spans(path: str) -> list:
+    """
+    Read the spans from a file written by Tracer, or any OTLP/JSON-lines file.
+
+    Args:
+        path (str): The file.
+
+    Returns:
+        list[dict]: Each span's trace_id, span_id, parent_id, name, layer, start and end (as time.time()), ok and
+        attributes.
+    """
+    spans = []
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    for span in scope_spans.get("spans", []):
+                        attributes = {attribute["key"]: _attribute(attribute["value"])
+                                      for attribute in span.get("attributes", [])}
+                        spans.append({
+                            "trace_id": span["traceId"],
+                            "span_id": span["spanId"],
+                            "parent_id": span.get("parentSpanId") or None,
+                            "name": span["name"],
+                            "layer": attributes.pop("ace.layer", None),
+                            "start": int(span["startTimeUnixNano"]) / 1e9,
+                            "end": int(span["endTimeUnixNano"]) / 1e9,
+                            "ok": span.get("status", {}).get("code") != 2,
+                            "attributes": attributes,
+                        })
+    return spans
+
+
+def group_traces(spans: list) -> dict:
+    """
+    Group spans by trace, in the order each trace started.
+
+    Args:
+        spans (list[dict]): Spans from load_spans().
+
+    Returns:
+        dict: The spans of each trace, sorted by start, by trace id.
+    """
+    traces = defaultdict(list)
+    for span in sorted(spans, key=lambda span: span["start"]):
+        traces[span["trace_id"]].append(span)
+    return dict(traces)
+
+
+def layer_breakdown(spans: list) -> dict:
+    """
+    Total the time spent in each kind of span, per layer.
+
+    Args:
+        spans (list[dict]): Spans from load_spans().
+
+    Returns:
+        dict: For each layer, by span name, the number of spans and their total, mean and max seconds.
+    """
+    durations = defaultdict(lambda: defaultdict(list))
+    for span in spans:
+        durations[span["layer"] or "-"][span["name"]].append(span["end"] - span["start"])
+    return {layer: {name: {"count": len(times), "total": sum(times), "mean": sum(times) / len(times),
+                           "max": max(times)}
+                    for name, times in names.items()}
+            for layer, names in durations.items()}
+
+
+def format_waterfall(trace: list, width: int = 40) -> str:
+    """
+    Draw one trace as a waterfall, one line per span in the order they started, indented under their parents.
+
+    Args:
+        trace (list[dict]): The spans of one trace, from group_traces().
+        width (int): The width of the bars in characters.
+
+    Returns:
+        str: The waterfall.
+    """
+    origin = min(span["start"] for span in trace)
+    total = max(span["end"] for span in trace) - origin or 1e-9
+    ids = {span["span_id"]: span for span in trace}
+
+    def depth(span):
+        levels = 0
+        while span["parent_id"] in ids and levels < len(ids):
+            span = ids[span["parent_id"]]
+            levels += 1
+        return levels
+
+    lines = [f"trace {trace[0]['trace_id']}  {total * 1000:.1f} ms, {len(trace)} spans",
+             f"  {'start ms':>9} {'ms':>9}  {'layer':<22} {'span':<34}"]
+    for span in trace:
+        offset, duration = span["start"] - origin, span["end"] - span["start"]
+        begin = min(int(offset / total * width), width - 1)
+        length = max(1, round(duration / total * width))
+        bar = " " * begin + "#" * min(length, width - begin)
+        name = "  " * depth(span) + span["name"] + ("" if span["ok"] else " !")
+        lines.append(f"  {offset * 1000:9.1f} {duration * 1000:9.1f}  {span['layer'] or '-':<22} {name:<34} "
+                     f"|{bar:<{width}}|")
+    return "\n".join(lines)
+
+
+def format_breakdown(breakdown: dict) -> str:
+    """
+    Format a layer_breakdown() as a table.
+
+    Args:
+        breakdown (dict): The breakdown.
+
+    Returns:
+        str: The table.
+    """
+    lines = [f"{'layer':<22} {'span':<34} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for layer, names in breakdown.items():
+        for name, stats in sorted(names.items(), key=lambda item: -item[1]["total"]):
+            lines.append(f"{layer:<22} {name:<34} {stats['count']:>6} {stats['total'] * 1000:>10.1f} "
+                         f"{stats['mean'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f}")
+    return "\n".join(lines)
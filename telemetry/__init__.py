@@ -0,0 +1,17 @@
+from .Loggers import get_logger
+from .Tracer import Span, Tracer, annotate, current_span, traced
+from .Waterfall import format_breakdown, format_waterfall, group_traces, layer_breakdown, load_spans
+
+__all__ = [
+    "Span",
+    "Tracer",
+    "annotate",
+    "current_span",
+    "format_breakdown",
+    "format_waterfall",
+    "get_logger",
+    "group_traces",
+    "layer_breakdown",
+    "load_spans",
+    "traced",
+]
@@ -0,0 +1,36 @@
+"""
+Summarise a trace file written by Tracer as per-layer latency waterfalls.
+
+Run from the project root, e.g.:
+
+    python -m telemetry traces.jsonl --last 5
+"""
+
+import argparse
+
+from .Waterfall import format_breakdown, format_waterfall, group_traces, layer_breakdown, load_spans
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m telemetry", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", default="traces.jsonl")
+    parser.add_argument("--trace", help="only show the trace with this id (a message's correlation_id)")
+    parser.add_argument("--last", type=int, default=10, help="show the waterfalls of the last N traces")
+    parser.add_argument("--width", type=int, default=40)
+    args = parser.parse_args(argv)
+
+    spans = load_spans(args.path)
+    traces = group_traces(spans)
+    if args.trace:
+        traces = {args.trace: traces.get(args.trace, [])}
+        spans = traces[args.trace]
+    shown = list(traces.values())[-args.last:] if args.last > 0 else []
+    for trace in shown:
+        if trace:
+            print(format_waterfall(trace, args.width))
+            print()
+    print(format_breakdown(layer_breakdown(spans)))
+
+
+if __name__ == "__main__":
+    main()
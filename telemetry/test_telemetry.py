@@ -0,0 +1,143 @@
+# test_telemetry.py
+
+import asyncio
+import json
+import threading
+
+import pytest
+from capability_manager.Capability import Capability
+from layers import AgentModelLayer, GlobalStrategyLayer, MessageType
+from telemetry import (Tracer, annotate, format_waterfall, get_logger, group_traces, layer_breakdown, load_spans,
+                       traced)
+from telemetry.__main__ import main
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    # Make a tracer the shared one for the duration of a test
+    Tracer._shared = Tracer(path=str(tmp_path / "traces.jsonl"), service_name="test")
+    yield Tracer._shared
+    Tracer._shared.close()
+    Tracer._shared = None
+
+
+def test_Tracer_spans_nest_and_export_as_otlp(tracer):
+    with tracer.span("outer", layer="GlobalStrategyLayer", answer=42) as outer:
+        with tracer.span("inner") as inner:
+            annotate(model="openai/gpt-4")
+    with pytest.raises(ValueError):
+        with tracer.span("failing", trace_id=outer.trace_id):
+            raise ValueError("boom")
+
+    assert inner.trace_id == outer.trace_id and inner.parent_id == outer.span_id
+    assert inner.layer == "GlobalStrategyLayer"
+    lines = [json.loads(line) for line in open(tracer.path)]
+    assert len(lines) == tracer.spans == 3
+    resource_spans = lines[0]["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "test"}}]
+    first = resource_spans["scopeSpans"][0]["spans"][0]
+    assert first["name"] == "inner" and first["parentSpanId"] == outer.span_id
+    assert len(first["traceId"]) == 32 and len(first["spanId"]) == 16
+    assert int(first["endTimeUnixNano"]) >= int(first["startTimeUnixNano"])
+    assert {"key": "model", "value": {"stringValue": "openai/gpt-4"}} in first["attributes"]
+    assert {"key": "ace.layer", "value": {"stringValue": "GlobalStrategyLayer"}} in first["attributes"]
+
+    spans = {span["name"]: span for span in load_spans(tracer.path)}
+    assert spans["outer"]["attributes"] == {"answer": 42}
+    assert spans["outer"]["parent_id"] is None and spans["outer"]["ok"]
+    assert not spans["failing"]["ok"]
+
+
+def test_traced_records_only_while_a_tracer_is_active(tmp_path):
+    @traced("work")
+    def work():
+        return 1
+
+    @traced()
+    async def awork():
+        return 2
+
+    assert work() == 1 and Tracer.active() is None
+    Tracer._shared = Tracer(path=str(tmp_path / "traces.jsonl"))
+    try:
+        assert work() == 1
+        assert asyncio.run(awork()) == 2
+        names = [span["name"] for span in load_spans(Tracer._shared.path)]
+    finally:
+        Tracer._shared.close()
+        Tracer._shared = None
+    assert names == ["work", "test_traced_records_only_while_a_tracer_is_active.<locals>.awork"]
+
+
+def test_Capability_execute_is_traced(tracer):
+    class Echo(Capability):
+        def execute(self, text):
+            return text
+
+    assert Echo("echo", "Repeats its input").execute("hi") == "hi"
+    assert [span["name"] for span in load_spans(tracer.path)] == ["Echo.execute"]
+
+
+def test_layers_trace_each_hop(tracer):
+    upper, lower = GlobalStrategyLayer(), AgentModelLayer()
+    upper.connect_below(lower)
+    upper.tracer = lower.tracer = tracer
+    replies = []
+
+    def handle_from_above(data):
+        # An envelope made while handling a message belongs to the same commission
+        lower.pass_up(lower.envelope(MessageType.REPORT, "done"))
+
+    lower.handle_from_above = handle_from_above
+    upper.handle_from_below = replies.append
+    threads = [threading.Thread(target=layer.main_loop) for layer in (upper, lower)]
+    for thread in threads:
+        thread.start()
+
+    with tracer.span("commission", layer=upper.name) as root:
+        request = upper.envelope(MessageType.REQUEST, "plan", correlation_id=root.trace_id)
+        upper.pass_down(request)
+    for _ in range(50):
+        if replies:
+            break
+        threading.Event().wait(0.02)
+    for layer in (upper, lower):
+        layer.stop()
+    for thread in threads:
+        thread.join(5)
+
+    assert replies and replies[0].correlation_id == request.correlation_id
+    spans = load_spans(tracer.path)
+    assert {span["trace_id"] for span in spans} == {request.correlation_id}
+    by_name = {(span["layer"], span["name"]): span for span in spans}
+    handled = by_name[(lower.name, "handle from above")]
+    assert by_name[(lower.name, "queue wait")]["parent_id"] == root.span_id
+    assert handled["parent_id"] == root.span_id
+    assert handled["attributes"] == {"type": "REQUEST", "source": upper.name}
+    assert by_name[(upper.name, "handle from below")]["parent_id"] == handled["span_id"]
+
+    waterfall = format_waterfall(group_traces(spans)[request.correlation_id])
+    assert waterfall.splitlines()[0].startswith(f"trace {request.correlation_id}")
+    assert "    handle from below" in waterfall
+    assert layer_breakdown(spans)[lower.name]["handle from above"]["count"] == 1
+
+
+def test_summary_tool(tracer, capsys):
+    with tracer.span("commission", layer="AspirationalLayer") as root:
+        with tracer.span("GPTModel.generate"):
+            pass
+    main([tracer.path, "--trace", root.trace_id])
+    output = capsys.readouterr().out
+    assert f"trace {root.trace_id}" in output
+    assert "GPTModel.generate" in output and "AspirationalLayer" in output
+
+
+def test_get_logger_shares_its_handlers():
+    # Test that asking for loggers again, as every new layer does, adds no more handlers
+    first = get_logger("AspirationalLayer")
+    handlers = list(first.handlers)
+    for _ in range(3):
+        GlobalStrategyLayer()
+    assert get_logger("AspirationalLayer").handlers == handlers
+    assert len(handlers) == 2
+    assert get_logger("GlobalStrategyLayer").handlers == handlers
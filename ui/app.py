@@ -12,8 +12,6 @@ architecture = CognitiveArchitecture()
 # Simple in-memory list of tasks
 tasks = []
 
-# Access the currency resource from the executive function layer
-currency_resource = architecture.executive_function_layer.resources.get_resource("CurrencyResource")
 remaining_currency = 0.0
 
 
@@ -25,6 +23,8 @@ def run_architecture():
 def update_resources():
     """Periodically update resource status."""
     global remaining_currency
+    # Access the currency resource from the executive function layer, building the layer here rather than on import
+    currency_resource = architecture.executive_function_layer.resources.get_resource("CurrencyResource")
     while True:
         if currency_resource:
             try: